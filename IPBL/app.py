@@ -3,7 +3,7 @@ from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
 from flask_mail import Mail
 from config import config
-from routes import auth_bp, profile_bp, skills_bp, matching_bp, requests_bp, reviews_bp, chat_bp
+from routes import auth_bp, profile_bp, skills_bp, matching_bp, requests_bp, reviews_bp, chat_bp, dashboard_bp, avatars_bp
 
 # Initialize Flask-Mail
 mail = Mail()
@@ -27,6 +27,41 @@ def create_app(config_name='development'):
     
     # Initialize Flask-Mail
     mail.init_app(app)
+
+    # Per-request SQL stats and Server-Timing headers
+    from database import init_query_instrumentation, close_db
+    init_query_instrumentation(app)
+    app.teardown_appcontext(close_db)
+
+    # Request, DB and email metrics exposed at /metrics
+    from utils.metrics import init_metrics
+    init_metrics(app)
+
+    # Response cache for public read endpoints
+    from utils.cache import init_cache
+    init_cache(app)
+
+    # Last-seen times of authenticated users, for "online now" ranking
+    from utils.presence import init_presence
+    init_presence(app)
+
+    # Stored responses for POSTs retried with the same Idempotency-Key
+    from utils.idempotency import init_idempotency
+    init_idempotency(app)
+
+    # Opt-in request profiling (signed header or sampling)
+    from utils.profiler import init_profiler
+    init_profiler(app)
+
+    # Compressed dynamic responses and hashed, precompressed static assets
+    from utils.compression import init_compression
+    from utils.assets import init_assets
+    init_compression(app)
+    init_assets(app)
+
+    # Background resizing of uploaded profile pictures
+    from utils.images import init_avatars
+    init_avatars(app)
     
     # Enable CORS
     CORS(app)
@@ -40,10 +75,15 @@ def create_app(config_name='development'):
     app.register_blueprint(reviews_bp)
 
     app.register_blueprint(chat_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(avatars_bp)
 
     from routes.notifications import notifications_bp
     app.register_blueprint(notifications_bp)
 
+    from routes.metrics import metrics_bp
+    app.register_blueprint(metrics_bp)
+
     # Error Handlers
     @app.errorhandler(404)
     def not_found_error(error):
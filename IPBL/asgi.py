@@ -0,0 +1,331 @@
+"""
+ASGI entry point: chat and notification long-polls on asyncio, everything
+else on the Flask app.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --backlog 4096
+
+Served here without holding a thread or a database connection while the
+client waits:
+
+    GET /api/notifications/check[?wait=25&since=<version>]
+        The same counts as the Flask endpoint, plus a "version". With wait,
+        responds once the counts differ from `since`, or after `wait`
+        seconds with them unchanged.
+    GET /api/notifications/stream
+        Server-sent events: a "counts" event now and whenever they change.
+    GET /api/chat/<id>/messages/poll?after=<message id>&wait=25
+        Messages newer than `after` (marked read), waiting for one if there
+        are none yet.
+
+A waiting client sleeps on an asyncio.Event until the LISTEN connection in
+utils/notifier.py hears about its user, then queries through a small
+AsyncConnectionPool (ASYNC_DB_POOL_MIN/MAX), so idle clients are limited by
+file descriptors (raise `ulimit -n`), not workers. Every other request goes to
+the unchanged Flask app from wsgi.py on a thread pool of ASGI_WSGI_THREADS.
+"""
+import asyncio
+import re
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from database.db import DATABASE_URL
+from routes.notifications import (
+    PENDING_REQUESTS_QUERY,
+    REQUEST_UPDATES_QUERY,
+    UNREAD_MESSAGES_QUERY,
+)
+from utils.auth_helper import decode_token
+from utils.encryption import decrypt_message
+from utils.metrics import realtime_clients
+from utils.notifier import Notifier
+from wsgi import app as flask_app
+
+MAX_WAIT = 55  # under the usual 60s proxy idle timeout
+HEARTBEAT_SECONDS = 20
+
+MEMBER_QUERY = "SELECT id FROM conversations WHERE id = %s AND (user1_id = %s OR user2_id = %s)"
+
+NEW_MESSAGES_QUERY = """
+    SELECT id, sender_id, content, created_at, is_read FROM messages
+    WHERE conversation_id = %s AND id > %s
+    ORDER BY id
+"""
+
+MARK_READ_QUERY = """
+    UPDATE messages SET is_read = TRUE
+    WHERE conversation_id = %s AND sender_id != %s AND id <= %s AND is_read = FALSE
+"""
+
+pool = AsyncConnectionPool(
+    DATABASE_URL,
+    min_size=flask_app.config["ASYNC_DB_POOL_MIN"],
+    max_size=flask_app.config["ASYNC_DB_POOL_MAX"],
+    kwargs={"row_factory": dict_row, "autocommit": True},
+    open=False,
+)
+notifier = Notifier(DATABASE_URL)
+presence = flask_app.extensions["presence"]
+wsgi_app = WSGIMiddleware(flask_app, workers=flask_app.config["ASGI_WSGI_THREADS"])
+
+
+class BadRequest(Exception):
+    pass
+
+
+# --- Helpers -----------------------------------------------------------------
+
+
+def _headers(content_type, extra=()):
+    return [
+        (b"content-type", content_type.encode()),
+        (b"access-control-allow-origin", b"*"),
+        *extra,
+    ]
+
+
+async def send_json(send, status, data):
+    await send(
+        {"type": "http.response.start", "status": status, "headers": _headers("application/json")}
+    )
+    await send({"type": "http.response.body", "body": flask_app.json.dumps(data).encode()})
+
+
+def query_args(scope):
+    return {k: v[-1] for k, v in parse_qs(scope["query_string"].decode()).items()}
+
+
+def wait_arg(args):
+    try:
+        wait = float(args.get("wait", 0))
+    except ValueError:
+        raise BadRequest("wait must be a number of seconds")
+    return min(max(wait, 0.0), MAX_WAIT)
+
+
+def authenticate(scope):
+    header = dict(scope["headers"]).get(b"authorization", b"").decode()
+    token = header.partition(" ")[2]
+    return decode_token(token) if token else None
+
+
+async def fetch_counts(user_id):
+    async with pool.connection() as conn:
+        # Independent counts, one round trip
+        async with conn.pipeline():
+            cursors = [
+                await conn.execute(UNREAD_MESSAGES_QUERY, (user_id, user_id, user_id)),
+                await conn.execute(PENDING_REQUESTS_QUERY, (user_id,)),
+                await conn.execute(REQUEST_UPDATES_QUERY, (user_id,)),
+            ]
+        unread, pending, updates = [(await cur.fetchone())["count"] for cur in cursors]
+    return {
+        "unread_messages": unread,
+        "pending_requests": pending,
+        "request_updates": updates,
+        "version": f"{unread}.{pending}.{updates}",
+    }
+
+
+# --- Endpoints ---------------------------------------------------------------
+
+
+async def check_notifications(scope, send, user):
+    """Notification counts, optionally waiting until they change"""
+    args = query_args(scope)
+    wait = wait_arg(args)
+    since = args.get("since")
+    user_id = user["user_id"]
+    deadline = asyncio.get_running_loop().time() + wait
+
+    realtime_clients.inc(endpoint="notifications_check")
+    try:
+        with notifier.subscribe(user_id) as event:
+            while True:
+                counts = await fetch_counts(user_id)
+                remaining = deadline - asyncio.get_running_loop().time()
+                if counts["version"] != since or remaining <= 0:
+                    break
+                await notifier.wait(event, remaining)
+    finally:
+        realtime_clients.dec(endpoint="notifications_check")
+    await send_json(send, 200, counts)
+
+
+async def stream_notifications(scope, send, user):
+    """Server-sent "counts" events whenever the notification counts change"""
+    user_id = user["user_id"]
+    realtime_clients.inc(endpoint="notifications_stream")
+    try:
+        with notifier.subscribe(user_id) as event:
+            counts = await fetch_counts(user_id)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": _headers(
+                        "text/event-stream",
+                        [(b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")],
+                    ),
+                }
+            )
+            version = None
+            while True:
+                if counts["version"] != version:
+                    version = counts["version"]
+                    data = flask_app.json.dumps(counts)
+                    chunk = f"event: counts\ndata: {data}\n\n"
+                else:
+                    chunk = ": keepalive\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+                # An open stream keeps its user online
+                await asyncio.to_thread(presence.touch, user_id)
+                if await notifier.wait(event, HEARTBEAT_SECONDS):
+                    counts = await fetch_counts(user_id)
+    finally:
+        realtime_clients.dec(endpoint="notifications_stream")
+
+
+async def poll_messages(scope, send, user, conversation_id):
+    """Messages newer than `after`, waiting up to `wait` seconds for one"""
+    args = query_args(scope)
+    wait = wait_arg(args)
+    try:
+        after = int(args.get("after", 0))
+    except ValueError:
+        raise BadRequest("after must be a message id")
+    user_id = user["user_id"]
+    conversation_id = int(conversation_id)
+    deadline = asyncio.get_running_loop().time() + wait
+
+    realtime_clients.inc(endpoint="chat_poll")
+    try:
+        with notifier.subscribe(user_id) as event:
+            async with pool.connection() as conn:
+                cur = await conn.execute(MEMBER_QUERY, (conversation_id, user_id, user_id))
+                if await cur.fetchone() is None:
+                    await send_json(send, 404, {"error": "Conversation not found or access denied"})
+                    return
+
+            while True:
+                async with pool.connection() as conn:
+                    cur = await conn.execute(NEW_MESSAGES_QUERY, (conversation_id, after))
+                    messages = await cur.fetchall()
+                    if messages:
+                        await conn.execute(
+                            MARK_READ_QUERY, (conversation_id, user_id, messages[-1]["id"])
+                        )
+                remaining = deadline - asyncio.get_running_loop().time()
+                if messages or remaining <= 0:
+                    break
+                await notifier.wait(event, remaining)
+    finally:
+        realtime_clients.dec(endpoint="chat_poll")
+
+    # Decryption reads ENCRYPTION_KEY from the Flask config
+    with flask_app.app_context():
+        result = [
+            {
+                "id": msg["id"],
+                "sender_id": msg["sender_id"],
+                "content": decrypt_message(msg["content"]),
+                "created_at": msg["created_at"],
+                "is_read": bool(msg["is_read"]),
+                "is_me": msg["sender_id"] == user_id,
+            }
+            for msg in messages
+        ]
+    await send_json(send, 200, {"messages": result})
+
+
+ROUTES = [
+    (re.compile(r"/api/notifications/check"), check_notifications),
+    (re.compile(r"/api/notifications/stream"), stream_notifications),
+    (re.compile(r"/api/chat/(?P<conversation_id>\d+)/messages/poll"), poll_messages),
+]
+
+
+# --- ASGI plumbing -----------------------------------------------------------
+
+
+async def run_until_disconnect(coro, receive):
+    """Run a handler, cancelling it if the client goes away first"""
+    task = asyncio.ensure_future(coro)
+
+    async def watch():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if task.done():
+        task.result()
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def handle(handler, scope, receive, send, params):
+    user = authenticate(scope)
+    if user is None:
+        await send_json(send, 401, {"error": "Invalid or missing authentication token"})
+        return
+    # The presence backend may be files or Redis, so keep it off the event loop
+    await asyncio.to_thread(presence.touch, user["user_id"])
+
+    started = False
+
+    async def tracked_send(message):
+        nonlocal started
+        started = True
+        await send(message)
+
+    try:
+        await run_until_disconnect(handler(scope, tracked_send, user, **params), receive)
+    except BadRequest as e:
+        await send_json(send, 400, {"error": str(e)})
+    except Exception as e:
+        flask_app.logger.error(f"Async endpoint {scope['path']} failed: {e}", exc_info=True)
+        if not started:
+            await send_json(send, 500, {"error": f"Failed to load updates: {str(e)}"})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await pool.open()
+                await notifier.start()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await notifier.stop()
+            await pool.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    if scope["type"] == "http" and scope["method"] == "GET":
+        for pattern, handler in ROUTES:
+            match = pattern.fullmatch(scope["path"])
+            if match:
+                await handle(handler, scope, receive, send, match.groupdict())
+                return
+
+    await wsgi_app(scope, receive, send)
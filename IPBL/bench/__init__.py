@@ -0,0 +1 @@
+# Benchmark tooling (run from the IPBL directory, e.g. python -m bench.pipeline_bench)
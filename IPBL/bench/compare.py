@@ -0,0 +1,84 @@
+"""
+Compare a load test report against a stored baseline.
+
+Exits with status 1 when any route's p95 latency grew, or its throughput
+dropped, by more than the allowed fraction, so it can gate CI or a deploy.
+
+Usage (from the IPBL directory):
+    python -m bench.compare bench/results/report.json bench/baseline.json --tolerance 0.15
+
+The baseline is machine-specific, so none ships with the repo: record one
+with bench/loadgen.py --output bench/baseline.json on the machine that runs
+the comparison (and commit it there), and promote later reports by copying
+them over it.
+"""
+import argparse
+import json
+import os
+import sys
+
+
+def compare(report, baseline, tolerance):
+    """Return (rows, regressions) comparing each route present in both files"""
+    rows = []
+    regressions = []
+    for name, base in sorted(baseline["routes"].items()):
+        current = report["routes"].get(name)
+        if current is None:
+            continue
+
+        p95_change = (current["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        rps_change = (
+            (current["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"]
+            if base["throughput_rps"]
+            else 0.0
+        )
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        rows.append((name, base, current, p95_change, rps_change, regressed))
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff a load test report against a baseline")
+    parser.add_argument("report")
+    parser.add_argument("baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15, help="allowed fractional regression (0.15 = 15%%)"
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.baseline):
+        sys.exit(
+            f"No baseline at {args.baseline}. Record one on this machine first:\n"
+            f"    python -m bench.loadgen --output {args.baseline}"
+        )
+
+    with open(args.report, encoding="utf-8") as f:
+        report = json.load(f)
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    rows, regressions = compare(report, baseline, args.tolerance)
+
+    print(f"{'route':<36}{'p95 base':>10}{'p95 now':>10}{'Δp95':>8}{'rps base':>10}{'rps now':>10}{'Δrps':>8}")
+    for name, base, current, p95_change, rps_change, regressed in rows:
+        marker = "  REGRESSED" if regressed else ""
+        print(
+            f"{name:<36}{base['p95_ms']:>10.1f}{current['p95_ms']:>10.1f}{p95_change:>8.0%}"
+            f"{base['throughput_rps']:>10.1f}{current['throughput_rps']:>10.1f}{rps_change:>8.0%}{marker}"
+        )
+
+    missing = sorted(set(baseline["routes"]) - set(report["routes"]))
+    if missing:
+        print(f"\nNot in report: {', '.join(missing)}")
+
+    if regressions:
+        print(f"\n{len(regressions)} route(s) regressed beyond {args.tolerance:.0%}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
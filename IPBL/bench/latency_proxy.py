@@ -0,0 +1,105 @@
+"""
+TCP proxy that adds a fixed one-way delay in both directions.
+
+Used to simulate the network latency of a managed Postgres instance against a
+local database. Chunks keep their relative timing, so pipelined statements
+still travel together while sequential ones pay the full round trip each time.
+
+Usage:
+    python -m bench.latency_proxy --upstream localhost:5432 --port 6543 --delay-ms 20
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+
+async def _pump(reader, writer, delay):
+    """Forward data from reader to writer, delivering each chunk `delay` seconds late"""
+    queue = asyncio.Queue()
+
+    async def deliver():
+        while True:
+            due, data = await queue.get()
+            if data is None:
+                break
+            wait = due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            writer.write(data)
+            await writer.drain()
+        writer.close()
+
+    delivery = asyncio.ensure_future(deliver())
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            await queue.put((time.monotonic() + delay, data))
+    finally:
+        await queue.put((0, None))
+        await delivery
+
+
+async def _handle(client_reader, client_writer, upstream_host, upstream_port, delay):
+    try:
+        server_reader, server_writer = await asyncio.open_connection(
+            upstream_host, upstream_port
+        )
+    except OSError:
+        client_writer.close()
+        return
+
+    await asyncio.gather(
+        _pump(client_reader, server_writer, delay),
+        _pump(server_reader, client_writer, delay),
+        return_exceptions=True,
+    )
+
+
+async def serve(upstream_host, upstream_port, port, delay_ms, ready=None):
+    """Run the proxy until cancelled"""
+    delay = delay_ms / 1000.0
+    server = await asyncio.start_server(
+        lambda r, w: _handle(r, w, upstream_host, upstream_port, delay),
+        "127.0.0.1",
+        port,
+    )
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def start_in_thread(upstream_host, upstream_port, port, delay_ms):
+    """Start the proxy on a daemon thread and wait until it accepts connections"""
+    ready = threading.Event()
+
+    def run():
+        asyncio.run(serve(upstream_host, upstream_port, port, delay_ms, ready))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait(5)
+    return thread
+
+
+def parse_host_port(value, default_port=5432):
+    host, _, port = value.partition(":")
+    return host or "localhost", int(port or default_port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--upstream", default="localhost:5432", help="host:port of Postgres")
+    parser.add_argument("--port", type=int, default=6543, help="local port to listen on")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="one-way delay in ms")
+    args = parser.parse_args()
+
+    host, port = parse_host_port(args.upstream)
+    print(f"Proxying 127.0.0.1:{args.port} -> {host}:{port} (+{args.delay_ms}ms each way)")
+    try:
+        asyncio.run(serve(host, port, args.port, args.delay_ms))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,285 @@
+"""
+Concurrent HTTP load generator covering every blueprint.
+
+Each route is driven in turn for --duration seconds by --concurrency threads
+with keep-alive connections, and throughput plus p50/p95/p99 latency per route
+are written to a JSON report. Compare reports with bench/compare.py.
+
+Requires a running server and data from bench/seed.py. JWT_SECRET_KEY must
+match the server's so the generated tokens are accepted.
+
+Usage (from the IPBL directory):
+    python -m bench.loadgen --base-url http://localhost:5000 --concurrency 16 \
+        --duration 10 --output bench/results/report.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import psycopg
+from dotenv import load_dotenv
+
+from bench.seed import BENCH_PASSWORD
+
+
+def load_fixtures(database_url, sample_size):
+    """Pick seeded users, skills and conversations to build requests from"""
+    with psycopg.connect(database_url) as conn:
+        users = conn.execute(
+            "SELECT id, email FROM users WHERE email LIKE 'bench\\_%%' ORDER BY random() LIMIT %s",
+            (sample_size,),
+        ).fetchall()
+        skills = [r[0] for r in conn.execute("SELECT id FROM skills")]
+        conversations = conn.execute(
+            "SELECT id, user1_id FROM conversations WHERE user1_id = ANY(%s)",
+            ([u[0] for u in users],),
+        ).fetchall()
+        # Completed requests the sampled users haven't reviewed yet; each can
+        # be reviewed once, so a long write run uses them up
+        reviewable = conn.execute(
+            """
+            SELECT r.id, r.sender_id FROM swap_requests r
+            WHERE r.status = 'completed' AND r.sender_id = ANY(%s)
+            AND NOT EXISTS (
+                SELECT 1 FROM reviews v WHERE v.request_id = r.id AND v.reviewer_id = r.sender_id
+            )
+        """,
+            ([u[0] for u in users],),
+        ).fetchall()
+    if not users:
+        raise SystemExit("No bench users found; run python -m bench.seed first")
+    return users, skills, conversations, reviewable
+
+
+def build_scenarios(users, skills, conversations, reviewable, include_writes):
+    """Route name -> function returning (method, path, user_id or None, body)"""
+    from utils import generate_token
+
+    tokens = {user_id: generate_token(user_id, email) for user_id, email in users}
+    user_ids = list(tokens)
+
+    def any_user():
+        return random.choice(user_ids)
+
+    def get_messages():
+        conv_id, participant = random.choice(conversations) if conversations else (0, any_user())
+        return ("GET", f"/api/chat/{conv_id}/messages", participant, None)
+
+    def send_message():
+        sender_id, receiver_id = random.sample(user_ids, 2)
+        return (
+            "POST",
+            "/api/chat/send",
+            sender_id,
+            {"receiver_id": receiver_id, "content": "Load test message"},
+        )
+
+    def create_request():
+        sender_id, receiver_id = random.sample(user_ids, 2)
+        return (
+            "POST",
+            "/api/requests/",
+            sender_id,
+            {"receiver_id": receiver_id, "skill_id": random.choice(skills), "message": "Load test"},
+        )
+
+    unreviewed = iter(reviewable)
+    unreviewed_lock = threading.Lock()
+
+    def create_review():
+        with unreviewed_lock:
+            request_id, reviewer_id = next(unreviewed, None) or random.choice(reviewable or [(0, any_user())])
+        return (
+            "POST",
+            "/api/reviews/",
+            reviewer_id,
+            {"request_id": request_id, "rating": random.randint(1, 5), "comment": "Load test"},
+        )
+
+    def update_profile():
+        return (
+            "PUT",
+            "/api/profile/update",
+            any_user(),
+            {"bio": f"Load test bio {random.randrange(1000)}"},
+        )
+
+    scenarios = {
+        "auth.get_current_user": lambda: ("GET", "/api/auth/me", any_user(), None),
+        "profile.get_profile": lambda: ("GET", f"/api/profile/{any_user()}", None, None),
+        "skills.get_all_skills": lambda: ("GET", "/api/skills/", None, None),
+        "skills.get_categories": lambda: ("GET", "/api/skills/categories", None, None),
+        "skills.search_skills": lambda: ("GET", "/api/skills/search?q=Py", None, None),
+        "matching.find_teachers": lambda: (
+            "GET", f"/api/matching/find-teachers?skill_id={random.choice(skills)}", None, None
+        ),
+        "matching.find_learners": lambda: (
+            "GET", f"/api/matching/find-learners?skill_id={random.choice(skills)}", None, None
+        ),
+        "matching.get_recommendations": lambda: (
+            "GET", "/api/matching/recommendations", any_user(), None
+        ),
+        "matching.search_by_name": lambda: (
+            "GET", "/api/matching/search-by-name?query=Ava", None, None
+        ),
+        "requests.get_requests": lambda: ("GET", "/api/requests/", any_user(), None),
+        "reviews.get_user_reviews": lambda: (
+            "GET", f"/api/reviews/user/{any_user()}", None, None
+        ),
+        "chat.get_conversations": lambda: ("GET", "/api/chat/conversations", any_user(), None),
+        "chat.get_messages": get_messages,
+        "notifications.check_notifications": lambda: (
+            "GET", "/api/notifications/check", any_user(), None
+        ),
+        "dashboard.bootstrap": lambda: ("GET", "/api/dashboard/bootstrap", any_user(), None),
+    }
+
+    if include_writes:
+        scenarios["auth.login"] = lambda: (
+            "POST",
+            "/api/auth/login",
+            None,
+            {"email": random.choice(users)[1], "password": BENCH_PASSWORD},
+        )
+        scenarios["chat.send_message"] = send_message
+        # Random pairs rarely collide with a pending request (409). Reviews
+        # 409 too once the seeded completed requests are used up
+        scenarios["requests.create_request"] = create_request
+        scenarios["reviews.create_review"] = create_review
+        scenarios["profile.update_profile"] = update_profile
+
+    return scenarios, tokens
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_route(base_url, scenario, tokens, concurrency, duration):
+    """Drive one route with `concurrency` threads; returns latencies (ms) and error count"""
+    parts = urlsplit(base_url)
+    connection_class = (
+        http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    )
+    deadline = time.perf_counter() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker():
+        conn = connection_class(parts.hostname, parts.port, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            method, path, user_id, body = scenario()
+            headers = {"Content-Type": "application/json"}
+            if user_id is not None:
+                headers["Authorization"] = f"Bearer {tokens[user_id]}"
+            payload = json.dumps(body) if body is not None else None
+
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = connection_class(parts.hostname, parts.port, timeout=30)
+                continue
+            local_latencies.append((time.perf_counter() - start) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def main():
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Load test every blueprint")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per route")
+    parser.add_argument("--users", type=int, default=500, help="seeded users to sample")
+    parser.add_argument("--routes", help="comma-separated route names to run")
+    parser.add_argument(
+        "--include-writes",
+        action="store_true",
+        help="also drive login, sending messages, creating requests and reviews, and profile updates",
+    )
+    parser.add_argument("--output", default="bench/results/report.json")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+
+    users, skills, conversations, reviewable = load_fixtures(database_url, args.users)
+    scenarios, tokens = build_scenarios(
+        users, skills, conversations, reviewable, args.include_writes
+    )
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        scenarios = {name: s for name, s in scenarios.items() if name in wanted}
+
+    report = {
+        "meta": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "timestamp": datetime.now().isoformat(),
+        },
+        "routes": {},
+    }
+
+    print(f"{'route':<36}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for name, scenario in scenarios.items():
+        latencies, errors, elapsed = run_route(
+            args.base_url, scenario, tokens, args.concurrency, args.duration
+        )
+        latencies.sort()
+        result = {
+            "requests": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        }
+        report["routes"][name] = result
+        print(
+            f"{name:<36}{result['throughput_rps']:>9.1f}{result['p50_ms']:>9.1f}"
+            f"{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{errors:>8}"
+        )
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Micro-benchmarks for the helpers that run on every request.
+
+Runs offline (no database). Each benchmark calls a helper over a realistic
+batch, with warmup rounds and several timed runs, and reports the per-call
+cost. Results can be saved and later compared; a difference is only called
+out when Welch's t statistic says it is larger than the run-to-run noise.
+
+Usage (from the IPBL directory):
+    python -m bench.micro                                  # run and print
+    python -m bench.micro --save bench/micro_baseline.json # store results
+    python -m bench.micro --compare bench/micro_baseline.json
+
+Timings depend on the machine, so the baseline is recorded locally (it is
+git-ignored) and only compared with runs on the same machine.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+
+from cryptography.fernet import Fernet
+from flask import Flask
+
+from utils import (
+    decode_token,
+    generate_token,
+    get_profile_picture_url,
+    sanitize_input,
+    validate_email,
+)
+from utils.encryption import encrypt_message, decrypt_message
+
+BENCHMARKS = {}
+
+
+def benchmark(name, batch):
+    """Register a function that runs one batch of `batch` helper calls"""
+
+    def register(fn):
+        BENCHMARKS[name] = (fn, batch)
+        return fn
+
+    return register
+
+
+def _teacher_rows(count):
+    return [
+        {
+            "id": n,
+            "full_name": f"Teacher Number {n}",
+            "bio": "I love teaching",
+            "profile_picture": "default-avatar.png" if n % 2 else f"/static/uploads/profile_pics/missing_{n}.png",
+            "location": "Remote",
+            "availability": "Weekends",
+            "proficiency_level": "Expert",
+            "skill_name": "Python",
+            "category": "Programming",
+        }
+        for n in range(count)
+    ]
+
+
+TEACHER_ROWS = _teacher_rows(200)
+AVATARS = [(row["profile_picture"], row["full_name"]) for row in TEACHER_ROWS[:50]]
+MESSAGES = [f"Message number {n}: are you free on Thursday evening?" for n in range(50)]
+EMAILS = [f"user.{n}@example.com" for n in range(100)] + ["not-an-email"] * 10
+INPUTS = [f"  some user input {n}  " for n in range(100)]
+
+
+@benchmark("get_profile_picture_url", batch=len(AVATARS))
+def bench_profile_picture_url():
+    for picture, name in AVATARS:
+        get_profile_picture_url(picture, name)
+
+
+@benchmark("encrypt_message", batch=len(MESSAGES))
+def bench_encrypt():
+    for message in MESSAGES:
+        encrypt_message(message)
+
+
+ENCRYPTED = []
+
+
+@benchmark("decrypt_message", batch=len(MESSAGES))
+def bench_decrypt():
+    for message in ENCRYPTED:
+        decrypt_message(message)
+
+
+TOKENS = [generate_token(n, f"user{n}@example.com") for n in range(100)]
+
+
+@benchmark("decode_token", batch=len(TOKENS))
+def bench_decode_token():
+    for token in TOKENS:
+        decode_token(token)
+
+
+@benchmark("sanitize_input", batch=len(INPUTS))
+def bench_sanitize():
+    for text in INPUTS:
+        sanitize_input(text)
+
+
+@benchmark("validate_email", batch=len(EMAILS))
+def bench_validate_email():
+    for email in EMAILS:
+        validate_email(email)
+
+
+@benchmark("matching_rows_to_dicts", batch=len(TEACHER_ROWS))
+def bench_matching_rows():
+    # find_teachers' row loop before utils/serialization.py; kept as the
+    # baseline for bench.serialization_bench's old path
+    teachers_list = []
+    for teacher in TEACHER_ROWS:
+        teacher_dict = dict(teacher)
+        teacher_dict["profile_picture"] = get_profile_picture_url(
+            teacher["profile_picture"], teacher["full_name"]
+        )
+        teachers_list.append(teacher_dict)
+
+
+def run(fn, batch, runs, warmup, min_time):
+    """Time `fn`, returning per-call nanoseconds for each run"""
+    for _ in range(warmup):
+        fn()
+
+    # Repeat the batch enough times per run to get above timer noise
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops *= 2
+
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter_ns() - start) / (loops * batch))
+    return samples
+
+
+def summarize(samples):
+    return {
+        "mean_ns": statistics.fmean(samples),
+        "stdev_ns": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "median_ns": statistics.median(samples),
+        "min_ns": min(samples),
+        "runs": len(samples),
+    }
+
+
+def welch_t(a, b):
+    """Welch's t statistic between two summaries"""
+    variance = a["stdev_ns"] ** 2 / a["runs"] + b["stdev_ns"] ** 2 / b["runs"]
+    if variance == 0:
+        return math.inf if a["mean_ns"] != b["mean_ns"] else 0.0
+    return (b["mean_ns"] - a["mean_ns"]) / math.sqrt(variance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark hot helpers")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per run")
+    parser.add_argument("--filter", help="only run benchmarks containing this text")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against results saved earlier")
+    args = parser.parse_args()
+
+    # encrypt/decrypt read the key from the app config
+    app = Flask(__name__)
+    app.config["ENCRYPTION_KEY"] = Fernet.generate_key()
+
+    results = {}
+    with app.app_context(), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        ENCRYPTED[:] = [encrypt_message(m) for m in MESSAGES]
+        for name, (fn, batch) in BENCHMARKS.items():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = summarize(run(fn, batch, args.runs, args.warmup, args.min_time))
+            results[name]["batch"] = batch
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    header = f"{'benchmark':<26}{'per call':>12}{'± stdev':>10}"
+    if baseline:
+        header += f"{'baseline':>12}{'delta':>9}  significance"
+    print(header)
+    for name, result in results.items():
+        line = f"{name:<26}{result['mean_ns']:>10.0f}ns{result['stdev_ns']:>8.0f}ns"
+        if baseline and name in baseline:
+            base = baseline[name]
+            delta = (result["mean_ns"] - base["mean_ns"]) / base["mean_ns"]
+            t = welch_t(base, result)
+            verdict = "noise" if abs(t) < 2 else ("slower" if t > 0 else "faster")
+            line += f"{base['mean_ns']:>10.0f}ns{delta:>+9.1%}  {verdict} (t={t:.1f})"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "meta": {
+                        "timestamp": datetime.now().isoformat(),
+                        "python": platform.python_version(),
+                        "machine": platform.machine(),
+                        "runs": args.runs,
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nSaved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
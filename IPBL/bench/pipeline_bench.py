@@ -0,0 +1,105 @@
+"""
+Compare sequential vs pipelined execution of the multi-query handlers.
+
+Starts a latency-injecting proxy in front of DATABASE_URL, points the app at
+it, and times each handler with DB_PIPELINE off and on. The connection is
+opened once and reused, so the difference is purely statement round trips.
+
+Usage (from the IPBL directory, with DATABASE_URL pointing at a local Postgres
+that has at least one user):
+    python -m bench.pipeline_bench --delay-ms 20 --iterations 30
+"""
+import argparse
+import os
+import statistics
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from bench.latency_proxy import start_in_thread
+
+ENDPOINTS = [
+    ("profile.get_profile", "/api/profile/{user_id}", False),
+    ("requests.get_requests", "/api/requests/", True),
+    ("notifications.check_notifications", "/api/notifications/check", True),
+    ("reviews.get_user_reviews", "/api/reviews/user/{user_id}", False),
+    ("dashboard.bootstrap", "/api/dashboard/bootstrap", True),
+]
+
+
+def proxied_url(database_url, port):
+    """Rewrite DATABASE_URL so it connects through the local proxy"""
+    parts = urlsplit(database_url)
+    userinfo = parts.netloc.rpartition("@")[0]
+    netloc = f"{userinfo}@127.0.0.1:{port}" if userinfo else f"127.0.0.1:{port}"
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+def time_endpoint(client, path, headers, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_json()}")
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline round-trip benchmark")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="one-way delay added by the proxy")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--port", type=int, default=6543, help="local proxy port")
+    parser.add_argument("--user-id", type=int, help="user to request (defaults to the first user)")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+
+    upstream = urlsplit(database_url)
+    start_in_thread(upstream.hostname or "localhost", upstream.port or 5432, args.port, args.delay_ms)
+    os.environ["DATABASE_URL"] = proxied_url(database_url, args.port)
+
+    # Imported late so the app picks up the proxied DATABASE_URL
+    from app import app
+    from database import get_db
+    from utils import generate_token
+
+    client = app.test_client()
+
+    # Keep one app context (and so one connection) for the whole run
+    with app.app_context():
+        db = get_db()
+        query = "SELECT id, email FROM users ORDER BY id LIMIT 1"
+        params = ()
+        if args.user_id:
+            query = "SELECT id, email FROM users WHERE id = %s"
+            params = (args.user_id,)
+        user = db.execute(query, params).fetchone()
+        if not user:
+            raise SystemExit("No user found; seed the database first")
+        db.commit()
+
+        auth = {"Authorization": f"Bearer {generate_token(user['id'], user['email'])}"}
+
+        print(f"One-way delay: {args.delay_ms}ms, {args.iterations} iterations, median ms\n")
+        print(f"{'handler':<36}{'sequential':>12}{'pipelined':>12}{'saved':>10}")
+
+        for name, path, needs_auth in ENDPOINTS:
+            path = path.format(user_id=user["id"])
+            headers = auth if needs_auth else {}
+            results = {}
+            for pipelined in (False, True):
+                app.config["DB_PIPELINE"] = pipelined
+                client.get(path, headers=headers)  # warm up
+                results[pipelined] = time_endpoint(client, path, headers, args.iterations)
+
+            saved = results[False] - results[True]
+            print(f"{name:<36}{results[False]:>12.1f}{results[True]:>12.1f}{saved:>10.1f}")
+
+        app.config["DB_PIPELINE"] = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Throughput of the presence registry (utils/presence.py).
+
+Runs offline. Times PresenceRegistry.touch() from several threads over a pool
+of users, then last_seen() for result-sized batches of user ids, against the
+memory backend or the filesystem backend that workers share.
+
+Usage (from the IPBL directory):
+    python -m bench.presence_bench
+    python -m bench.presence_bench --backend filesystem --threads 1 4 8
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from utils.cache import FileSystemCacheBackend, MemoryCacheBackend
+from utils.presence import PresenceRegistry
+
+
+def make_registry(args, directory):
+    if args.backend == "filesystem":
+        backend = FileSystemCacheBackend(directory, args.users * 2)
+    else:
+        backend = MemoryCacheBackend(args.users * 2)
+    return PresenceRegistry(backend, ttl=args.ttl, write_interval=args.write_interval)
+
+
+def run_threads(threads, duration, work):
+    """Run work(rng) in a loop on each thread; returns total calls per second"""
+    counts = [0] * threads
+    stop = threading.Event()
+
+    def loop(index):
+        rng = random.Random(index)
+        while not stop.is_set():
+            work(rng)
+            counts[index] += 1
+
+    workers = [threading.Thread(target=loop, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presence registry benchmark")
+    parser.add_argument("--backend", choices=["memory", "filesystem"], default="memory")
+    parser.add_argument("--users", type=int, default=50000, help="distinct users touching")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per measurement")
+    parser.add_argument("--batch", type=int, default=200, help="user ids per last_seen() lookup")
+    parser.add_argument("--ttl", type=int, default=120)
+    parser.add_argument("--write-interval", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"backend={args.backend} users={args.users} ttl={args.ttl}s write_interval={args.write_interval}s")
+        for threads in args.threads:
+            registry = make_registry(args, directory)
+            rate = run_threads(threads, args.duration, lambda rng: registry.touch(rng.randrange(args.users)))
+            print(f"  touch        {threads:>2} thread(s): {rate:>12,.0f} updates/s  ({len(registry)} online)")
+
+        # Lookups against a registry where a tenth of the users are online
+        # here and the rest are unknown to this process
+        registry = make_registry(args, directory)
+        for user_id in range(0, args.users, 10):
+            registry.touch(user_id)
+        for threads in args.threads:
+            rate = run_threads(
+                threads,
+                args.duration,
+                lambda rng: registry.last_seen(rng.sample(range(args.users), args.batch)),
+            )
+            print(
+                f"  last_seen({args.batch}) {threads:>2} thread(s): {rate:>8,.0f} lookups/s"
+                f"  ({rate * args.batch:,.0f} users/s)"
+            )
+
+        # Expiry: every user lapses at once after one TTL
+        start = time.perf_counter()
+        registry.last_seen([], now=time.time() + args.ttl + 1)
+        print(
+            f"  expire {args.users // 10} users in one tick: {(time.perf_counter() - start) * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
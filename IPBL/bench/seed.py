@@ -0,0 +1,203 @@
+"""
+Seed a local Postgres with synthetic data for load testing.
+
+Rows are streamed with COPY, so millions of rows load in seconds. Seeded users
+have emails like bench_<n>@example.com and share the password in
+BENCH_PASSWORD, which lets the load generator find and log in as them.
+
+Usage (from the IPBL directory):
+    python -m bench.seed --users 10000 --skills-per-user 4 --conversations 20000 \
+        --messages-per-conversation 20 --requests 30000 --reviews 10000
+
+Run it against a throwaway database: --truncate empties every table except
+skills first.
+"""
+import argparse
+import os
+import random
+import time
+from contextlib import contextmanager
+
+import psycopg
+from dotenv import load_dotenv
+
+BENCH_PASSWORD = "BenchPass123"
+LEVELS = ("Beginner", "Intermediate", "Expert")
+STATUSES = ("pending", "accepted", "rejected", "completed")
+FIRST_NAMES = ("Ava", "Ben", "Chen", "Dara", "Eli", "Fatima", "Gus", "Hana", "Ivan", "Jo")
+LAST_NAMES = ("Kim", "Lopez", "Mehta", "Novak", "Okafor", "Park", "Quinn", "Rossi", "Singh")
+MESSAGES = (
+    "Hi! Are you free this week?",
+    "Thanks for the session, it really helped.",
+    "Can we go over the basics again?",
+    "Sure, how about Thursday evening?",
+    "I shared some notes with you.",
+)
+
+
+@contextmanager
+def _timed(label):
+    start = time.perf_counter()
+    yield
+    print(f"  {label}: {time.perf_counter() - start:.1f}s")
+
+
+def _encrypted_messages():
+    """A few encrypted bodies to reuse, so the app can decrypt seeded messages"""
+    key = os.getenv("ENCRYPTION_KEY")
+    if not key:
+        print("  ENCRYPTION_KEY not set; messages will be stored unencrypted")
+        return list(MESSAGES)
+
+    from cryptography.fernet import Fernet
+
+    cipher = Fernet(key.encode())
+    return [cipher.encrypt(m.encode()).decode() for m in MESSAGES]
+
+
+def seed(conn, args):
+    rng = random.Random(args.seed)
+
+    if args.truncate:
+        conn.execute(
+            "TRUNCATE users, user_skills, swap_requests, reviews, conversations, messages RESTART IDENTITY CASCADE"
+        )
+
+    with _timed("skills"):
+        with conn.cursor().copy("COPY skills (name, category, description) FROM STDIN") as copy:
+            for n in range(args.extra_skills):
+                copy.write_row((f"Bench Skill {n}", f"Bench {n % 10}", "Synthetic skill"))
+        skill_ids = [r[0] for r in conn.execute("SELECT id FROM skills ORDER BY id")]
+
+    with _timed("users"):
+        import bcrypt
+
+        password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt()).decode()
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]
+        with conn.cursor().copy(
+            "COPY users (email, password_hash, full_name, bio, location, availability, email_verified) FROM STDIN"
+        ) as copy:
+            for n in range(args.users):
+                copy.write_row(
+                    (
+                        f"bench_{start + n}@example.com",
+                        password_hash,
+                        f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {n}",
+                        "Synthetic user for load testing",
+                        "Remote",
+                        "Weekends",
+                        True,
+                    )
+                )
+        user_ids = [
+            r[0]
+            for r in conn.execute(
+                "SELECT id FROM users WHERE id > %s ORDER BY id", (start,)
+            )
+        ]
+
+    with _timed("user_skills"):
+        with conn.cursor().copy(
+            "COPY user_skills (user_id, skill_id, proficiency_level, is_teaching, is_learning) FROM STDIN"
+        ) as copy:
+            per_user = min(args.skills_per_user, len(skill_ids))
+            for user_id in user_ids:
+                for skill_id in rng.sample(skill_ids, per_user):
+                    teaching = rng.random() < 0.5
+                    copy.write_row(
+                        (user_id, skill_id, rng.choice(LEVELS), teaching, not teaching)
+                    )
+
+    with _timed("conversations"):
+        pairs = set()
+        target = min(args.conversations, len(user_ids) * (len(user_ids) - 1) // 2)
+        while len(pairs) < target:
+            a, b = rng.sample(user_ids, 2)
+            pairs.add((min(a, b), max(a, b)))
+        with conn.cursor().copy("COPY conversations (user1_id, user2_id) FROM STDIN") as copy:
+            for pair in pairs:
+                copy.write_row(pair)
+        conversations = conn.execute(
+            "SELECT id, user1_id, user2_id FROM conversations WHERE user1_id = ANY(%s)",
+            (user_ids,),
+        ).fetchall()
+
+    with _timed("messages"):
+        bodies = _encrypted_messages()
+        with conn.cursor().copy(
+            "COPY messages (conversation_id, sender_id, content, is_read) FROM STDIN"
+        ) as copy:
+            for conv_id, user1_id, user2_id in conversations:
+                for _ in range(args.messages_per_conversation):
+                    copy.write_row(
+                        (
+                            conv_id,
+                            rng.choice((user1_id, user2_id)),
+                            rng.choice(bodies),
+                            rng.random() < 0.8,
+                        )
+                    )
+
+    with _timed("swap_requests"):
+        pending = set()
+        with conn.cursor().copy(
+            "COPY swap_requests (sender_id, receiver_id, skill_id, status, message) FROM STDIN"
+        ) as copy:
+            for _ in range(args.requests):
+                sender_id, receiver_id = rng.sample(user_ids, 2)
+                skill_id = rng.choice(skill_ids)
+                status = rng.choice(STATUSES)
+                # Only one pending request per (sender, receiver, skill)
+                if status == "pending":
+                    if (sender_id, receiver_id, skill_id) in pending:
+                        status = "completed"
+                    else:
+                        pending.add((sender_id, receiver_id, skill_id))
+                copy.write_row((sender_id, receiver_id, skill_id, status, "Let's swap!"))
+
+    with _timed("reviews"):
+        completed = conn.execute(
+            "SELECT id, sender_id, receiver_id FROM swap_requests WHERE status = 'completed' AND sender_id = ANY(%s) LIMIT %s",
+            (user_ids, args.reviews),
+        ).fetchall()
+        with conn.cursor().copy(
+            "COPY reviews (reviewer_id, reviewed_id, request_id, rating, comment) FROM STDIN"
+        ) as copy:
+            for request_id, sender_id, receiver_id in completed:
+                copy.write_row(
+                    (sender_id, receiver_id, request_id, rng.randint(1, 5), "Great session")
+                )
+
+    with _timed("analyze"):
+        conn.commit()
+        conn.autocommit = True
+        conn.execute("ANALYZE")
+
+    print(
+        f"Seeded {len(user_ids)} users, {len(conversations)} conversations, "
+        f"{args.requests} requests, {len(completed)} reviews"
+    )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Seed synthetic benchmark data")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--extra-skills", type=int, default=0, help="skills to add beyond the defaults")
+    parser.add_argument("--skills-per-user", type=int, default=4)
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--messages-per-conversation", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--reviews", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--truncate", action="store_true", help="empty all tables except skills first")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+
+    print(f"Seeding {database_url.rpartition('@')[2]}")
+    with psycopg.connect(database_url) as conn:
+        seed(conn, args)
@@ -0,0 +1,130 @@
+"""
+Cost of turning query rows into a JSON response (utils/serialization.py).
+
+Runs offline. For result-sized batches of rows, compares the old handler path
+(dict_row rows, copied with dict(row), fixed up, then jsonify) with the
+Shape path (tuple rows, one dict per row, one json.dumps). Reports CPU time
+per response and the peak memory allocated while building it, as measured
+by tracemalloc. Building the rows the cursor would return is part of each
+path, since that is where dict_row allocates.
+
+Usage (from the IPBL directory):
+    python -m bench.serialization_bench
+    python -m bench.serialization_bench --rows 100 1000 5000
+"""
+import argparse
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask import Flask, jsonify
+
+from utils import get_profile_picture_url
+from utils.serialization import Shape, json_response
+
+TEACHER_COLUMNS = (
+    "id", "full_name", "bio", "profile_picture", "location", "availability",
+    "proficiency_level", "skill_name", "category",
+)
+REVIEW_COLUMNS = ("id", "rating", "comment", "created_at", "reviewer_name", "reviewer_pic")
+
+# As in routes/matching.py and routes/reviews.py
+TEACHER = Shape(
+    TEACHER_COLUMNS,
+    computed={"profile_picture": (get_profile_picture_url, "profile_picture", "full_name")},
+)
+REVIEW = Shape(REVIEW_COLUMNS)
+
+
+def teacher_values(count):
+    return [
+        (
+            n, f"Teacher Number {n}", "I love teaching", "default-avatar.png", "Remote",
+            "Weekends", "Expert", "Python", "Programming",
+        )
+        for n in range(count)
+    ]
+
+
+def review_values(count):
+    start = datetime(2026, 1, 1)
+    return [
+        (n, n % 5 + 1, "Great session, very patient", start + timedelta(minutes=n), f"Reviewer {n}", None)
+        for n in range(count)
+    ]
+
+
+def old_teachers(values):
+    rows = [dict(zip(TEACHER_COLUMNS, v)) for v in values]  # dict_row
+    teachers = []
+    for row in rows:
+        row_dict = dict(row)
+        row_dict["profile_picture"] = get_profile_picture_url(row["profile_picture"], row["full_name"])
+        teachers.append(row_dict)
+    return jsonify({"teachers": teachers}).get_data()
+
+
+def new_teachers(values):
+    rows = [tuple(v) for v in values]  # tuple_row
+    return json_response({"teachers": TEACHER.rows(rows)}).get_data()
+
+
+def old_reviews(values):
+    rows = [dict(zip(REVIEW_COLUMNS, v)) for v in values]
+    return jsonify({"reviews": [dict(r) for r in rows]}).get_data()
+
+
+def new_reviews(values):
+    rows = [tuple(v) for v in values]
+    return json_response({"reviews": REVIEW.rows(rows)}).get_data()
+
+
+CASES = {
+    "teachers": (teacher_values, old_teachers, new_teachers),
+    "reviews": (review_values, old_reviews, new_reviews),
+}
+
+
+def cpu_ms(fn, values, repeat):
+    number = max(1, 20000 // len(values))
+    best = min(timeit.repeat(lambda: fn(values), number=number, repeat=repeat))
+    return best / number * 1000
+
+
+def peak_kib(fn, values):
+    fn(values)  # warm caches (avatar URLs, compiled regexes) first
+    tracemalloc.start()
+    try:
+        fn(values)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def change(old, new):
+    """The new value relative to the old, as '12.5% less' or '3.0% more'"""
+    ratio = new / old - 1
+    return f"{abs(ratio):6.1%} {'more' if ratio > 0 else 'less'}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row serialization benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000])
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs; the best is kept")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    with app.app_context():
+        for name, (make_values, old, new) in CASES.items():
+            for count in args.rows:
+                values = make_values(count)
+                assert app.json.loads(old(values)) == app.json.loads(new(values))
+                old_ms, new_ms = cpu_ms(old, values, args.repeat), cpu_ms(new, values, args.repeat)
+                old_kib, new_kib = peak_kib(old, values), peak_kib(new, values)
+                print(f"{name} x{count}")
+                print(f"  cpu   old {old_ms:8.2f} ms   new {new_ms:8.2f} ms   {change(old_ms, new_ms)}")
+                print(f"  peak  old {old_kib:8.0f} KiB  new {new_kib:8.0f} KiB  {change(old_kib, new_kib)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Build content-hashed, precompressed copies of the static assets.
+
+    python build_assets.py [--static-dir static]
+
+Every file under static/ (except uploads/ and dist/ itself) is copied to
+static/dist/<path>/<name>.<hash><ext>. Text formats also get .gz and, when
+the `brotli` package is installed, .br siblings compressed at the highest
+level, since this only runs once per deploy. The mapping from original to
+hashed path is written to static/dist/manifest.json for utils/assets.py.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+SKIP_DIRS = {"uploads", "dist"}
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+MIN_SIZE = 256
+
+
+def iter_assets(static_dir):
+    """Yield paths relative to static_dir, skipping uploads and build output"""
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            if not name.startswith("."):
+                yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, "/")
+
+
+def build(static_dir):
+    dist_dir = os.path.join(static_dir, "dist")
+    shutil.rmtree(dist_dir, ignore_errors=True)
+
+    manifest = {}
+    for rel_path in iter_assets(static_dir):
+        with open(os.path.join(static_dir, rel_path), "rb") as f:
+            data = f.read()
+
+        stem, ext = os.path.splitext(rel_path)
+        hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        target = os.path.join(dist_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        manifest[rel_path] = hashed
+
+        sizes = [f"{len(data)}B"]
+        if ext in COMPRESSIBLE and len(data) >= MIN_SIZE:
+            with open(target + ".gz", "wb") as f:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                f.write(compressed)
+            sizes.append(f"gzip {len(compressed)}B")
+            if brotli is not None:
+                with open(target + ".br", "wb") as f:
+                    compressed = brotli.compress(data, quality=11)
+                    f.write(compressed)
+                sizes.append(f"br {len(compressed)}B")
+        print(f"  {rel_path} -> {hashed} ({', '.join(sizes)})")
+
+    with open(os.path.join(dist_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Built {len(manifest)} assets into {dist_dir}")
+    if brotli is None:
+        print("brotli is not installed; only gzip variants were written")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash and precompress static assets")
+    parser.add_argument(
+        "--static-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+    )
+    args = parser.parse_args()
+    build(args.static_dir)
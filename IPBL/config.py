@@ -15,6 +15,77 @@ class Config:
     )
     ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
 
+    # Send independent queries in a single round trip (psycopg pipeline mode)
+    DB_PIPELINE = os.getenv("DB_PIPELINE", "True") == "True"
+
+    # Per-request SQL instrumentation (Server-Timing header and slow request log)
+    SLOW_REQUEST_DB_MS = float(os.getenv("SLOW_REQUEST_DB_MS", 200))
+    SLOW_REQUEST_QUERY_COUNT = int(os.getenv("SLOW_REQUEST_QUERY_COUNT", 20))
+    DETECT_N_PLUS_ONE = False
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+    # Metrics (/metrics). Set METRICS_DIR to aggregate across gunicorn workers
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # Request profiling (off unless PROFILE_DIR is set)
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+    PROFILE_SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", 0))  # 1 in N requests
+    PROFILER = os.getenv("PROFILER", "sampling")  # "sampling" or "cprofile"
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+    # Signs X-Profile-Request headers (profile_report.py token); on-demand
+    # profiling is off unless it is set. Not SECRET_KEY, which has a public default
+    PROFILE_TOKEN_SECRET = os.getenv("PROFILE_TOKEN_SECRET")
+
+    # Response cache for public read endpoints ("memory", "filesystem" or "module:Class")
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/skillswap-cache")
+    CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", 300))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+    # Seconds between prunes of the filesystem backend (0 disables)
+    CACHE_PRUNE_INTERVAL = int(os.getenv("CACHE_PRUNE_INTERVAL", 60))
+
+    # Presence ("online now"). Shares state between workers through the same
+    # kinds of backend as the response cache
+    PRESENCE_BACKEND = os.getenv("PRESENCE_BACKEND", os.getenv("CACHE_BACKEND", "memory"))
+    PRESENCE_DIR = os.getenv("PRESENCE_DIR", "/tmp/skillswap-presence")
+    PRESENCE_MAX_ENTRIES = int(os.getenv("PRESENCE_MAX_ENTRIES", 100000))
+    PRESENCE_PRUNE_INTERVAL = int(os.getenv("PRESENCE_PRUNE_INTERVAL", 60))
+    PRESENCE_TTL = int(os.getenv("PRESENCE_TTL", 120))
+    PRESENCE_WRITE_INTERVAL = int(os.getenv("PRESENCE_WRITE_INTERVAL", 30))
+
+    # Response compression (gzip, or brotli if installed) for dynamic responses
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+    COMPRESS_MIMETYPES = None  # None uses utils.compression.DEFAULT_MIMETYPES
+
+    # Cache lifetime for unhashed files under /static (hashed assets are immutable)
+    SEND_FILE_MAX_AGE_DEFAULT = int(os.getenv("STATIC_MAX_AGE", 3600))
+
+    # Pending swap requests older than this are expired by expire_requests.py
+    REQUEST_EXPIRY_DAYS = float(os.getenv("REQUEST_EXPIRY_DAYS", 30))
+    REQUEST_EXPIRY_BATCH_SIZE = int(os.getenv("REQUEST_EXPIRY_BATCH_SIZE", 500))
+
+    # Background jobs (worker.py). Running jobs older than JOB_LOCK_TIMEOUT
+    # without a heartbeat are assumed lost and requeued
+    JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 4))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1))
+    JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", 300))
+    JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", 7))
+
+    # Idempotency-Key replays for POST endpoints (utils/idempotency.py)
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 24 * 3600))
+    IDEMPOTENCY_MAX_BODY_BYTES = int(os.getenv("IDEMPOTENCY_MAX_BODY_BYTES", 64 * 1024))
+    IDEMPOTENCY_MEMORY_ENTRIES = int(os.getenv("IDEMPOTENCY_MEMORY_ENTRIES", 10000))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+
+    # ASGI entry point (asgi.py): async pool for the long-poll endpoints, and
+    # threads for the Flask requests it passes through
+    ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", 1))
+    ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", 10))
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", 8))
+
     # Flask settings
     DEBUG = os.getenv("FLASK_ENV") == "development"
     TESTING = False
@@ -24,6 +95,10 @@ class Config:
 
     # File upload settings
     UPLOAD_FOLDER = "static/uploads"
+    AVATAR_FOLDER = os.getenv("AVATAR_FOLDER", "static/uploads/avatars")
+    AVATAR_ORIGINALS_FOLDER = os.getenv("AVATAR_ORIGINALS_FOLDER", "uploads/originals")
+    AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", 40_000_000))
+    AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", 2))
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
@@ -44,6 +119,14 @@ class DevelopmentConfig(Config):
     """Development configuration"""
 
     DEBUG = True
+    DETECT_N_PLUS_ONE = True
+
+
+class TestingConfig(Config):
+    """Testing configuration"""
+
+    TESTING = True
+    DETECT_N_PLUS_ONE = True
 
 
 class ProductionConfig(Config):
@@ -56,5 +139,6 @@ class ProductionConfig(Config):
 config = {
     "development": DevelopmentConfig,
     "production": ProductionConfig,
+    "testing": TestingConfig,
     "default": DevelopmentConfig,
 }
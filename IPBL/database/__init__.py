@@ -1,3 +1,4 @@
-from .db import get_db, close_db, init_db
+from .db import get_db, close_db, init_db, execute_batch
+from .instrumentation import init_query_instrumentation
 
-__all__ = ["get_db", "close_db", "init_db"]
+__all__ = ["get_db", "close_db", "init_db", "execute_batch", "init_query_instrumentation"]
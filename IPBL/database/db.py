@@ -1,8 +1,12 @@
 import os
+import time
 import psycopg
 from psycopg.rows import dict_row
 
-from flask import g
+from flask import g, current_app
+
+from utils.metrics import db_connections_opened_total, db_connections_open
+from .instrumentation import InstrumentedCursor, record_db_wait
 
 # Render provides DATABASE_URL automatically
 DATABASE_URL = os.environ.get("DATABASE_URL")
@@ -13,15 +17,49 @@ if not DATABASE_URL:
 
 def get_db():
     if "db" not in g:
-        g.db = psycopg.connect(DATABASE_URL, row_factory=dict_row)
+        g.db = psycopg.connect(
+            DATABASE_URL, row_factory=dict_row, cursor_factory=InstrumentedCursor
+        )
+        db_connections_opened_total.inc()
+        db_connections_open.inc()
     return g.db
 
 
+def execute_batch(statements, row_factory=None):
+    """
+    Run independent statements in a single pipeline so they share one round trip.
+
+    Args:
+        statements: List of (query, params) tuples. None of them may depend
+            on the result of another one in the same batch.
+        row_factory: Row factory for the cursors (default: dict_row)
+
+    Returns:
+        list: One cursor per statement, in order, ready to fetch from
+    """
+    db = get_db()
+
+    def execute(query, params):
+        return db.cursor(row_factory=row_factory).execute(query, params)
+
+    # Pipelining can be switched off to compare against sequential execution
+    if not current_app.config.get("DB_PIPELINE", True):
+        return [execute(query, params) for query, params in statements]
+
+    start = time.perf_counter()
+    with db.pipeline():
+        cursors = [execute(query, params) for query, params in statements]
+    # Statements only queue up inside the pipeline; the wait happens on sync
+    record_db_wait(time.perf_counter() - start)
+    return cursors
+
+
 def close_db(e=None):
     """Close connection after request ends"""
     db = g.pop("db", None)
     if db is not None:
         db.close()
+        db_connections_open.dec()
 
 
 def init_db():
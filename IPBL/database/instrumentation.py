@@ -0,0 +1,120 @@
+"""Per-request SQL instrumentation: statement counts, DB time and N+1 detection"""
+import re
+import time
+from collections import Counter
+
+import psycopg
+from flask import g, request, has_app_context, current_app
+
+# Collapse dynamic IN lists ("%s,%s,%s") so they share one statement shape
+_PLACEHOLDER_LIST = re.compile(r"%s(\s*,\s*%s)+")
+
+
+class QueryStats:
+    """Statements executed while handling a single request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_query = None
+        self.shapes = Counter()
+
+    def record(self, query, seconds):
+        shape = statement_shape(query)
+        self.count += 1
+        self.total_time += seconds
+        self.shapes[shape] += 1
+        if seconds >= self.slowest_time:
+            self.slowest_time = seconds
+            self.slowest_query = shape
+
+    def repeated_shapes(self, threshold):
+        """Statement shapes executed at least `threshold` times (likely N+1)"""
+        return [(shape, n) for shape, n in self.shapes.items() if n >= threshold]
+
+
+def statement_shape(query):
+    """Normalize a query to its shape so repeats of the same statement match"""
+    if not isinstance(query, str):
+        query = str(query)
+    return _PLACEHOLDER_LIST.sub("%s", " ".join(query.split()))
+
+
+def record_query(query, seconds):
+    """Add a statement to the current request's stats (no-op outside a request)"""
+    if not has_app_context():
+        return
+    stats = g.get("query_stats")
+    if stats is not None:
+        stats.record(query, seconds)
+
+
+def record_db_wait(seconds):
+    """Add time spent waiting on the database that isn't tied to one statement"""
+    if not has_app_context():
+        return
+    stats = g.get("query_stats")
+    if stats is not None:
+        stats.total_time += seconds
+
+
+class InstrumentedCursor(psycopg.Cursor):
+    """Cursor that times every statement it runs"""
+
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+    def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - start)
+
+
+def init_query_instrumentation(app):
+    """Register the request hooks that collect and report SQL stats"""
+
+    @app.before_request
+    def start_query_stats():
+        g.request_start = time.perf_counter()
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+
+        total_ms = (time.perf_counter() - g.request_start) * 1000
+        db_ms = stats.total_time * 1000
+
+        response.headers.add(
+            "Server-Timing", f'db;dur={db_ms:.1f};desc="{stats.count} queries"'
+        )
+        response.headers.add("Server-Timing", f"app;dur={total_ms:.1f}")
+
+        endpoint = request.endpoint or request.path
+        if (
+            db_ms >= app.config["SLOW_REQUEST_DB_MS"]
+            or stats.count >= app.config["SLOW_REQUEST_QUERY_COUNT"]
+        ):
+            current_app.logger.warning(
+                f"Slow request {request.method} {endpoint}: {stats.count} queries, "
+                f"{db_ms:.1f}ms in DB of {total_ms:.1f}ms total, "
+                f"slowest {stats.slowest_time * 1000:.1f}ms: {stats.slowest_query}"
+            )
+
+        if app.config["DETECT_N_PLUS_ONE"]:
+            for shape, n in stats.repeated_shapes(app.config["N_PLUS_ONE_THRESHOLD"]):
+                current_app.logger.warning(
+                    f"Possible N+1 in {request.method} {endpoint}: "
+                    f"{n} executions of: {shape}"
+                )
+
+        return response
@@ -0,0 +1,13 @@
+-- Migration: Allow swap requests to expire
+-- Run this if you have an existing database
+
+-- Add 'expired' to the allowed statuses
+ALTER TABLE swap_requests DROP CONSTRAINT IF EXISTS swap_requests_status_check;
+ALTER TABLE swap_requests ADD CONSTRAINT swap_requests_status_check
+    CHECK (status IN ('pending', 'accepted', 'rejected', 'completed', 'expired'));
+
+-- Expiry events have no acting user
+ALTER TABLE request_events ALTER COLUMN actor_id DROP NOT NULL;
+
+-- Finds pending requests old enough to expire
+CREATE INDEX IF NOT EXISTS idx_swap_requests_pending_created ON swap_requests(created_at) WHERE status = 'pending';
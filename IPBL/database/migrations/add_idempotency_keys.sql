@@ -0,0 +1,18 @@
+-- Migration: Stored responses for Idempotency-Key retries
+-- Run this if you have an existing database
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status_code SMALLINT, -- NULL while the first request is still running
+    body TEXT,
+    mimetype TEXT,
+    locked_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, endpoint, key)
+);
+
+-- Expired keys, purged a few hundred at a time
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
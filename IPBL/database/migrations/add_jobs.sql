@@ -0,0 +1,25 @@
+-- Migration: Background job queue
+-- Run this if you have an existing database
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    priority SMALLINT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL CHECK (status IN ('queued', 'running', 'done', 'failed')) DEFAULT 'queued',
+    run_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    last_error TEXT,
+    locked_by TEXT,
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- Next job to claim (highest priority, then longest due)
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(priority DESC, run_at) WHERE status = 'queued';
+-- Running jobs whose worker stopped sending heartbeats
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(locked_at) WHERE status = 'running';
+-- Finished jobs past their retention period
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at) WHERE status = 'done';
@@ -0,0 +1,64 @@
+-- Migration: updated_at on swap requests, keyset indexes, and per-user
+-- request counts maintained by trigger.
+-- Run this if you have an existing database (safe to re-run: it recounts)
+
+ALTER TABLE swap_requests ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+UPDATE swap_requests SET updated_at = created_at WHERE updated_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_swap_requests_receiver_created ON swap_requests(receiver_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_swap_requests_sender_created ON swap_requests(sender_id, created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS swap_request_counts (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    direction TEXT NOT NULL CHECK (direction IN ('incoming', 'sent')),
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, direction, status)
+);
+
+-- Same functions and triggers as schema.sql
+CREATE OR REPLACE FUNCTION swap_requests_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION swap_request_counts_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.sender_id = NEW.sender_id AND OLD.receiver_id = NEW.receiver_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE swap_request_counts SET count = count - 1
+        WHERE (user_id, direction, status) IN (
+            (OLD.receiver_id, 'incoming', OLD.status), (OLD.sender_id, 'sent', OLD.status)
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO swap_request_counts (user_id, direction, status, count)
+        VALUES (NEW.receiver_id, 'incoming', NEW.status, 1), (NEW.sender_id, 'sent', NEW.status, 1)
+        ON CONFLICT (user_id, direction, status)
+        DO UPDATE SET count = swap_request_counts.count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER swap_requests_touch BEFORE UPDATE ON swap_requests
+    FOR EACH ROW EXECUTE FUNCTION swap_requests_touch();
+CREATE OR REPLACE TRIGGER swap_request_counts_sync AFTER INSERT OR UPDATE OR DELETE ON swap_requests
+    FOR EACH ROW EXECUTE FUNCTION swap_request_counts_sync();
+
+-- Recount while writes are blocked so no change slips in between
+LOCK TABLE swap_requests IN SHARE MODE;
+
+DELETE FROM swap_request_counts;
+
+INSERT INTO swap_request_counts (user_id, direction, status, count)
+SELECT receiver_id, 'incoming', status, COUNT(*) FROM swap_requests
+WHERE status IS NOT NULL GROUP BY receiver_id, status
+UNION ALL
+SELECT sender_id, 'sent', status, COUNT(*) FROM swap_requests
+WHERE status IS NOT NULL GROUP BY sender_id, status;
@@ -0,0 +1,15 @@
+-- Migration: Record swap request status changes
+-- Run this if you have an existing database
+
+CREATE TABLE IF NOT EXISTS request_events (
+    id SERIAL PRIMARY KEY,
+    request_id INTEGER NOT NULL REFERENCES swap_requests(id) ON DELETE CASCADE,
+    actor_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    recipient_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    status TEXT NOT NULL,
+    is_read BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Unread events per user, for the notification poll
+CREATE INDEX IF NOT EXISTS idx_request_events_unread ON request_events(recipient_id) WHERE is_read = FALSE;
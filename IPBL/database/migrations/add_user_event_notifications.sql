@@ -0,0 +1,30 @@
+-- Migration: NOTIFY user_events for the async long-poll endpoints (asgi.py)
+-- Run this if you have an existing database
+
+-- Wake clients long-polling through asgi.py when a user's unread messages,
+-- pending requests or request updates may have changed. Payload is the user id
+CREATE OR REPLACE FUNCTION notify_user_event() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'messages' THEN
+        PERFORM pg_notify('user_events', p.user_id::text)
+        FROM conversations c CROSS JOIN LATERAL (VALUES (c.user1_id), (c.user2_id)) AS p(user_id)
+        WHERE c.id = NEW.conversation_id;
+    ELSIF TG_TABLE_NAME = 'request_events' THEN
+        PERFORM pg_notify('user_events', NEW.recipient_id::text);
+    ELSE
+        PERFORM pg_notify('user_events', NEW.user_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER messages_notify AFTER INSERT ON messages
+    FOR EACH ROW EXECUTE FUNCTION notify_user_event();
+-- Only rows whose read state actually changes (an INSERT trigger can't look at OLD)
+CREATE OR REPLACE TRIGGER messages_read_notify AFTER UPDATE OF is_read ON messages
+    FOR EACH ROW WHEN (OLD.is_read IS DISTINCT FROM NEW.is_read)
+    EXECUTE FUNCTION notify_user_event();
+CREATE OR REPLACE TRIGGER request_events_notify AFTER INSERT ON request_events
+    FOR EACH ROW EXECUTE FUNCTION notify_user_event();
+CREATE OR REPLACE TRIGGER swap_request_counts_notify AFTER INSERT OR UPDATE ON swap_request_counts
+    FOR EACH ROW EXECUTE FUNCTION notify_user_event();
@@ -0,0 +1,57 @@
+-- Migration: Remove duplicate pending requests and conversations, then add
+-- the constraints that stop new ones.
+-- Run this if you have an existing database
+
+LOCK TABLE swap_requests, conversations, messages IN SHARE ROW EXCLUSIVE MODE;
+
+-- 1. Keep the oldest pending request per (sender, receiver, skill)
+DELETE FROM swap_requests r
+USING swap_requests keep
+WHERE r.status = 'pending'
+  AND keep.status = 'pending'
+  AND keep.sender_id = r.sender_id
+  AND keep.receiver_id = r.receiver_id
+  AND keep.skill_id = r.skill_id
+  AND keep.id < r.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_swap_requests_one_pending
+    ON swap_requests(sender_id, receiver_id, skill_id) WHERE status = 'pending';
+
+-- 2. Merge conversations stored as both (a, b) and (b, a) into the oldest one
+CREATE TEMP TABLE conversation_merges ON COMMIT DROP AS
+SELECT c.id AS duplicate_id, keep.keep_id
+FROM conversations c
+JOIN (
+    SELECT LEAST(user1_id, user2_id) AS low, GREATEST(user1_id, user2_id) AS high, MIN(id) AS keep_id
+    FROM conversations
+    GROUP BY 1, 2
+    HAVING COUNT(*) > 1
+) keep ON LEAST(c.user1_id, c.user2_id) = keep.low
+      AND GREATEST(c.user1_id, c.user2_id) = keep.high
+      AND c.id <> keep.keep_id;
+
+UPDATE messages m SET conversation_id = cm.keep_id
+FROM conversation_merges cm
+WHERE m.conversation_id = cm.duplicate_id;
+
+UPDATE conversations c SET updated_at = latest.updated_at
+FROM (
+    SELECT cm.keep_id, MAX(d.updated_at) AS updated_at
+    FROM conversation_merges cm
+    JOIN conversations d ON d.id = cm.duplicate_id
+    GROUP BY cm.keep_id
+) latest
+WHERE c.id = latest.keep_id AND latest.updated_at > c.updated_at;
+
+DELETE FROM conversations c
+USING conversation_merges cm
+WHERE c.id = cm.duplicate_id;
+
+-- 3. Store every pair as (smaller id, larger id)
+UPDATE conversations
+SET user1_id = user2_id, user2_id = user1_id
+WHERE user1_id > user2_id;
+
+ALTER TABLE conversations DROP CONSTRAINT IF EXISTS conversations_participants_ordered;
+ALTER TABLE conversations
+    ADD CONSTRAINT conversations_participants_ordered CHECK (user1_id <= user2_id);
@@ -42,8 +42,69 @@ CREATE TABLE IF NOT EXISTS swap_requests (
     sender_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     receiver_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     skill_id INTEGER NOT NULL REFERENCES skills(id) ON DELETE CASCADE,
-    status TEXT CHECK (status IN ('pending', 'accepted', 'rejected', 'completed')) DEFAULT 'pending',
+    status TEXT CHECK (status IN ('pending', 'accepted', 'rejected', 'completed', 'expired')) DEFAULT 'pending',
     message TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+ALTER TABLE swap_requests ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+
+-- Per-user request counts by direction and status, kept current by trigger
+-- and recounted below if they don't add up
+CREATE TABLE IF NOT EXISTS swap_request_counts (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    direction TEXT NOT NULL CHECK (direction IN ('incoming', 'sent')),
+    status TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, direction, status)
+);
+
+CREATE OR REPLACE FUNCTION swap_requests_touch() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION swap_request_counts_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.sender_id = NEW.sender_id AND OLD.receiver_id = NEW.receiver_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE swap_request_counts SET count = count - 1
+        WHERE (user_id, direction, status) IN (
+            (OLD.receiver_id, 'incoming', OLD.status), (OLD.sender_id, 'sent', OLD.status)
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO swap_request_counts (user_id, direction, status, count)
+        VALUES (NEW.receiver_id, 'incoming', NEW.status, 1), (NEW.sender_id, 'sent', NEW.status, 1)
+        ON CONFLICT (user_id, direction, status)
+        DO UPDATE SET count = swap_request_counts.count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER swap_requests_touch BEFORE UPDATE ON swap_requests
+    FOR EACH ROW EXECUTE FUNCTION swap_requests_touch();
+CREATE OR REPLACE TRIGGER swap_request_counts_sync AFTER INSERT OR UPDATE OR DELETE ON swap_requests
+    FOR EACH ROW EXECUTE FUNCTION swap_request_counts_sync();
+
+-- Requests created before the counters existed aren't counted; existing
+-- databases run database/migrations/add_request_counts.sql or
+-- recount_request_counts.py once (not here, as both scan swap_requests)
+
+-- REQUEST EVENTS (status changes, shown to the other party as notifications)
+CREATE TABLE IF NOT EXISTS request_events (
+    id SERIAL PRIMARY KEY,
+    request_id INTEGER NOT NULL REFERENCES swap_requests(id) ON DELETE CASCADE,
+    actor_id INTEGER REFERENCES users(id) ON DELETE CASCADE,  -- NULL for automatic changes
+    recipient_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    status TEXT NOT NULL,
+    is_read BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -65,7 +126,9 @@ CREATE TABLE IF NOT EXISTS conversations (
     user2_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
-    UNIQUE(user1_id, user2_id)
+    UNIQUE(user1_id, user2_id),
+    -- Participants are stored in canonical order so (a, b) and (b, a) collide
+    CONSTRAINT conversations_participants_ordered CHECK (user1_id <= user2_id)
 );
 
 -- MESSAGES
@@ -78,10 +141,90 @@ CREATE TABLE IF NOT EXISTS messages (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- BACKGROUND JOBS (claimed by worker.py, see utils/jobs.py)
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    priority SMALLINT NOT NULL DEFAULT 0,
+    status TEXT NOT NULL CHECK (status IN ('queued', 'running', 'done', 'failed')) DEFAULT 'queued',
+    run_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    last_error TEXT,
+    locked_by TEXT,
+    locked_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- IDEMPOTENCY KEYS (stored responses for retried POSTs, see utils/idempotency.py)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    endpoint TEXT NOT NULL,
+    key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    status_code SMALLINT, -- NULL while the first request is still running
+    body TEXT,
+    mimetype TEXT,
+    locked_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (user_id, endpoint, key)
+);
+
 -- INDEXES
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_skills_category ON skills(category);
 CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages(conversation_id);
+-- At most one pending request per (sender, receiver, skill). Databases that
+-- already hold duplicates need database/migrations/dedupe_requests_and_conversations.sql;
+-- until then create_request falls back to checking before it inserts
+DO $$
+BEGIN
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_swap_requests_one_pending
+        ON swap_requests(sender_id, receiver_id, skill_id) WHERE status = 'pending';
+EXCEPTION WHEN unique_violation THEN
+    RAISE WARNING 'Duplicate pending swap requests; run dedupe_requests_and_conversations.sql';
+END $$;
+-- Finds pending requests old enough to expire
+CREATE INDEX IF NOT EXISTS idx_swap_requests_pending_created ON swap_requests(created_at) WHERE status = 'pending';
+-- Keyset pagination of each user's inbox and outbox, newest first
+CREATE INDEX IF NOT EXISTS idx_swap_requests_receiver_created ON swap_requests(receiver_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_swap_requests_sender_created ON swap_requests(sender_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_request_events_unread ON request_events(recipient_id) WHERE is_read = FALSE;
+-- Next job to claim, and running jobs whose worker stopped sending heartbeats
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(priority DESC, run_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(locked_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at) WHERE status = 'done';
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
+
+-- Wake clients long-polling through asgi.py when a user's unread messages,
+-- pending requests or request updates may have changed. Payload is the user id
+CREATE OR REPLACE FUNCTION notify_user_event() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'messages' THEN
+        PERFORM pg_notify('user_events', p.user_id::text)
+        FROM conversations c CROSS JOIN LATERAL (VALUES (c.user1_id), (c.user2_id)) AS p(user_id)
+        WHERE c.id = NEW.conversation_id;
+    ELSIF TG_TABLE_NAME = 'request_events' THEN
+        PERFORM pg_notify('user_events', NEW.recipient_id::text);
+    ELSE
+        PERFORM pg_notify('user_events', NEW.user_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER messages_notify AFTER INSERT ON messages
+    FOR EACH ROW EXECUTE FUNCTION notify_user_event();
+-- Only rows whose read state actually changes (an INSERT trigger can't look at OLD)
+CREATE OR REPLACE TRIGGER messages_read_notify AFTER UPDATE OF is_read ON messages
+    FOR EACH ROW WHEN (OLD.is_read IS DISTINCT FROM NEW.is_read)
+    EXECUTE FUNCTION notify_user_event();
+CREATE OR REPLACE TRIGGER request_events_notify AFTER INSERT ON request_events
+    FOR EACH ROW EXECUTE FUNCTION notify_user_event();
+CREATE OR REPLACE TRIGGER swap_request_counts_notify AFTER INSERT OR UPDATE ON swap_request_counts
+    FOR EACH ROW EXECUTE FUNCTION notify_user_event();
 
 -- Insert Default Skills (PostgreSQL version)
 INSERT INTO skills (name, category, description) VALUES
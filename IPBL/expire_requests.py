@@ -0,0 +1,51 @@
+"""
+Expire swap requests that have stayed pending for too long.
+
+    python expire_requests.py [--max-age-days 30] [--batch-size 500] [--dry-run]
+    python expire_requests.py --every 900     # keep running, sweep every 15 minutes
+
+Meant to run on a schedule (see the cron service in render.yaml). Defaults
+come from REQUEST_EXPIRY_DAYS and REQUEST_EXPIRY_BATCH_SIZE.
+"""
+import argparse
+import os
+import time
+
+import psycopg
+
+from config import Config
+from utils.request_expiry import count_stale_requests, expire_stale_requests
+
+
+def sweep(database_url, args):
+    with psycopg.connect(database_url) as conn:
+        if args.dry_run:
+            count = count_stale_requests(conn, args.max_age_days)
+            print(f"[dry run] {count} pending request(s) older than {args.max_age_days} days")
+            return
+        start = time.perf_counter()
+        expired = expire_stale_requests(
+            conn, args.max_age_days, args.batch_size, args.max_batches, args.pause
+        )
+        print(f"Expired {expired} request(s) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expire stale pending swap requests")
+    parser.add_argument("--max-age-days", type=float, default=Config.REQUEST_EXPIRY_DAYS)
+    parser.add_argument("--batch-size", type=int, default=Config.REQUEST_EXPIRY_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds between batches")
+    parser.add_argument("--every", type=float, help="repeat every N seconds instead of exiting")
+    parser.add_argument("--dry-run", action="store_true", help="only count stale requests")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+
+    while True:
+        sweep(database_url, args)
+        if not args.every:
+            break
+        time.sleep(args.every)
@@ -0,0 +1,15 @@
+# Picked up automatically by gunicorn when started from this directory
+import glob
+import os
+
+# Threaded workers, so identical concurrent reads can be coalesced
+# (utils/singleflight.py) and slow clients don't pin a whole worker
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+
+
+def on_starting(server):
+    """Clear metrics left behind by a previous run of the server"""
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, "metrics_*.json")):
+            os.remove(path)
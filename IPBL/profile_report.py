@@ -0,0 +1,110 @@
+"""
+Aggregate request profiles written by utils/profiler.py.
+
+    python profile_report.py summary [--dir DIR] [--endpoint chat.get_conversations] [--output out.collapsed]
+    python profile_report.py token [--ttl 300]
+
+`summary` merges every folded-stack file into one (ready for flamegraph.pl or
+speedscope), prints the hottest frames, and prints the top functions from any
+pstats dumps. `token` prints an X-Profile-Request header value signed with
+PROFILE_TOKEN_SECRET.
+"""
+import argparse
+import glob
+import json
+import os
+import pstats
+from collections import Counter
+
+from dotenv import load_dotenv
+
+
+def load_profiles(directory, endpoint=None):
+    """Yield (metadata, artifact path) for every profile in the directory"""
+    for meta_path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(meta_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        if endpoint and metadata.get("endpoint") != endpoint:
+            continue
+        yield metadata, os.path.join(directory, metadata["artifact"])
+
+
+def summary(args):
+    stacks = Counter()
+    prof_files = []
+    durations = {}
+
+    for metadata, artifact in load_profiles(args.dir, args.endpoint):
+        durations.setdefault(metadata["endpoint"], []).append(metadata["duration_ms"])
+        if not os.path.exists(artifact):
+            continue
+        if artifact.endswith(".prof"):
+            prof_files.append(artifact)
+            continue
+        with open(artifact, encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                if stack:
+                    stacks[stack] += int(count)
+
+    if not durations:
+        print(f"No profiles found in {args.dir}")
+        return
+
+    print("Profiled requests:")
+    for endpoint, values in sorted(durations.items()):
+        values.sort()
+        print(
+            f"  {endpoint:<40} n={len(values):<4} "
+            f"median={values[len(values) // 2]:.1f}ms max={values[-1]:.1f}ms"
+        )
+
+    if stacks:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"\nWrote {len(stacks)} folded stacks to {args.output}")
+
+        # Self time: samples where the frame is at the top of the stack
+        leaf = Counter()
+        for stack, count in stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        total = sum(stacks.values())
+        print(f"\nHottest frames ({total} samples):")
+        for frame, count in leaf.most_common(args.top):
+            print(f"  {count / total:6.1%}  {frame}")
+
+    if prof_files:
+        print(f"\nTop functions from {len(prof_files)} pstats dump(s):")
+        stats = pstats.Stats(*prof_files)
+        stats.sort_stats("cumulative").print_stats(args.top)
+
+
+def token(args):
+    from config import Config
+    from utils.profiler import make_profile_token, PROFILE_HEADER
+
+    if not Config.PROFILE_TOKEN_SECRET:
+        raise SystemExit("PROFILE_TOKEN_SECRET is not set (the app needs the same value)")
+    print(f"{PROFILE_HEADER}: {make_profile_token(Config.PROFILE_TOKEN_SECRET, args.ttl)}")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Request profile tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="aggregate profiles")
+    summary_parser.add_argument("--dir", default=os.getenv("PROFILE_DIR", "profiles"))
+    summary_parser.add_argument("--endpoint", help="only include this endpoint")
+    summary_parser.add_argument("--output", default="profile.collapsed")
+    summary_parser.add_argument("--top", type=int, default=20)
+    summary_parser.set_defaults(func=summary)
+
+    token_parser = subparsers.add_parser("token", help="print a signed profile header")
+    token_parser.add_argument("--ttl", type=int, default=300, help="seconds until it expires")
+    token_parser.set_defaults(func=token)
+
+    args = parser.parse_args()
+    args.func(args)
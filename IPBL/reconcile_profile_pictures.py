@@ -0,0 +1,191 @@
+"""
+Reconcile users.profile_picture with the files on disk.
+
+    python reconcile_profile_pictures.py [--dry-run] [--delete-orphans]
+        [--batch-size 1000] [--min-orphan-age-hours 24]
+
+The upload directories are indexed once, then users are streamed from a
+server-side cursor. A picture whose file is missing is repointed at the
+single legacy upload with the same original file name, if there is exactly
+one, or reset to the default (rendered as an initials avatar). Fixes are
+written in batches with UPDATE ... FROM (VALUES ...). Files no user points at
+are reported as orphans, and deleted with --delete-orphans once they are
+older than --min-orphan-age-hours (so fresh uploads are never touched).
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import psycopg
+from dotenv import load_dotenv
+
+from config import Config
+from utils.images import AVATAR_PREFIX, AVATAR_SIZES, DIGEST_PATTERN
+
+LEGACY_FOLDER = "static/uploads/profile_pics"
+DEFAULT_PICTURE = "default-avatar.png"
+
+
+class UploadIndex:
+    """Every legacy upload and processed avatar on disk, read once"""
+
+    def __init__(self, root):
+        self.legacy_folder = os.path.join(root, LEGACY_FOLDER)
+        self.avatar_folder = os.path.join(root, Config.AVATAR_FOLDER)
+        self.originals_folder = os.path.join(root, Config.AVATAR_ORIGINALS_FOLDER)
+
+        self.legacy = set(_list(self.legacy_folder))
+        # Uploads are saved as <uuid>_<original name>
+        self.legacy_by_original = defaultdict(list)
+        for name in self.legacy:
+            self.legacy_by_original[name.partition("_")[2]].append(name)
+
+        # digest -> file names, for processed avatars and queued originals
+        self.avatars = defaultdict(list)
+        for name in _list(self.avatar_folder):
+            self.avatars[name.partition("_")[0]].append(name)
+        self.originals = {name for name in _list(self.originals_folder) if DIGEST_PATTERN.fullmatch(name)}
+        self.complete = {
+            digest for digest, names in self.avatars.items() if f"{digest}_{max(AVATAR_SIZES)}.jpg" in names
+        }
+
+    def resolve(self, picture):
+        """Return (kind, key, exists) for a stored profile_picture value"""
+        if picture.startswith(AVATAR_PREFIX):
+            digest = picture[len(AVATAR_PREFIX):]
+            return "avatar", digest, digest in self.complete or digest in self.originals
+        name = picture.rsplit("/", 1)[-1]
+        return "legacy", name, name in self.legacy
+
+    def replacement(self, name):
+        """The one legacy upload with the same original file name, if unambiguous"""
+        original = name.partition("_")[2]
+        matches = self.legacy_by_original.get(original, []) if original else []
+        return f"/{LEGACY_FOLDER}/{matches[0]}" if len(matches) == 1 else None
+
+    def orphans(self, referenced_legacy, referenced_avatars):
+        """Paths of files that no user points at"""
+        for name in sorted(self.legacy - referenced_legacy):
+            yield os.path.join(self.legacy_folder, name)
+        for digest in sorted((set(self.avatars) | self.originals) - referenced_avatars):
+            for name in self.avatars.get(digest, []):
+                yield os.path.join(self.avatar_folder, name)
+            if digest in self.originals:
+                yield os.path.join(self.originals_folder, digest)
+
+
+def _list(folder):
+    try:
+        return [e.name for e in os.scandir(folder) if e.is_file() and not e.name.endswith(".tmp")]
+    except FileNotFoundError:
+        return []
+
+
+def flush(writer, fixes, dry_run):
+    """Apply a batch of (user_id, new_picture) fixes in one statement"""
+    if not fixes or dry_run:
+        return
+    values = ", ".join(["(%s::int, %s::text)"] * len(fixes))
+    params = [value for fix in fixes for value in fix]
+    writer.execute(
+        f"""
+        UPDATE users AS u SET profile_picture = v.picture
+        FROM (VALUES {values}) AS v(id, picture)
+        WHERE u.id = v.id
+    """,
+        params,
+    )
+    writer.commit()
+
+
+def reconcile(database_url, args):
+    started = time.perf_counter()
+    index = UploadIndex(os.path.dirname(os.path.abspath(__file__)))
+    print(
+        f"Indexed {len(index.legacy)} legacy uploads, {len(index.complete)} processed avatars, "
+        f"{len(index.originals)} queued originals"
+    )
+
+    referenced_legacy = set()
+    referenced_avatars = set()
+    counts = defaultdict(int)
+    fixes = []
+
+    with psycopg.connect(database_url) as reader, psycopg.connect(database_url) as writer:
+        with reader.cursor(name="reconcile_profile_pictures") as cur:
+            cur.itersize = args.batch_size
+            cur.execute(
+                """
+                SELECT id, profile_picture FROM users
+                WHERE profile_picture LIKE '%%uploads/profile_pics/%%'
+                   OR profile_picture ~ %s
+            """,
+                (f"^{AVATAR_PREFIX}{DIGEST_PATTERN.pattern}$",),
+            )
+            for user_id, picture in cur:
+                counts["scanned"] += 1
+                kind, key, exists = index.resolve(picture)
+                if exists:
+                    (referenced_avatars if kind == "avatar" else referenced_legacy).add(key)
+                    counts["ok"] += 1
+                else:
+                    replacement = index.replacement(key) if kind == "legacy" else None
+                    if replacement:
+                        referenced_legacy.add(replacement.rsplit("/", 1)[-1])
+                        counts["repointed"] += 1
+                    else:
+                        counts["reset"] += 1
+                    fixes.append((user_id, replacement or DEFAULT_PICTURE))
+                    if args.verbose:
+                        print(f"  user {user_id}: {picture} -> {replacement or DEFAULT_PICTURE}")
+
+                if len(fixes) >= args.batch_size:
+                    flush(writer, fixes, args.dry_run)
+                    fixes.clear()
+                if counts["scanned"] % args.progress_every == 0:
+                    rate = counts["scanned"] / (time.perf_counter() - started)
+                    print(f"  {counts['scanned']} users scanned ({rate:.0f}/s)", file=sys.stderr)
+        flush(writer, fixes, args.dry_run)
+
+    min_mtime = time.time() - args.min_orphan_age_hours * 3600
+    for path in index.orphans(referenced_legacy, referenced_avatars):
+        try:
+            if os.path.getmtime(path) > min_mtime:
+                counts["recent_unreferenced"] += 1
+                continue
+            counts["orphans"] += 1
+            if args.verbose:
+                print(f"  orphan: {path}")
+            if args.delete_orphans and not args.dry_run:
+                os.remove(path)
+                counts["deleted"] += 1
+        except FileNotFoundError:
+            continue
+
+    prefix = "[dry run] " if args.dry_run else ""
+    print(
+        f"{prefix}Scanned {counts['scanned']} users in {time.perf_counter() - started:.1f}s: "
+        f"{counts['ok']} ok, {counts['repointed']} repointed, {counts['reset']} reset to default; "
+        f"{counts['orphans']} orphaned files ({counts['deleted']} deleted), "
+        f"{counts['recent_unreferenced']} recent unreferenced files skipped"
+    )
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Reconcile profile pictures with uploaded files")
+    parser.add_argument("--dry-run", action="store_true", help="report only, change nothing")
+    parser.add_argument("--delete-orphans", action="store_true", help="delete files no user references")
+    parser.add_argument("--min-orphan-age-hours", type=float, default=24)
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per fetch and per UPDATE")
+    parser.add_argument("--progress-every", type=int, default=100000)
+    parser.add_argument("--verbose", action="store_true", help="print every fix and orphan")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+    reconcile(database_url, args)
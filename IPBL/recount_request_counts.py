@@ -0,0 +1,65 @@
+"""
+Check the per-user request counters (swap_request_counts) against
+swap_requests, and recount them when they disagree.
+
+    python recount_request_counts.py [--dry-run] [--force]
+
+Run it once when deploying onto a database that had requests before the
+counters existed; database/migrations/add_request_counts.sql recounts too.
+Every request is counted exactly once as 'sent', so a mismatch in that total
+means the counters are off. The check scans swap_requests, and the recount
+blocks writes to it until it commits, so neither runs on app startup.
+"""
+import argparse
+import os
+
+import psycopg
+from dotenv import load_dotenv
+
+CHECK_QUERY = """
+    SELECT
+        (SELECT COALESCE(SUM(count), 0) FROM swap_request_counts WHERE direction = 'sent'),
+        (SELECT COUNT(status) FROM swap_requests)
+"""
+
+RECOUNT_QUERY = """
+    INSERT INTO swap_request_counts (user_id, direction, status, count)
+    SELECT receiver_id, 'incoming', status, COUNT(*) FROM swap_requests
+    WHERE status IS NOT NULL GROUP BY receiver_id, status
+    UNION ALL
+    SELECT sender_id, 'sent', status, COUNT(*) FROM swap_requests
+    WHERE status IS NOT NULL GROUP BY sender_id, status
+"""
+
+
+def recount(conn, force=False, dry_run=False):
+    """Recount if needed (or forced); returns (counted, actual) before any recount"""
+    counted, actual = conn.execute(CHECK_QUERY).fetchone()
+    if dry_run or (counted == actual and not force):
+        return counted, actual
+    # Recount while writes are blocked so no change slips in between
+    conn.execute("LOCK TABLE swap_requests IN SHARE MODE")
+    conn.execute("DELETE FROM swap_request_counts")
+    conn.execute(RECOUNT_QUERY)
+    conn.commit()
+    return counted, actual
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Check and rebuild swap request counters")
+    parser.add_argument("--dry-run", action="store_true", help="only compare the totals")
+    parser.add_argument("--force", action="store_true", help="recount even if the totals match")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+
+    with psycopg.connect(database_url) as conn:
+        counted, actual = recount(conn, args.force, args.dry_run)
+    print(f"Counters total {counted} request(s); swap_requests has {actual}")
+    if args.dry_run:
+        print("[dry run] nothing changed")
+    elif counted != actual or args.force:
+        print("Recounted")
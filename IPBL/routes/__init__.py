@@ -6,5 +6,7 @@ from .matching import matching_bp
 from .requests import requests_bp
 from .reviews import reviews_bp
 from .chat import chat_bp
+from .dashboard import dashboard_bp
+from .avatars import avatars_bp
 
-__all__ = ['auth_bp', 'profile_bp', 'skills_bp', 'matching_bp', 'requests_bp', 'reviews_bp', 'chat_bp']
+__all__ = ['auth_bp', 'profile_bp', 'skills_bp', 'matching_bp', 'requests_bp', 'reviews_bp', 'chat_bp', 'dashboard_bp', 'avatars_bp']
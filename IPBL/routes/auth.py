@@ -8,7 +8,9 @@ from utils import (
     validate_password,
     sanitize_input,
 )
-from utils.email_utils import generate_otp, send_verification_email
+from utils.email_utils import generate_otp
+from utils.jobs import enqueue
+from utils.initials_avatar import initials_avatar_url
 from datetime import datetime, timedelta
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
@@ -57,15 +59,7 @@ def send_otp():
         password_hash = hash_password(password)
         
         # Default profile picture
-        names = full_name.strip().split()
-        if len(names) >= 2:
-            initials = f"{names[0][0]}{names[-1][0]}"
-        elif names:
-            initials = names[0][:2]
-        else:
-            initials = "SS"
-        
-        default_pic = f"https://ui-avatars.com/api/?name={initials}&background=random"
+        default_pic = initials_avatar_url(full_name)
         
         # If user exists but not verified, update their info and OTP
         if existing_user:
@@ -73,27 +67,25 @@ def send_otp():
                 "UPDATE users SET password_hash = %s, full_name = %s, profile_picture = %s, email_otp = %s, otp_created_at = %s WHERE email = %s",
                 (password_hash, full_name, default_pic, otp, otp_created_at, email),
             )
+            user_id = existing_user["id"]
         else:
             # Insert new user (unverified)
-            db.execute(
-                "INSERT INTO users (email, password_hash, full_name, profile_picture, email_verified, email_otp, otp_created_at) VALUES (%s, %s, %s, %s, FALSE, %s, %s)",
+            user_id = db.execute(
+                "INSERT INTO users (email, password_hash, full_name, profile_picture, email_verified, email_otp, otp_created_at) VALUES (%s, %s, %s, %s, FALSE, %s, %s) RETURNING id",
                 (email, password_hash, full_name, default_pic, otp, otp_created_at),
-            )
+            ).fetchone()["id"]
         
+        # Send the verification email from the worker, committed with the OTP
+        job_id = enqueue(db, "email.verification", {"user_id": user_id})
         db.commit()
         
-        # Send verification email
-        from app import mail
-        email_sent = send_verification_email(mail, email, otp, full_name)
-        
-        if not email_sent:
-            return jsonify({"error": "Failed to send verification email. Please try again."}), 500
-        
+        # The email is sent later; GET /otp-status reports whether it went out
         return (
             jsonify(
                 {
                     "message": "Verification code sent to your email",
                     "email": email,
+                    "email_job_id": job_id,
                 }
             ),
             200,
@@ -207,21 +199,50 @@ def resend_otp():
             "UPDATE users SET email_otp = %s, otp_created_at = %s WHERE email = %s",
             (otp, otp_created_at, email),
         )
+        job_id = enqueue(db, "email.verification", {"user_id": user["id"]})
         db.commit()
         
-        # Send verification email
-        from app import mail
-        email_sent = send_verification_email(mail, email, otp, user["full_name"])
-        
-        if not email_sent:
-            return jsonify({"error": "Failed to send verification email. Please try again."}), 500
-        
-        return jsonify({"message": "Verification code resent to your email"}), 200
+        return jsonify({"message": "Verification code resent to your email", "email_job_id": job_id}), 200
     
     except Exception as e:
         return jsonify({"error": f"Failed to resend OTP: {str(e)}"}), 500
 
 
+@auth_bp.route("/otp-status", methods=["GET"])
+def otp_status():
+    """
+    Whether the verification email from send-otp/resend-otp went out
+    (?email=...&job_id=<email_job_id>): queued, sending, retrying, sent or
+    failed. A failed email needs a new code from resend-otp.
+    """
+    try:
+        email = sanitize_input(request.args.get("email", ""))
+        job_id = request.args.get("job_id", type=int)
+        if not email or job_id is None:
+            return jsonify({"error": "Email and job_id are required"}), 400
+
+        job = get_db().execute(
+            """
+            SELECT j.status, j.attempts, j.max_attempts, j.run_at FROM jobs j
+            JOIN users u ON u.id = (j.payload->>'user_id')::int
+            WHERE j.id = %s AND j.job_type = 'email.verification' AND u.email = %s
+        """,
+            (job_id, email),
+        ).fetchone()
+        if not job:
+            return jsonify({"error": "Email job not found"}), 404
+
+        status = {"running": "sending", "done": "sent"}.get(job["status"], job["status"])
+        result = {"status": status, "attempts": job["attempts"], "max_attempts": job["max_attempts"]}
+        if status == "queued" and job["attempts"]:
+            result["status"] = "retrying"
+            result["next_attempt_at"] = job["run_at"].isoformat()
+        return jsonify(result), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to get OTP status: {str(e)}"}), 500
+
+
 @auth_bp.route("/login", methods=["POST"])
 def login():
     """User login endpoint"""
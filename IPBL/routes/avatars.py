@@ -0,0 +1,53 @@
+from flask import Blueprint, Response, current_app, jsonify, request, send_from_directory
+from utils.assets import IMMUTABLE_MAX_AGE
+from utils.images import AVATAR_SIZES, DEFAULT_AVATAR_SIZE, DIGEST_PATTERN
+from utils.initials_avatar import MAX_INITIALS, render_initials_svg
+
+avatars_bp = Blueprint("avatars", __name__, url_prefix="/avatars")
+
+INITIALS_MAX_AGE = 30 * 24 * 3600
+PROCESSING_PLACEHOLDER = "…"
+
+
+@avatars_bp.route("/<initials>.svg", methods=["GET"])
+def get_initials_avatar(initials):
+    """Render an initials avatar for users without a photo"""
+    if not 0 < len(initials) <= MAX_INITIALS:
+        return jsonify({"error": "Avatar not found"}), 404
+
+    svg, etag = render_initials_svg(initials.upper())
+    response = Response(svg, mimetype="image/svg+xml")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = INITIALS_MAX_AGE
+    return response.make_conditional(request)
+
+
+@avatars_bp.route("/<digest>", defaults={"size": DEFAULT_AVATAR_SIZE}, methods=["GET"])
+@avatars_bp.route("/<digest>/<int:size>", methods=["GET"])
+def get_avatar(digest, size):
+    """Serve a processed avatar, as WebP when the browser accepts it"""
+    if not DIGEST_PATTERN.fullmatch(digest) or size not in AVATAR_SIZES:
+        return jsonify({"error": "Avatar not found"}), 404
+
+    pipeline = current_app.extensions["avatars"]
+    status = pipeline.status(digest)
+    if status == "missing":
+        return jsonify({"error": "Avatar not found"}), 404
+    if status == "processing":
+        # A fresh upload; show a placeholder rather than hold the request
+        # thread, and have clients come back for the real picture
+        svg, _ = render_initials_svg(PROCESSING_PLACEHOLDER)
+        response = Response(svg, 202, mimetype="image/svg+xml")
+        response.cache_control.no_store = True
+        response.headers["Retry-After"] = "1"
+        return response
+
+    ext = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpg"
+    response = send_from_directory(
+        pipeline.folder, f"{digest}_{size}.{ext}", max_age=IMMUTABLE_MAX_AGE
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept")
+    return response
@@ -1,10 +1,38 @@
 from flask import Blueprint, request, jsonify
+from psycopg.rows import tuple_row
 from database import get_db
 from utils import token_required, sanitize_input
 from utils.encryption import encrypt_message, decrypt_message
+from utils.idempotency import idempotent
+from utils.serialization import Shape, fetch_rows, json_response
+from utils.streaming import streaming_mode, server_cursor_rows, stream_json
 
 chat_bp = Blueprint("chat", __name__, url_prefix="/api/chat")
 
+CONVERSATION = Shape(
+    (
+        "id", "updated_at", "other_user_id", "full_name", "profile_picture",
+        "last_message", "last_message_time", "unread_count",
+    ),
+    computed={
+        "other_user": (
+            lambda user_id, full_name, profile_picture: {
+                "id": user_id,
+                "full_name": full_name,
+                "profile_picture": profile_picture,
+            },
+            "other_user_id", "full_name", "profile_picture",
+        ),
+        "last_message": (lambda content: decrypt_message(content) if content else "", "last_message"),
+    },
+    hidden=("updated_at", "other_user_id", "full_name", "profile_picture"),
+)
+
+MESSAGE = Shape(
+    ("id", "sender_id", "content", "created_at", "is_read", "is_me"),
+    computed={"content": (decrypt_message, "content"), "is_read": (bool, "is_read")},
+)
+
 
 @chat_bp.route("/conversations", methods=["GET"])
 @token_required
@@ -12,7 +40,6 @@ def get_conversations(current_user):
     """Get all conversations for the current user"""
     try:
         user_id = current_user["user_id"]
-        db = get_db()
 
         # Fetch conversations with the other user's details
         query = """
@@ -27,34 +54,8 @@ def get_conversations(current_user):
             ORDER BY c.updated_at DESC
         """
 
-        conversations = db.execute(
-            query, (user_id, user_id, user_id, user_id)
-        ).fetchall()
-
-        result = []
-        for conv in conversations:
-            # Decrypt last message
-            last_msg = conv["last_message"]
-            if last_msg:
-                decrypted_msg = decrypt_message(last_msg)
-            else:
-                decrypted_msg = ""
-
-            result.append(
-                {
-                    "id": conv["id"],
-                    "other_user": {
-                        "id": conv["other_user_id"],
-                        "full_name": conv["full_name"],
-                        "profile_picture": conv["profile_picture"],
-                    },
-                    "last_message": decrypted_msg,
-                    "last_message_time": conv["last_message_time"],
-                    "unread_count": conv["unread_count"],
-                }
-            )
-
-        return jsonify({"conversations": result}), 200
+        conversations = fetch_rows(query, (user_id, user_id, user_id, user_id))
+        return json_response({"conversations": CONVERSATION.rows(conversations)})
 
     except Exception as e:
         return jsonify({"error": f"Failed to fetch conversations: {str(e)}"}), 500
@@ -79,31 +80,22 @@ def get_messages(current_user, conversation_id):
 
         # Mark messages as read
         db.execute(
-            "UPDATE messages SET is_read = TRUE WHERE conversation_id = %s AND sender_id != %s",
+            "UPDATE messages SET is_read = TRUE WHERE conversation_id = %s AND sender_id != %s AND is_read = FALSE",
             (conversation_id, user_id),
         )
         db.commit()
 
-        # Fetch messages
-        messages = db.execute(
-            "SELECT id, sender_id, content, created_at, is_read FROM messages WHERE conversation_id = %s ORDER BY created_at ASC",
-            (conversation_id,),
-        ).fetchall()
-
-        result = []
-        for msg in messages:
-            result.append(
-                {
-                    "id": msg["id"],
-                    "sender_id": msg["sender_id"],
-                    "content": decrypt_message(msg["content"]),
-                    "created_at": msg["created_at"],
-                    "is_read": bool(msg["is_read"]),
-                    "is_me": msg["sender_id"] == user_id,
-                }
-            )
+        query = "SELECT id, sender_id, content, created_at, is_read, sender_id = %s AS is_me FROM messages WHERE conversation_id = %s ORDER BY created_at ASC"
+        params = (user_id, conversation_id)
 
-        return jsonify({"messages": result}), 200
+        mode = streaming_mode()
+        if mode:
+            rows = server_cursor_rows(query, params, row_factory=tuple_row)
+            return stream_json({"messages": MESSAGE.iter_rows(rows)}, mode)
+
+        # Fetch messages
+        messages = fetch_rows(query, params)
+        return json_response({"messages": MESSAGE.rows(messages)})
 
     except Exception as e:
         return jsonify({"error": f"Failed to fetch messages: {str(e)}"}), 500
@@ -111,6 +103,7 @@ def get_messages(current_user, conversation_id):
 
 @chat_bp.route("/send", methods=["POST"])
 @token_required
+@idempotent
 def send_message(current_user):
     """Send a message"""
     try:
@@ -122,43 +115,39 @@ def send_message(current_user):
         if not receiver_id or not content:
             return jsonify({"error": "Receiver ID and content are required"}), 400
 
-        db = get_db()
-
-        # Check if conversation exists
-        conv = db.execute(
-            """
-            SELECT id FROM conversations 
-            WHERE (user1_id = %s AND user2_id = %s) OR (user1_id = %s AND user2_id = %s)
-        """,
-            (sender_id, receiver_id, receiver_id, sender_id),
-        ).fetchone()
+        try:
+            receiver_id = int(receiver_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid receiver ID"}), 400
 
-        if conv:
-            conversation_id = conv["id"]
-            # Update timestamp
-            db.execute(
-                "UPDATE conversations SET updated_at = NOW() WHERE id = %s",
-                (conversation_id,),
-            )
-        else:
-            # Create new conversation
-            cursor = db.execute(
-                "INSERT INTO conversations (user1_id, user2_id) VALUES (%s, %s) RETURNING id",
-                (sender_id, receiver_id),
-            )
-            conversation_id = cursor.fetchone()["id"]
+        if receiver_id == sender_id:
+            return jsonify({"error": "Cannot send a message to yourself"}), 400
 
         # Encrypt message
         encrypted_content = encrypt_message(content)
         if not encrypted_content:
             return jsonify({"error": "Encryption failed"}), 500
 
-        # Insert message
-        db.execute(
-            "INSERT INTO messages (conversation_id, sender_id, content) VALUES (%s, %s, %s)",
-            (conversation_id, sender_id, encrypted_content),
-        )
+        db = get_db()
+
+        # Participants are stored as (smaller id, larger id), so one upsert
+        # finds or creates the conversation and the message goes in with it
+        user1_id, user2_id = sorted((sender_id, receiver_id))
+        sent = db.execute(
+            """
+            WITH conv AS (
+                INSERT INTO conversations (user1_id, user2_id) VALUES (%s, %s)
+                ON CONFLICT (user1_id, user2_id) DO UPDATE SET updated_at = NOW()
+                RETURNING id
+            )
+            INSERT INTO messages (conversation_id, sender_id, content)
+            SELECT id, %s, %s FROM conv
+            RETURNING conversation_id
+        """,
+            (user1_id, user2_id, sender_id, encrypted_content),
+        ).fetchone()
         db.commit()
+        conversation_id = sent["conversation_id"]
 
         return (
             jsonify(
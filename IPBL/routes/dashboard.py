@@ -0,0 +1,99 @@
+from flask import Blueprint, jsonify
+from psycopg.rows import tuple_row
+from database import execute_batch
+from routes.matching import rank_recommendations, recommendations_statement
+from routes.notifications import REQUEST_UPDATES_QUERY, UNREAD_MESSAGES_QUERY
+from routes.profile import PROFILE_USER
+from utils import token_required
+from utils.presence import online_arg
+from utils.serialization import json_response
+
+dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
+
+USER_SKILLS_QUERY = """
+    SELECT s.id, s.name, s.category, us.proficiency_level,
+           us.is_teaching, us.is_learning
+    FROM skills s
+    JOIN user_skills us ON s.id = us.skill_id
+    WHERE us.user_id = %s AND (us.is_teaching = TRUE OR us.is_learning = TRUE)
+"""
+
+# Maintained by trigger, so no scan of swap_requests
+PENDING_COUNTS_QUERY = """
+    SELECT
+        COALESCE(SUM(count) FILTER (WHERE direction = 'incoming'), 0) as incoming,
+        COALESCE(SUM(count) FILTER (WHERE direction = 'sent'), 0) as sent
+    FROM swap_request_counts
+    WHERE user_id = %s AND status = 'pending'
+"""
+
+
+@dashboard_bp.route("/bootstrap", methods=["GET"])
+@token_required
+def bootstrap(current_user):
+    """
+    Get everything the dashboard needs in a single response. Recommendations
+    are the same as /api/matching/recommendations (?online=only|first).
+    """
+    try:
+        user_id = current_user["user_id"]
+        try:
+            online = online_arg(default="first")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # None of these queries depend on each other, so they are sent in one
+        # pipeline and share a single round trip to the database.
+        (
+            user_cur,
+            skills_cur,
+            recommendations_cur,
+            requests_cur,
+            unread_cur,
+            updates_cur,
+        ) = execute_batch(
+            [
+                (f"SELECT {PROFILE_USER.select_list()} FROM users WHERE id = %s", (user_id,)),
+                (USER_SKILLS_QUERY, (user_id,)),
+                recommendations_statement(user_id),
+                (PENDING_COUNTS_QUERY, (user_id,)),
+                (UNREAD_MESSAGES_QUERY, (user_id, user_id, user_id)),
+                (REQUEST_UPDATES_QUERY, (user_id,)),
+            ],
+            row_factory=tuple_row,
+        )
+
+        user = user_cur.fetchone()
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        teaching_skills = []
+        learning_skills = []
+        for skill_id, name, category, proficiency_level, is_teaching, is_learning in skills_cur:
+            skill = {
+                "id": skill_id,
+                "name": name,
+                "category": category,
+                "proficiency_level": proficiency_level,
+            }
+            if is_teaching:
+                teaching_skills.append(skill)
+            if is_learning:
+                learning_skills.append(skill)
+
+        incoming, sent = requests_cur.fetchone()
+
+        return json_response(
+            {
+                "user": PROFILE_USER.row(user),
+                "teaching_skills": teaching_skills,
+                "learning_skills": learning_skills,
+                "recommendations": rank_recommendations(recommendations_cur.fetchall(), online),
+                "pending_requests": {"incoming": incoming, "sent": sent},
+                "unread_messages": unread_cur.fetchone()[0],
+                "request_updates": updates_cur.fetchone()[0],
+            }
+        )
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to load dashboard: {str(e)}"}), 500
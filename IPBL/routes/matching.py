@@ -1,89 +1,165 @@
 from flask import Blueprint, request, jsonify
-from database import get_db
+from psycopg.rows import tuple_row
 from utils import get_profile_picture_url
+from utils.cache import cached
+from utils.presence import online_arg, online_ranking, rank_by_presence
+from utils.serialization import Shape, fetch_rows, fields_arg, json_response
+from utils.singleflight import coalesce
+from utils.streaming import streaming_mode, server_cursor_rows, stream_json
 
 matching_bp = Blueprint("matching", __name__, url_prefix="/api/matching")
 
-
-@matching_bp.route("/find-teachers", methods=["GET"])
-def find_teachers():
-    """Find users who teach a specific skill"""
+RECOMMENDATION_LIMIT = 20
+# Candidates ranked by presence before the top RECOMMENDATION_LIMIT are kept
+RECOMMENDATION_CANDIDATES = 100
+
+
+def _skill_tags():
+    return [f"skill:{request.args.get('skill_id')}"]
+
+
+PROFILE_PICTURE = (get_profile_picture_url, "profile_picture", "full_name")
+
+USER_SQL = {
+    "id": "u.id",
+    "full_name": "u.full_name",
+    "bio": "u.bio",
+    "profile_picture": "u.profile_picture",
+    "location": "u.location",
+    "availability": "u.availability",
+    "proficiency_level": "us.proficiency_level",
+    "skill_id": "s.id",
+    "skill_name": "s.name",
+    "category": "s.category",
+}
+
+# Teachers and learners of a skill
+SKILL_USER = Shape(
+    (
+        "id", "full_name", "bio", "profile_picture", "location", "availability",
+        "proficiency_level", "skill_name", "category",
+    ),
+    computed={"profile_picture": PROFILE_PICTURE},
+    sql=USER_SQL,
+)
+
+RECOMMENDATION = Shape(
+    (
+        "id", "full_name", "bio", "profile_picture", "location",
+        "skill_id", "skill_name", "category", "proficiency_level",
+    ),
+    computed={"profile_picture": PROFILE_PICTURE},
+    sql=USER_SQL,
+)
+
+# Name search results, shaped like SKILL_USER for the UI
+USER_SEARCH = Shape(
+    ("id", "full_name", "bio", "profile_picture", "location", "availability", "teaching_skills"),
+    computed={
+        "profile_picture": PROFILE_PICTURE,
+        # No single skill here, so show what they teach
+        "proficiency_level": (lambda: "N/A",),
+        "skill_name": (lambda skills: skills or "No listed skills", "teaching_skills"),
+    },
+    hidden=("teaching_skills",),
+    sql={
+        **USER_SQL,
+        # Only run when skill_name is asked for
+        "teaching_skills": """(SELECT STRING_AGG(s.name, ', ')
+                 FROM user_skills us2
+                 JOIN skills s ON us2.skill_id = s.id
+                 WHERE us2.user_id = u.id AND us2.is_teaching = TRUE)""",
+    },
+)
+
+# (user_id, skill_id) is unique in user_skills, so every user appears once
+# per skill without a DISTINCT (which would also need the ORDER BY columns
+# in the SELECT list)
+SKILL_USERS_QUERY = """
+    SELECT {columns}
+    FROM users u
+    JOIN user_skills us ON u.id = us.user_id
+    JOIN skills s ON us.skill_id = s.id
+    WHERE us.skill_id = %s AND us.{role} = TRUE
+    ORDER BY {order}
+"""
+
+
+# Teachers for the skills a user wants to learn, best match first; shared
+# with the dashboard bootstrap. (user, skill) pairs are unique, as above
+RECOMMENDATIONS_QUERY = """
+    SELECT {columns}
+    FROM users u
+    JOIN user_skills us ON u.id = us.user_id
+    JOIN skills s ON us.skill_id = s.id
+    WHERE us.skill_id IN (
+        SELECT skill_id FROM user_skills
+        WHERE user_id = %s AND is_learning = TRUE
+    )
+    AND us.is_teaching = TRUE
+    AND u.id != %s
+    ORDER BY us.proficiency_level DESC, u.full_name
+    LIMIT %s
+"""
+
+
+def recommendations_statement(user_id, shape=RECOMMENDATION):
+    """(query, params) for the recommendation candidates of user_id, for rank_recommendations()"""
+    query = RECOMMENDATIONS_QUERY.format(columns=shape.select_list())
+    return query, (user_id, user_id, RECOMMENDATION_CANDIDATES)
+
+
+def rank_recommendations(rows, online, shape=RECOMMENDATION):
+    """The top RECOMMENDATION_LIMIT candidates, online teachers first (or only)"""
+    return rank_by_presence(shape.rows(rows), online)[:RECOMMENDATION_LIMIT]
+
+
+def _skill_users(list_key, role, order):
+    """Teachers or learners of ?skill_id=, with only the ?fields= asked for"""
+    skill_id = request.args.get("skill_id")
+
+    if not skill_id:
+        return jsonify({"error": "skill_id parameter is required"}), 400
     try:
-        skill_id = request.args.get("skill_id")
+        shape = SKILL_USER.project(fields_arg(SKILL_USER.fields))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        if not skill_id:
-            return jsonify({"error": "skill_id parameter is required"}), 400
+    query = SKILL_USERS_QUERY.format(columns=shape.select_list(), role=role, order=order)
 
-        db = get_db()
+    # Large result sets can be streamed straight from a server-side cursor
+    mode = streaming_mode()
+    if mode:
+        rows = server_cursor_rows(query, (skill_id,), row_factory=tuple_row)
+        return stream_json({list_key: shape.iter_rows(rows)}, mode)
 
-        # Find teachers for this skill
-        teachers = db.execute(
-            """
-            SELECT DISTINCT
-                u.id, u.full_name, u.bio, u.profile_picture, u.location, u.availability,
-                us.proficiency_level,
-                s.name as skill_name, s.category
-            FROM users u
-            JOIN user_skills us ON u.id = us.user_id
-            JOIN skills s ON us.skill_id = s.id
-            WHERE us.skill_id = %s AND us.is_teaching = TRUE
-            ORDER BY us.proficiency_level DESC, u.full_name
-        """,
-            (skill_id,),
-        ).fetchall()
+    rows = fetch_rows(query, (skill_id,))
+    return json_response({list_key: shape.rows(rows)})
 
-        # Process profile pictures
-        teachers_list = []
-        for teacher in teachers:
-            teacher_dict = dict(teacher)
-            teacher_dict["profile_picture"] = get_profile_picture_url(
-                teacher["profile_picture"], teacher["full_name"]
-            )
-            teachers_list.append(teacher_dict)
 
-        return jsonify({"teachers": teachers_list}), 200
+@matching_bp.route("/find-teachers", methods=["GET"])
+@online_ranking("teachers")
+@cached(tags=_skill_tags, ignore_args=("online",))
+@coalesce
+def find_teachers():
+    """
+    Find users who teach a specific skill (?online=only|first to prefer
+    online teachers, ?fields=id,full_name,... for only some fields)
+    """
+    try:
+        return _skill_users("teachers", "is_teaching", "us.proficiency_level DESC, u.full_name")
 
     except Exception as e:
         return jsonify({"error": f"Failed to find teachers: {str(e)}"}), 500
 
 
 @matching_bp.route("/find-learners", methods=["GET"])
+@cached(tags=_skill_tags)
+@coalesce
 def find_learners():
-    """Find users who want to learn a specific skill"""
+    """Find users who want to learn a specific skill (?fields= as for find-teachers)"""
     try:
-        skill_id = request.args.get("skill_id")
-
-        if not skill_id:
-            return jsonify({"error": "skill_id parameter is required"}), 400
-
-        db = get_db()
-
-        # Find learners for this skill
-        learners = db.execute(
-            """
-            SELECT DISTINCT
-                u.id, u.full_name, u.bio, u.profile_picture, u.location, u.availability,
-                us.proficiency_level,
-                s.name as skill_name, s.category
-            FROM users u
-            JOIN user_skills us ON u.id = us.user_id
-            JOIN skills s ON us.skill_id = s.id
-            WHERE us.skill_id = %s AND us.is_learning = TRUE
-            ORDER BY u.full_name
-        """,
-            (skill_id,),
-        ).fetchall()
-
-        # Process profile pictures
-        learners_list = []
-        for learner in learners:
-            learner_dict = dict(learner)
-            learner_dict["profile_picture"] = get_profile_picture_url(
-                learner["profile_picture"], learner["full_name"]
-            )
-            learners_list.append(learner_dict)
-
-        return jsonify({"learners": learners_list}), 200
+        return _skill_users("learners", "is_learning", "u.full_name")
 
     except Exception as e:
         return jsonify({"error": f"Failed to find learners: {str(e)}"}), 500
@@ -98,52 +174,16 @@ def get_recommendations():
     def _get_recommendations(current_user):
         try:
             user_id = current_user["user_id"]
-            db = get_db()
-
-            # Get skills the user wants to learn
-            learning_skills = db.execute(
-                """
-                SELECT skill_id FROM user_skills
-                WHERE user_id = %s AND is_learning = TRUE
-            """,
-                (user_id,),
-            ).fetchall()
-
-            if not learning_skills:
-                return jsonify({"recommendations": []}), 200
-
-            skill_ids = [skill["skill_id"] for skill in learning_skills]
-            placeholders = ",".join("%s" * len(skill_ids))
-
-            # Find teachers for these skills
-            recommendations = db.execute(
-                f"""
-                SELECT DISTINCT
-                    u.id, u.full_name, u.bio, u.profile_picture, u.location,
-                    s.id as skill_id, s.name as skill_name, s.category,
-                    us.proficiency_level
-                FROM users u
-                JOIN user_skills us ON u.id = us.user_id
-                JOIN skills s ON us.skill_id = s.id
-                WHERE us.skill_id IN ({placeholders})
-                AND us.is_teaching = TRUE
-                AND u.id != %s
-                ORDER BY us.proficiency_level DESC, u.full_name
-                LIMIT 20
-            """,
-                (*skill_ids, user_id),
-            ).fetchall()
-
-            # Process profile pictures
-            recommendations_list = []
-            for rec in recommendations:
-                rec_dict = dict(rec)
-                rec_dict["profile_picture"] = get_profile_picture_url(
-                    rec["profile_picture"], rec["full_name"]
-                )
-                recommendations_list.append(rec_dict)
-
-            return jsonify({"recommendations": recommendations_list}), 200
+            try:
+                # Teachers who are online now come first unless asked otherwise
+                online = online_arg(default="first")
+                shape = RECOMMENDATION.project(fields_arg(RECOMMENDATION.fields))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            query, params = recommendations_statement(user_id, shape)
+            ranked = rank_recommendations(fetch_rows(query, params), online, shape)
+            return json_response({"recommendations": ranked})
 
         except Exception as e:
             return jsonify({"error": f"Failed to get recommendations: {str(e)}"}), 500
@@ -152,50 +192,35 @@ def get_recommendations():
 
 
 @matching_bp.route("/search-by-name", methods=["GET"])
+@coalesce
 def search_by_name():
-    """Search for users by name"""
+    """Search for users by name (?fields= as for find-teachers)"""
     try:
         query = request.args.get("query")
 
         if not query:
             return jsonify({"error": "query parameter is required"}), 400
 
-        db = get_db()
+        try:
+            shape = USER_SEARCH.project(fields_arg(USER_SEARCH.fields))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
         search_term = f"%{query}%"
 
         # specific query to get users by name
-        users = db.execute(
-            """
-            SELECT 
-                u.id, u.full_name, u.bio, u.profile_picture, u.location, u.availability,
-                (SELECT STRING_AGG(s.name, ', ') 
-                 FROM user_skills us2 
-                 JOIN skills s ON us2.skill_id = s.id 
-                 WHERE us2.user_id = u.id AND us2.is_teaching = TRUE) as teaching_skills
+        users = fetch_rows(
+            f"""
+            SELECT {shape.select_list()}
             FROM users u
             WHERE u.full_name LIKE %s
             ORDER BY u.full_name
             LIMIT 50
         """,
             (search_term,),
-        ).fetchall()
-
-        users_list = []
-        for user in users:
-            user_dict = dict(user)
-            user_dict["profile_picture"] = get_profile_picture_url(
-                user["profile_picture"], user["full_name"]
-            )
-            # Add a dummy proficiency level for the UI compatibility or handle it in UI
-            user_dict["proficiency_level"] = "N/A"
-            # Use teaching skills as skill name for context
-            user_dict["skill_name"] = (
-                user_dict.pop("teaching_skills") or "No listed skills"
-            )
-
-            users_list.append(user_dict)
-
-        return jsonify({"users": users_list}), 200
+        )
+
+        return json_response({"users": shape.rows(users)})
 
     except Exception as e:
         return jsonify({"error": f"Failed to search users: {str(e)}"}), 500
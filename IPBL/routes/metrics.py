@@ -0,0 +1,14 @@
+from flask import Blueprint, Response, current_app, jsonify, request
+from utils.metrics import generate_latest
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose metrics in the Prometheus text format"""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return jsonify({"error": "Unauthorized"}), 401
+
+    return Response(generate_latest(), mimetype="text/plain; version=0.0.4")
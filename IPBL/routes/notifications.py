@@ -1,9 +1,36 @@
 from flask import Blueprint, jsonify
-from database import get_db
+from database import execute_batch
 from utils import token_required
 
 notifications_bp = Blueprint("notifications", __name__, url_prefix="/api/notifications")
 
+# Shared with the async long-poll endpoints in asgi.py
+
+# Since messages table doesn't have receiver_id, we infer it from conversation
+# We want messages in conversations where I am a participant, but NOT the sender, and is_read=0
+UNREAD_MESSAGES_QUERY = """
+    SELECT COUNT(*) as count
+    FROM messages m
+    JOIN conversations c ON m.conversation_id = c.id
+    WHERE (c.user1_id = %s OR c.user2_id = %s)
+    AND m.sender_id != %s
+    AND m.is_read = FALSE
+"""
+
+# Counter maintained by trigger
+PENDING_REQUESTS_QUERY = """
+    SELECT COALESCE(SUM(count), 0) as count
+    FROM swap_request_counts
+    WHERE user_id = %s AND direction = 'incoming' AND status = 'pending'
+"""
+
+# Unseen status changes on my requests
+REQUEST_UPDATES_QUERY = """
+    SELECT COUNT(*) as count
+    FROM request_events
+    WHERE recipient_id = %s AND is_read = FALSE
+"""
+
 
 @notifications_bp.route("/check", methods=["GET"])
 @token_required
@@ -11,62 +38,25 @@ def check_notifications(current_user):
     """Check for new messages and requests"""
     try:
         user_id = current_user["user_id"]
-        db = get_db()
 
-        # 1. Count unread messages
-        # Since messages table doesn't have receiver_id, we infer it from conversation
-        # We want messages in conversations where I am a participant, but NOT the sender, and is_read=0
-        unread_messages_count = db.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM messages m
-            JOIN conversations c ON m.conversation_id = c.id
-            WHERE (c.user1_id = %s OR c.user2_id = %s)
-            AND m.sender_id != %s
-            AND m.is_read = FALSE
-        """,
-            (user_id, user_id, user_id),
-        ).fetchone()["count"]
-
-        # 2. Count pending requests
-        pending_requests_count = db.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM swap_requests
-            WHERE receiver_id = %s AND status = 'pending'
-        """,
-            (user_id,),
-        ).fetchone()["count"]
-
-        # Optional: Get latest unread message for Toast content
-        latest_message = None
-        if unread_messages_count > 0:
-            msg = db.execute(
-                """
-                SELECT m.content, u.full_name
-                FROM messages m
-                JOIN conversations c ON m.conversation_id = c.id
-                JOIN users u ON m.sender_id = u.id
-                WHERE (c.user1_id = %s OR c.user2_id = %s)
-                AND m.sender_id != %s
-                AND m.is_read = FALSE
-                ORDER BY m.created_at DESC
-                LIMIT 1
-            """,
-                (user_id, user_id, user_id),
-            ).fetchone()
-
-            if msg:
-                # Decrypt message content (assuming encryption is utilized but not defined here clearly)
-                # For now returning raw (or handle decryption if imports allow)
-                # Need to import decrypt_message
-                pass
+        # The counts are independent, so they share one round trip
+        unread_cur, pending_cur, updates_cur = execute_batch(
+            [
+                (UNREAD_MESSAGES_QUERY, (user_id, user_id, user_id)),
+                (PENDING_REQUESTS_QUERY, (user_id,)),
+                (REQUEST_UPDATES_QUERY, (user_id,)),
+            ]
+        )
+        unread_messages_count = unread_cur.fetchone()["count"]
+        pending_requests_count = pending_cur.fetchone()["count"]
+        request_updates_count = updates_cur.fetchone()["count"]
 
         return (
             jsonify(
                 {
                     "unread_messages": unread_messages_count,
                     "pending_requests": pending_requests_count,
+                    "request_updates": request_updates_count,
                 }
             ),
             200,
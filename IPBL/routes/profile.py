@@ -1,86 +1,181 @@
-from flask import Blueprint, request, jsonify
-from database import get_db
-from utils import token_required, sanitize_input
+from flask import Blueprint, current_app, request, jsonify
+from psycopg.rows import tuple_row
+from database import get_db, execute_batch
+from utils import token_required, sanitize_input, get_profile_picture_url
+from utils.cache import cached, cached_items, invalidate_tags
+from utils.serialization import Shape, dumps, fields_arg, ids_arg, json_items_response, json_response
+from utils.singleflight import coalesce
 
 profile_bp = Blueprint("profile", __name__, url_prefix="/api/profile")
 
+PROFILE_USER = Shape(
+    ("id", "email", "full_name", "bio", "profile_picture", "location", "availability", "created_at"),
+    computed={
+        # Processed upload, existing file, or an initials avatar
+        "profile_picture": (
+            lambda picture, name: get_profile_picture_url(picture, name, size=256),
+            "profile_picture",
+            "full_name",
+        )
+    },
+)
+
+SKILL = Shape(("id", "name", "category", "proficiency_level"))
+
+SKILL_QUERIES = {
+    # Skills they teach
+    "teaching_skills": """
+        SELECT s.id, s.name, s.category, us.proficiency_level
+        FROM skills s
+        JOIN user_skills us ON s.id = us.skill_id
+        WHERE us.user_id = %s AND us.is_teaching = TRUE
+    """,
+    # Skills they want to learn
+    "learning_skills": """
+        SELECT s.id, s.name, s.category, us.proficiency_level
+        FROM skills s
+        JOIN user_skills us ON s.id = us.skill_id
+        WHERE us.user_id = %s AND us.is_learning = TRUE
+    """,
+}
+
+PROFILE_FIELDS = PROFILE_USER.fields + tuple(SKILL_QUERIES)
+
+MAX_BATCH_PROFILES = 200
+# Cards don't need email, and a batch shouldn't hand out hundreds of them
+BATCH_PROFILE_FIELDS = tuple(name for name in PROFILE_FIELDS if name != "email")
+
+# Both skill lists of many users, one row per user with each list already
+# encoded as JSON (keys in the same order as SKILL)
+BATCH_SKILLS_QUERY = """
+    SELECT us.user_id,
+           COALESCE(json_agg(json_build_object(
+               'id', s.id, 'name', s.name, 'category', s.category,
+               'proficiency_level', us.proficiency_level
+           )) FILTER (WHERE us.is_teaching), '[]')::text AS teaching_skills,
+           COALESCE(json_agg(json_build_object(
+               'id', s.id, 'name', s.name, 'category', s.category,
+               'proficiency_level', us.proficiency_level
+           )) FILTER (WHERE us.is_learning), '[]')::text AS learning_skills
+    FROM user_skills us
+    JOIN skills s ON s.id = us.skill_id
+    WHERE us.user_id = ANY(%s)
+    GROUP BY us.user_id
+"""
+
+
+def _profile_cache_tags(db, user_id):
+    """Tags of every cached response that shows this user's profile"""
+    rows = db.execute(
+        """
+        SELECT 'skill:' || skill_id AS tag FROM user_skills WHERE user_id = %s
+        UNION
+        SELECT 'reviews:' || reviewed_id FROM reviews WHERE reviewer_id = %s
+    """,
+        (user_id, user_id),
+    ).fetchall()
+    return [f"user:{user_id}"] + [row["tag"] for row in rows]
+
 
 @profile_bp.route("/<int:user_id>", methods=["GET"])
+@cached(tags=lambda user_id: [f"user:{user_id}"])
+@coalesce
 def get_profile(user_id):
-    """Get user profile by ID"""
+    """
+    Get user profile by ID.
+
+    ?fields= picks user fields and whether to include teaching_skills and
+    learning_skills, e.g. ?fields=full_name,profile_picture skips both skill
+    queries.
+    """
     try:
-        db = get_db()
+        try:
+            fields = fields_arg(PROFILE_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if fields is None:
+            shape, skill_lists = PROFILE_USER, list(SKILL_QUERIES)
+        else:
+            shape = PROFILE_USER.project([name for name in fields if name in PROFILE_USER.fields])
+            skill_lists = [name for name in SKILL_QUERIES if name in fields]
+
+        # User info and the skill lists asked for in one round trip
+        user_cur, *skill_curs = execute_batch(
+            [(f"SELECT {shape.select_list()} FROM users WHERE id = %s", (user_id,))]
+            + [(SKILL_QUERIES[name], (user_id,)) for name in skill_lists],
+            row_factory=tuple_row,
+        )
 
-        # Get user info
-        user = db.execute(
-            "SELECT id, email, full_name, bio, profile_picture, location, availability, created_at FROM users WHERE id = %s",
-            (user_id,),
-        ).fetchone()
+        user = user_cur.fetchone()
 
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        # Get user's skills they teach
-        teaching_skills = db.execute(
-            """
-            SELECT s.id, s.name, s.category, us.proficiency_level
-            FROM skills s
-            JOIN user_skills us ON s.id = us.skill_id
-            WHERE us.user_id = %s AND us.is_teaching = TRUE
-        """,
-            (user_id,),
-        ).fetchall()
-
-        # Get user's skills they want to learn
-        learning_skills = db.execute(
-            """
-            SELECT s.id, s.name, s.category, us.proficiency_level
-            FROM skills s
-            JOIN user_skills us ON s.id = us.skill_id
-            WHERE us.user_id = %s AND us.is_learning = TRUE
-        """,
-            (user_id,),
-        ).fetchall()
-
-        # Handle default profile picture for existing users
-        profile_pic = user["profile_picture"]
-        if not profile_pic or profile_pic == "default-avatar.png":
-            # Generate initials
-            names = user["full_name"].strip().split()
-            if len(names) >= 2:
-                initials = f"{names[0][0]}{names[-1][0]}"
-            elif names:
-                initials = names[0][:2]
-            else:
-                initials = "SS"
-            profile_pic = (
-                f"https://ui-avatars.com/api/?name={initials}&background=random"
-            )
+        result = {"user": shape.row(user)}
+        for name, cur in zip(skill_lists, skill_curs):
+            result[name] = SKILL.rows(cur.fetchall())
 
-        return (
-            jsonify(
-                {
-                    "user": {
-                        "id": user["id"],
-                        "email": user["email"],
-                        "full_name": user["full_name"],
-                        "bio": user["bio"],
-                        "profile_picture": profile_pic,
-                        "location": user["location"],
-                        "availability": user["availability"],
-                        "created_at": user["created_at"],
-                    },
-                    "teaching_skills": [dict(skill) for skill in teaching_skills],
-                    "learning_skills": [dict(skill) for skill in learning_skills],
-                }
-            ),
-            200,
-        )
+        return json_response(result)
 
     except Exception as e:
         return jsonify({"error": f"Failed to fetch profile: {str(e)}"}), 500
 
 
+def _load_profiles(user_ids, shape, skill_lists):
+    """user id -> profile as JSON text, for the users that exist"""
+    statements = [(f"SELECT {shape.select_list()} FROM users WHERE id = ANY(%s)", (user_ids,))]
+    if skill_lists:
+        statements.append((BATCH_SKILLS_QUERY, (user_ids,)))
+    users_cur, *skills_cur = execute_batch(statements, row_factory=tuple_row)
+
+    skills = {}
+    if skills_cur:
+        for user_id, teaching, learning in skills_cur[0].fetchall():
+            skills[user_id] = {"teaching_skills": teaching, "learning_skills": learning}
+
+    profiles = {}
+    for user in users_cur.fetchall():
+        user_id = user[0]  # id is always the first column
+        parts = [f'"user":{dumps(shape.row(user))}']
+        user_skills = skills.get(user_id, {})
+        parts += [f'"{name}":{user_skills.get(name, "[]")}' for name in skill_lists]
+        profiles[user_id] = "{" + ",".join(parts) + "}"
+    return profiles
+
+
+@profile_bp.route("/batch", methods=["GET"])
+def get_profiles_batch():
+    """
+    Profiles of many users at once: ?ids=1,2,3 (up to MAX_BATCH_PROFILES).
+
+    Returns {"profiles": {id: profile}} with each profile shaped like
+    get_profile's response, minus email; unknown ids are left out. ?fields=
+    works as for get_profile. Each profile is cached on its own.
+    """
+    try:
+        try:
+            user_ids = ids_arg("ids", MAX_BATCH_PROFILES)
+            fields = fields_arg(BATCH_PROFILE_FIELDS) or BATCH_PROFILE_FIELDS
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        shape = PROFILE_USER.project([name for name in fields if name in PROFILE_USER.fields])
+        skill_lists = [name for name in SKILL_QUERIES if name in fields]
+
+        profiles = cached_items(
+            f"profile:{','.join(fields)}",
+            user_ids,
+            lambda user_id: f"user:{user_id}",
+            lambda missing: _load_profiles(missing, shape, skill_lists),
+            label="profile",
+        )
+        return json_items_response(
+            "profiles", ((user_id, profiles[user_id]) for user_id in user_ids if user_id in profiles)
+        )
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch profiles: {str(e)}"}), 500
+
+
 @profile_bp.route("/update", methods=["PUT"])
 @token_required
 def update_profile(current_user):
@@ -116,25 +211,15 @@ def update_profile(current_user):
         if "profile_picture" in request.files:
             file = request.files["profile_picture"]
             if file and file.filename != "":
-                import os
-                from werkzeug.utils import secure_filename
-
-                filename = secure_filename(file.filename)
-                # Ensure unique filename
-                import uuid
-
-                unique_filename = f"{uuid.uuid4().hex}_{filename}"
-
-                # Save path
-                upload_folder = "static/uploads/profile_pics"
-                if not os.path.exists(upload_folder):
-                    os.makedirs(upload_folder)
-
-                file.save(os.path.join(upload_folder, unique_filename))
+                # Validated now, resized into avatar sizes in the background
+                try:
+                    picture = current_app.extensions["avatars"].store(file.read())
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
 
                 # Update DB path
                 update_fields.append("profile_picture = %s")
-                params.append(f"/{upload_folder}/{unique_filename}")
+                params.append(picture)
 
         # Build update query dynamically
         # update_fields and params are already initialized above
@@ -166,6 +251,7 @@ def update_profile(current_user):
         query = f"UPDATE users SET {', '.join(update_fields)} WHERE id = %s"
         db.execute(query, params)
         db.commit()
+        invalidate_tags(*_profile_cache_tags(db, user_id))
 
         # Fetch updated user
         updated_user = db.execute(
@@ -243,6 +329,7 @@ def add_skill(current_user):
             )
 
         db.commit()
+        invalidate_tags(f"user:{user_id}", f"skill:{skill_id}")
 
         return jsonify({"message": "Skill added successfully"}), 201
 
@@ -263,6 +350,7 @@ def remove_skill(current_user, skill_id):
             (user_id, skill_id),
         )
         db.commit()
+        invalidate_tags(f"user:{user_id}", f"skill:{skill_id}")
 
         return jsonify({"message": "Skill removed successfully"}), 200
 
@@ -1,12 +1,42 @@
-from flask import Blueprint, request, jsonify
-from database import get_db
+import base64
+from datetime import datetime
+
+import psycopg
+from flask import Blueprint, current_app, request, jsonify
+from psycopg.rows import tuple_row
+from database import get_db, execute_batch
 from utils import token_required, sanitize_input, get_profile_picture_url
+from utils.idempotency import idempotent
+from utils.serialization import Shape, fields_arg, json_response
+from utils.streaming import streaming_mode, server_cursor_rows, stream_json
 
 requests_bp = Blueprint("requests", __name__, url_prefix="/api/requests")
 
 
+INSERT_REQUEST_QUERY = """
+    INSERT INTO swap_requests (sender_id, receiver_id, skill_id, message)
+    VALUES (%s, %s, %s, %s)
+    RETURNING id
+"""
+
+# The partial unique index on pending requests rejects duplicates, even when
+# two clicks race each other
+CREATE_REQUEST_QUERY = """
+    INSERT INTO swap_requests (sender_id, receiver_id, skill_id, message)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (sender_id, receiver_id, skill_id) WHERE status = 'pending' DO NOTHING
+    RETURNING id
+"""
+
+PENDING_REQUEST_QUERY = """
+    SELECT id FROM swap_requests
+    WHERE sender_id = %s AND receiver_id = %s AND skill_id = %s AND status = 'pending'
+"""
+
+
 @requests_bp.route("/", methods=["POST"])
 @token_required
+@idempotent
 def create_request(current_user):
     """Create a new swap request"""
     try:
@@ -24,97 +54,319 @@ def create_request(current_user):
             return jsonify({"error": "Cannot request swap with yourself"}), 400
 
         db = get_db()
+        params = (sender_id, receiver_id, skill_id, message)
+
+        try:
+            created = db.execute(CREATE_REQUEST_QUERY, params).fetchone()
+        except psycopg.errors.InvalidColumnReference:
+            # idx_swap_requests_one_pending is missing (schema.sql couldn't
+            # create it over existing duplicates), so ON CONFLICT has nothing
+            # to match. Keep requests working, without the race protection
+            db.rollback()
+            current_app.logger.error(
+                "idx_swap_requests_one_pending is missing; run "
+                "database/migrations/dedupe_requests_and_conversations.sql"
+            )
+            existing = db.execute(PENDING_REQUEST_QUERY, params[:3]).fetchone()
+            created = None if existing else db.execute(INSERT_REQUEST_QUERY, params).fetchone()
 
-        # Check if request already exists
-        existing = db.execute(
-            """
-            SELECT id FROM swap_requests 
-            WHERE sender_id = %s AND receiver_id = %s AND skill_id = %s AND status = 'pending'
-        """,
-            (sender_id, receiver_id, skill_id),
-        ).fetchone()
+        db.commit()
 
-        if existing:
+        if not created:
             return jsonify({"error": "Pending request already exists"}), 409
 
-        # Create request
-        db.execute(
-            """
-            INSERT INTO swap_requests (sender_id, receiver_id, skill_id, message)
-            VALUES (%s, %s, %s, %s)
-        """,
-            (sender_id, receiver_id, skill_id, message),
+        return (
+            jsonify({"message": "Swap request sent successfully", "request_id": created["id"]}),
+            201,
         )
 
-        db.commit()
-
-        return jsonify({"message": "Swap request sent successfully"}), 201
-
     except Exception as e:
         return jsonify({"error": f"Failed to create request: {str(e)}"}), 500
 
 
+REQUEST_STATUSES = ("pending", "accepted", "rejected", "completed", "expired")
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# direction -> (column holding the current user, prefix for the other party)
+DIRECTIONS = {
+    "incoming": ("receiver_id", "sender"),
+    "sent": ("sender_id", "receiver"),
+}
+
+
+def _request_shape(other):
+    return Shape(
+        (
+            "id", "status", "message", "created_at", "updated_at",
+            f"{other}_id", f"{other}_name", f"{other}_pic", "skill_name",
+        ),
+        computed={f"{other}_pic": (get_profile_picture_url, f"{other}_pic", f"{other}_name")},
+        sql={
+            "id": "r.id",
+            "status": "r.status",
+            "message": "r.message",
+            "created_at": "r.created_at",
+            "updated_at": "r.updated_at",
+            f"{other}_id": "u.id",
+            f"{other}_name": "u.full_name",
+            f"{other}_pic": "u.profile_picture",
+            "skill_name": "s.name",
+        },
+    )
+
+
+# direction -> the fields of its requests
+REQUEST_SHAPES = {direction: _request_shape(other) for direction, (_, other) in DIRECTIONS.items()}
+# Every field either direction has, for ?fields=
+REQUEST_FIELDS = tuple(
+    dict.fromkeys(name for shape in REQUEST_SHAPES.values() for name in shape.fields)
+)
+
+# The joins are only added for the columns that need them (both foreign
+# keys are NOT NULL, so leaving one out never changes which rows match)
+REQUESTS_QUERY = """
+    SELECT {columns}
+    FROM swap_requests r{joins}
+    WHERE r.{owner} = %s{filters}
+    ORDER BY {order}
+"""
+USER_JOIN = "\n    JOIN users u ON r.{other}_id = u.id"
+SKILL_JOIN = "\n    JOIN skills s ON r.skill_id = s.id"
+
+COUNTS_QUERY = """
+    SELECT direction, status, count FROM swap_request_counts WHERE user_id = %s
+"""
+
+# Changes committed by transactions that started just before this one carry
+# an earlier updated_at, so the sync point trails the clock a little; the
+# client merges by id, so seeing a change twice is harmless
+SYNC_TIME_QUERY = "SELECT LOCALTIMESTAMP - INTERVAL '5 seconds' AS synced_at"
+
+MARK_EVENTS_READ_QUERY = """
+    UPDATE request_events SET is_read = TRUE WHERE recipient_id = %s AND is_read = FALSE
+"""
+
+
+def _encode_cursor(created_at, request_id):
+    value = f"{created_at.isoformat()}|{request_id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        created_at, _, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+        return datetime.fromisoformat(created_at), int(request_id)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def _parse_list_args(args):
+    """Validate the query string of GET /api/requests/ (raises ValueError)"""
+    direction = args.get("direction")
+    if direction and direction not in DIRECTIONS:
+        raise ValueError("direction must be 'incoming' or 'sent'")
+    directions = [direction] if direction else list(DIRECTIONS)
+
+    statuses = [status for status in args.get("status", "").split(",") if status]
+    if any(status not in REQUEST_STATUSES for status in statuses):
+        raise ValueError(f"status must be one of: {', '.join(REQUEST_STATUSES)}")
+
+    limit = min(max(args.get("limit", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+    updated_since = args.get("updated_since")
+    if updated_since:
+        try:
+            updated_since = datetime.fromisoformat(updated_since)
+        except ValueError:
+            raise ValueError("updated_since must be an ISO 8601 timestamp")
+
+    cursors = {
+        d: _decode_cursor(args[f"{d}_cursor"]) for d in directions if args.get(f"{d}_cursor")
+    }
+    return directions, statuses, limit, updated_since, cursors
+
+
+def _requests_statement(
+    direction, shape, user_id, statuses, cursor=None, updated_since=None, limit=None
+):
+    """Build the (query, params) selecting shape's columns for one direction of the request list"""
+    owner, other = DIRECTIONS[direction]
+    filters = ""
+    params = [user_id]
+
+    if statuses:
+        filters += " AND r.status = ANY(%s)"
+        params.append(statuses)
+
+    if updated_since:
+        filters += " AND r.updated_at > %s"
+        params.append(updated_since)
+        order = "r.updated_at, r.id"
+    else:
+        if cursor:
+            filters += " AND (r.created_at, r.id) < (%s, %s)"
+            params.extend(cursor)
+        order = "r.created_at DESC, r.id DESC"
+
+    joins = ""
+    if any(name.startswith(f"{other}_") for name in shape.columns):
+        joins += USER_JOIN.format(other=other)
+    if "skill_name" in shape.columns:
+        joins += SKILL_JOIN
+    query = REQUESTS_QUERY.format(
+        columns=shape.select_list(), joins=joins, owner=owner, filters=filters, order=order
+    )
+    if limit:
+        query += "    LIMIT %s\n"
+        params.append(limit)
+    return query, params
+
+
+def _request_shapes(directions, fields, paginated):
+    """direction -> the Shape to read, limited to ?fields= (raises ValueError)"""
+    # Pages need created_at and id for next_cursor whether they are output or not
+    keep = ("created_at", "id") if paginated else ()
+    return {
+        direction: REQUEST_SHAPES[direction].project(
+            fields and [name for name in fields if name in REQUEST_SHAPES[direction].fields], keep
+        )
+        for direction in directions
+    }
+
+
 @requests_bp.route("/", methods=["GET"])
 @token_required
 def get_requests(current_user):
-    """Get all requests for current user"""
+    """
+    Get the current user's requests, newest first.
+
+    Query params: direction (incoming/sent, default both), status (comma
+    separated), limit, <direction>_cursor from a previous page's
+    next_cursor, updated_since (a previous synced_at) to fetch only
+    requests changed since then, and fields (comma separated) to return
+    only some fields of each request.
+    """
     try:
         user_id = current_user["user_id"]
-        db = get_db()
 
-        # Incoming requests (others requesting me)
-        incoming = db.execute(
-            """
-            SELECT 
-                r.id, r.status, r.message, r.created_at,
-                u.id as sender_id, u.full_name as sender_name, u.profile_picture as sender_pic,
-                s.name as skill_name
-            FROM swap_requests r
-            JOIN users u ON r.sender_id = u.id
-            JOIN skills s ON r.skill_id = s.id
-            WHERE r.receiver_id = %s
-            ORDER BY r.created_at DESC
-        """,
-            (user_id,),
-        ).fetchall()
-
-        # Sent requests (I requested others)
-        sent = db.execute(
-            """
-            SELECT 
-                r.id, r.status, r.message, r.created_at,
-                u.id as receiver_id, u.full_name as receiver_name, u.profile_picture as receiver_pic,
-                s.name as skill_name
-            FROM swap_requests r
-            JOIN users u ON r.receiver_id = u.id
-            JOIN skills s ON r.skill_id = s.id
-            WHERE r.sender_id = %s
-            ORDER BY r.created_at DESC
-        """,
-            (user_id,),
-        ).fetchall()
-
-        # Process profile pictures
-        incoming_list = []
-        for req in incoming:
-            req_dict = dict(req)
-            req_dict["sender_pic"] = get_profile_picture_url(
-                req["sender_pic"], req["sender_name"]
+        try:
+            directions, statuses, limit, updated_since, cursors = _parse_list_args(request.args)
+            fields = fields_arg(REQUEST_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        mode = streaming_mode()
+        if mode:
+            # Each section is read from its own server-side cursor as it is written
+            sections = {}
+            for direction, shape in _request_shapes(directions, fields, False).items():
+                query, params = _requests_statement(
+                    direction, shape, user_id, statuses, cursors.get(direction), updated_since
+                )
+                sections[direction] = shape.iter_rows(
+                    server_cursor_rows(query, params, row_factory=tuple_row)
+                )
+            return stream_json(sections, mode)
+
+        # One page per direction (plus one row to detect more) and the counts,
+        # all in one round trip. A sync by updated_since returns every change,
+        # unpaginated
+        page_size = None if updated_since else limit + 1
+        shapes = _request_shapes(directions, fields, page_size is not None)
+        statements = [
+            _requests_statement(
+                direction, shape, user_id, statuses, cursors.get(direction), updated_since, page_size
             )
-            incoming_list.append(req_dict)
+            for direction, shape in shapes.items()
+        ]
+        statements += [(COUNTS_QUERY, (user_id,)), (SYNC_TIME_QUERY, ())]
+        *page_curs, counts_cur, sync_cur = execute_batch(statements, row_factory=tuple_row)
+
+        counts = {direction: dict.fromkeys(REQUEST_STATUSES, 0) for direction in DIRECTIONS}
+        for direction, status, count in counts_cur.fetchall():
+            counts[direction][status] = count
+
+        result = {"counts": counts, "next_cursor": {}}
+        for (direction, shape), cur in zip(shapes.items(), page_curs):
+            rows = cur.fetchall()
+            has_more = page_size is not None and len(rows) > limit
+            rows = rows[:limit] if page_size else rows
+            result[direction] = shape.rows(rows)
+            next_cursor = None
+            if has_more:
+                last = rows[-1]
+                next_cursor = _encode_cursor(
+                    last[shape.columns.index("created_at")], last[shape.columns.index("id")]
+                )
+            result["next_cursor"][direction] = next_cursor
+        result["synced_at"] = sync_cur.fetchone()[0].isoformat()
+
+        return json_response(result)
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch requests: {str(e)}"}), 500
 
-        sent_list = []
-        for req in sent:
-            req_dict = dict(req)
-            req_dict["receiver_pic"] = get_profile_picture_url(
-                req["receiver_pic"], req["receiver_name"]
-            )
-            sent_list.append(req_dict)
 
-        return jsonify({"incoming": incoming_list, "sent": sent_list}), 200
+@requests_bp.route("/events/read", methods=["POST"])
+@token_required
+def mark_events_read(current_user):
+    """Mark the current user's status-change notifications as seen"""
+    try:
+        db = get_db()
+        marked = db.execute(MARK_EVENTS_READ_QUERY, (current_user["user_id"],)).rowcount
+        db.commit()
+        return jsonify({"marked": marked}), 200
 
     except Exception as e:
-        return jsonify({"error": f"Failed to fetch requests: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to mark updates as read: {str(e)}"}), 500
+
+
+# Allowed status changes: current status -> statuses it may move to
+# ("expired" is only ever set by expire_requests.py)
+TRANSITIONS = {
+    "pending": ("accepted", "rejected"),
+    "accepted": ("completed",),
+}
+# Only the receiver can accept or reject; either party can complete
+SENDER_ALLOWED = {"completed"}
+MAX_BULK_REQUESTS = 100
+
+# One statement checks the current status and who is asking, applies the
+# change and records an event for the other party, so two people acting on
+# the same request at once can never both succeed
+TRANSITION_QUERY = """
+    WITH updated AS (
+        UPDATE swap_requests SET status = %(status)s
+        WHERE id = ANY(%(ids)s)
+          AND status = ANY(%(from_statuses)s)
+          AND (receiver_id = %(user_id)s OR (%(sender_allowed)s AND sender_id = %(user_id)s))
+        RETURNING *
+    ), events AS (
+        INSERT INTO request_events (request_id, actor_id, recipient_id, status)
+        SELECT id, %(user_id)s,
+               CASE WHEN sender_id = %(user_id)s THEN receiver_id ELSE sender_id END,
+               status
+        FROM updated
+    )
+    SELECT * FROM updated
+"""
+
+
+def _transition(db, request_ids, new_status, user_id):
+    """Apply a status change to every request it is allowed for; returns the updated rows"""
+    return db.execute(
+        TRANSITION_QUERY,
+        {
+            "status": new_status,
+            "ids": request_ids,
+            "from_statuses": [
+                status for status, targets in TRANSITIONS.items() if new_status in targets
+            ],
+            "user_id": user_id,
+            "sender_allowed": new_status in SENDER_ALLOWED,
+        },
+    ).fetchall()
 
 
 @requests_bp.route("/<int:request_id>/status", methods=["PUT"])
@@ -130,34 +382,77 @@ def update_status(current_user, request_id):
             return jsonify({"error": "Invalid status"}), 400
 
         db = get_db()
+        updated = _transition(db, [request_id], new_status, user_id)
+        db.commit()
+
+        if updated:
+            return jsonify({"message": f"Request {new_status}", "request": dict(updated[0])}), 200
 
-        # Get request
+        # Nothing changed; work out why (only on this failure path)
         req = db.execute(
-            "SELECT * FROM swap_requests WHERE id = %s", (request_id,)
+            "SELECT sender_id, receiver_id, status FROM swap_requests WHERE id = %s",
+            (request_id,),
         ).fetchone()
 
         if not req:
             return jsonify({"error": "Request not found"}), 404
 
-        # Authorization checks
-        if new_status in ["accepted", "rejected"]:
-            # Only receiver can accept/reject
-            if req["receiver_id"] != user_id:
-                return jsonify({"error": "Unauthorized"}), 403
-
-        elif new_status == "completed":
-            # Either party can mark as completed (simplification for MVP)
-            if req["sender_id"] != user_id and req["receiver_id"] != user_id:
-                return jsonify({"error": "Unauthorized"}), 403
-
-        # Update status
-        db.execute(
-            "UPDATE swap_requests SET status = %s WHERE id = %s",
-            (new_status, request_id),
+        if user_id != req["receiver_id"] and not (
+            new_status in SENDER_ALLOWED and user_id == req["sender_id"]
+        ):
+            return jsonify({"error": "Unauthorized"}), 403
+
+        return (
+            jsonify({"error": f"Cannot change a {req['status']} request to {new_status}"}),
+            409,
         )
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to update status: {str(e)}"}), 500
+
+
+@requests_bp.route("/bulk-status", methods=["PUT"])
+@token_required
+def bulk_update_status(current_user):
+    """Accept or reject many pending requests at once"""
+    try:
+        data = request.get_json() or {}
+        new_status = data.get("status")
+        request_ids = data.get("ids")
+
+        if new_status not in ["accepted", "rejected"]:
+            return jsonify({"error": "Invalid status"}), 400
+
+        if (
+            not isinstance(request_ids, list)
+            or not request_ids
+            # bool is a subclass of int, but true is not a request id
+            or not all(isinstance(i, int) and not isinstance(i, bool) for i in request_ids)
+        ):
+            return jsonify({"error": "ids must be a non-empty list of request ids"}), 400
+
+        if len(request_ids) > MAX_BULK_REQUESTS:
+            return (
+                jsonify({"error": f"At most {MAX_BULK_REQUESTS} requests per call"}),
+                400,
+            )
+
+        db = get_db()
+        updated = _transition(db, request_ids, new_status, current_user["user_id"])
         db.commit()
 
-        return jsonify({"message": f"Request {new_status}"}), 200
+        updated_ids = {row["id"] for row in updated}
+        return (
+            jsonify(
+                {
+                    "message": f"{len(updated_ids)} request(s) {new_status}",
+                    "updated": sorted(updated_ids),
+                    # Not pending, not addressed to this user, or nonexistent
+                    "skipped": [i for i in request_ids if i not in updated_ids],
+                }
+            ),
+            200,
+        )
 
     except Exception as e:
-        return jsonify({"error": f"Failed to update status: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to update requests: {str(e)}"}), 500
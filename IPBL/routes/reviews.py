@@ -1,12 +1,28 @@
 from flask import Blueprint, request, jsonify
-from database import get_db
+from psycopg.rows import tuple_row
+from database import get_db, execute_batch
 from utils import token_required, sanitize_input
+from utils.cache import cached, cached_items, invalidate_tags
+from utils.idempotency import idempotent
+from utils.serialization import Shape, dumps, fetch_rows, ids_arg, json_items_response, json_response
 
 reviews_bp = Blueprint("reviews", __name__, url_prefix="/api/reviews")
 
+REVIEW = Shape(("id", "rating", "comment", "created_at", "reviewer_name", "reviewer_pic"))
+
+MAX_BATCH_STATS = 200
+
+STATS_QUERY = """
+    SELECT reviewed_id, AVG(rating), COUNT(*)
+    FROM reviews
+    WHERE reviewed_id = ANY(%s)
+    GROUP BY reviewed_id
+"""
+
 
 @reviews_bp.route("/", methods=["POST"])
 @token_required
+@idempotent
 def create_review(current_user):
     """Create a new review"""
     try:
@@ -70,6 +86,7 @@ def create_review(current_user):
         )
 
         db.commit()
+        invalidate_tags(f"reviews:{reviewed_id}")
 
         return jsonify({"message": "Review submitted successfully"}), 201
 
@@ -78,46 +95,76 @@ def create_review(current_user):
 
 
 @reviews_bp.route("/user/<int:user_id>", methods=["GET"])
+@cached(tags=lambda user_id: [f"reviews:{user_id}"])
 def get_user_reviews(user_id):
     """Get reviews for a specific user"""
     try:
-        db = get_db()
+        # Reviews and the average rating in one round trip
+        reviews_cur, avg_cur = execute_batch(
+            [
+                (
+                    """
+                    SELECT 
+                        r.id, r.rating, r.comment, r.created_at,
+                        u.full_name as reviewer_name, u.profile_picture as reviewer_pic
+                    FROM reviews r
+                    JOIN users u ON r.reviewer_id = u.id
+                    WHERE r.reviewed_id = %s
+                    ORDER BY r.created_at DESC
+                """,
+                    (user_id,),
+                ),
+                # Calculate average rating
+                (
+                    """
+                    SELECT AVG(rating) as avg_rating, COUNT(*) as count
+                    FROM reviews
+                    WHERE reviewed_id = %s
+                """,
+                    (user_id,),
+                ),
+            ],
+            row_factory=tuple_row,
+        )
+        reviews = reviews_cur.fetchall()
+        avg_rating, count = avg_cur.fetchone()
+
+        return json_response(
+            {
+                "reviews": REVIEW.rows(reviews),
+                "stats": {"average": round(avg_rating or 0, 1), "count": count},
+            }
+        )
 
-        reviews = db.execute(
-            """
-            SELECT 
-                r.id, r.rating, r.comment, r.created_at,
-                u.full_name as reviewer_name, u.profile_picture as reviewer_pic
-            FROM reviews r
-            JOIN users u ON r.reviewer_id = u.id
-            WHERE r.reviewed_id = %s
-            ORDER BY r.created_at DESC
-        """,
-            (user_id,),
-        ).fetchall()
+    except Exception as e:
+        return jsonify({"error": f"Failed to fetch reviews: {str(e)}"}), 500
 
-        # Calculate average rating
-        avg_rating = db.execute(
-            """
-            SELECT AVG(rating) as avg_rating, COUNT(*) as count
-            FROM reviews
-            WHERE reviewed_id = %s
-        """,
-            (user_id,),
-        ).fetchone()
 
-        return (
-            jsonify(
-                {
-                    "reviews": [dict(r) for r in reviews],
-                    "stats": {
-                        "average": round(avg_rating["avg_rating"] or 0, 1),
-                        "count": avg_rating["count"],
-                    },
-                }
-            ),
-            200,
-        )
+def _load_stats(user_ids):
+    """user id -> rating stats as JSON text, computed as in get_user_reviews"""
+    rows = {user_id: (avg, count) for user_id, avg, count in fetch_rows(STATS_QUERY, (user_ids,))}
+    stats = {}
+    for user_id in user_ids:
+        avg_rating, count = rows.get(user_id, (None, 0))
+        stats[user_id] = dumps({"average": round(avg_rating or 0, 1), "count": count})
+    return stats
+
+
+@reviews_bp.route("/stats", methods=["GET"])
+def get_review_stats():
+    """
+    Rating stats of many users at once: ?user_ids=1,2,3 (up to
+    MAX_BATCH_STATS). Returns {"stats": {id: {"average", "count"}}}; users
+    without reviews get zeroes. Each user's stats are cached on their own.
+    """
+    try:
+        try:
+            user_ids = ids_arg("user_ids", MAX_BATCH_STATS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        stats = cached_items("review_stats", user_ids, lambda user_id: f"reviews:{user_id}", _load_stats)
+        return json_items_response("stats", ((user_id, stats[user_id]) for user_id in user_ids))
 
     except Exception as e:
-        return jsonify({"error": f"Failed to fetch reviews: {str(e)}"}), 500
+        return jsonify({"error": f"Failed to fetch review stats: {str(e)}"}), 500
@@ -1,10 +1,12 @@
 from flask import Blueprint, request, jsonify
 from database import get_db
+from utils.singleflight import coalesce
 
 skills_bp = Blueprint("skills", __name__, url_prefix="/api/skills")
 
 
 @skills_bp.route("/", methods=["GET"])
+@coalesce
 def get_all_skills():
     """Get all available skills"""
     try:
@@ -20,6 +22,7 @@ def get_all_skills():
 
 
 @skills_bp.route("/categories", methods=["GET"])
+@coalesce
 def get_categories():
     """Get all skill categories"""
     try:
@@ -35,6 +38,7 @@ def get_categories():
 
 
 @skills_bp.route("/search", methods=["GET"])
+@coalesce
 def search_skills():
     """Search skills by name or category"""
     try:
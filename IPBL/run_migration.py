@@ -5,9 +5,8 @@ import os
 app = Flask(__name__)
 
 # Add context to use current app config
-def run_migration():
+def run_migration(migration_file="database/migrations/add_email_verification.sql"):
     # Read the migration file
-    migration_file = "database/migrations/add_email_verification.sql"
     
     try:
         with open(migration_file, 'r') as f:
@@ -47,5 +46,10 @@ if __name__ == "__main__":
     # Load env vars first
     from dotenv import load_dotenv
     load_dotenv()
-    
-    run_migration()
+
+    # Optional path, e.g. python run_migration.py database/migrations/add_request_events.sql
+    import sys
+    if len(sys.argv) > 1:
+        run_migration(sys.argv[1])
+    else:
+        run_migration()
@@ -9,6 +9,33 @@ if (document.getElementById('signup-form')) {
     const verifyBtn = document.getElementById('verify-btn');
     const resendBtn = document.getElementById('resend-btn');
     let userEmail = '';
+    let watchedJob = null;
+
+    // The email is sent by a background job; tell the user if it fails
+    async function watchEmailJob(jobId, attempts = 20) {
+        watchedJob = jobId;
+        let warned = false;
+        for (let i = 0; i < attempts && watchedJob === jobId; i++) {
+            await new Promise(resolve => setTimeout(resolve, 3000));
+            try {
+                const params = new URLSearchParams({ email: userEmail, job_id: jobId });
+                const response = await fetch(`${API_URL}/auth/otp-status?${params}`);
+                if (!response.ok) return;
+                const data = await response.json();
+                if (watchedJob !== jobId || data.status === 'sent') return;
+                if (data.status === 'failed') {
+                    showAlert("We couldn't send your code. Please use Resend Code.", 'danger');
+                    return;
+                }
+                if (data.status === 'retrying' && !warned) {
+                    showAlert('Sending your code is taking longer than usual. Retrying...', 'warning');
+                    warned = true;
+                }
+            } catch (error) {
+                return;
+            }
+        }
+    }
 
     signupForm.addEventListener('submit', async function (e) {
         e.preventDefault();
@@ -52,6 +79,7 @@ if (document.getElementById('signup-form')) {
 
                 showAlert('Verification code sent! Please check your email.', 'success');
                 setLoading(false);
+                watchEmailJob(data.email_job_id);
             } else {
                 showAlert(data.error || 'Signup failed', 'danger');
                 setLoading(false);
@@ -140,6 +168,7 @@ if (document.getElementById('signup-form')) {
 
                 if (response.ok) {
                     showAlert('New code sent to your email', 'success');
+                    watchEmailJob(data.email_job_id);
                 } else {
                     showAlert(data.error || 'Failed to resend code', 'danger');
                 }
@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from flask import Flask, jsonify, request
+
+from utils.cache import (
+    FileSystemCacheBackend,
+    MemoryCacheBackend,
+    cache_requests_total,
+    cached,
+    cached_items,
+    init_cache,
+    invalidate_tags,
+)
+from utils.streaming import stream_json, streaming_mode
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    backend = "memory"
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.app = Flask(__name__)
+        self.app.config["CACHE_BACKEND"] = self.backend
+        self.app.config["CACHE_DIR"] = self.cache_dir
+        init_cache(self.app)
+        self.calls = 0
+
+        @self.app.route("/users/<int:user_id>")
+        @cached(tags=lambda user_id: [f"user:{user_id}", f"skill:{request.args.get('skill')}"])
+        def user(user_id):
+            self.calls += 1
+            return jsonify({"id": user_id, "calls": self.calls})
+
+        @self.app.route("/teachers")
+        @cached(tags=lambda: ["teachers"])
+        def teachers():
+            self.calls += 1
+            rows = [{"id": 1}, {"id": 2}]
+            mode = streaming_mode()
+            if mode:
+                return stream_json({"teachers": rows}, mode)
+            return jsonify({"teachers": rows})
+
+        @self.app.route("/users/<int:user_id>/update", methods=["POST"])
+        def update(user_id):
+            invalidate_tags(f"user:{user_id}")
+            return "", 204
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_hit_after_miss(self):
+        first = self.client.get("/users/1")
+        second = self.client.get("/users/1")
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.get_json(), {"id": 1, "calls": 1})
+
+    def test_key_includes_args(self):
+        self.client.get("/users/1?skill=2")
+        self.assertEqual(self.client.get("/users/1?skill=3").headers["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/users/1?skill=2").headers["X-Cache"], "HIT")
+
+    def test_invalidation_is_precise(self):
+        self.client.get("/users/1")
+        self.client.get("/users/2")
+        self.client.post("/users/1/update")
+        self.assertEqual(self.client.get("/users/1").headers["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/users/2").headers["X-Cache"], "HIT")
+
+    def test_streamed_request_bypasses_cache(self):
+        self.client.get("/teachers")
+        self.assertEqual(self.client.get("/teachers").headers["X-Cache"], "HIT")
+
+        streamed = self.client.get("/teachers", headers={"Accept": "application/x-ndjson"})
+        self.assertNotIn("X-Cache", streamed.headers)
+        self.assertEqual(streamed.mimetype, "application/x-ndjson")
+        self.assertEqual(streamed.get_data(as_text=True), '{"id":1}\n{"id":2}\n')
+        self.assertEqual(self.calls, 2)
+
+        # A JSON request after the stream is still served the cached document
+        self.assertEqual(self.client.get("/teachers").headers["X-Cache"], "HIT")
+
+    def test_responses_vary_on_accept(self):
+        for _ in range(2):
+            self.assertIn("Accept", self.client.get("/teachers").headers["Vary"])
+        streamed = self.client.get("/teachers?stream=1")
+        self.assertIn("Accept", streamed.headers["Vary"])
+
+    def test_cached_items_loads_only_missing_ids(self):
+        loaded = []
+
+        def load(ids):
+            loaded.append(ids)
+            return {item_id: f"item {item_id}" for item_id in ids if item_id != 3}
+
+        with self.app.test_request_context():
+            items = cached_items("items:a,b", [1, 2, 3], lambda item_id: f"user:{item_id}", load, label="items")
+            self.assertEqual(items, {1: "item 1", 2: "item 2"})
+            invalidate_tags("user:2")
+            items = cached_items("items:a,b", [1, 2], lambda item_id: f"user:{item_id}", load, label="items")
+            self.assertEqual(items, {1: "item 1", 2: "item 2"})
+        self.assertEqual(loaded, [[1, 2, 3], [2]])
+
+        # The metrics label stays fixed whatever the namespace
+        labels = {key[0] for key in cache_requests_total.values}
+        self.assertIn("items", labels)
+        self.assertNotIn("items:a,b", labels)
+
+
+class FileSystemResponseCacheTestCase(ResponseCacheTestCase):
+    backend = "filesystem"
+
+
+class BackendTestCase(unittest.TestCase):
+    def test_memory_lru_eviction(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+        self.assertEqual(backend.get_many(["a", "b", "c"]), [1, None, 3])
+
+    def test_memory_tag_versions_are_never_evicted(self):
+        backend = MemoryCacheBackend(max_entries=2)
+        backend.incr("tag:user:1")
+        for key in ("a", "b", "c"):
+            backend.set(key, 1)
+        self.assertEqual(backend.get("tag:user:1"), 1)
+        self.assertEqual(backend.incr("tag:user:1"), 2)
+
+    def test_expiry(self):
+        backend = MemoryCacheBackend()
+        backend.set("a", 1, ttl=-1)
+        self.assertIsNone(backend.get("a"))
+
+    def test_filesystem_shared_between_instances(self):
+        directory = tempfile.mkdtemp()
+        try:
+            first = FileSystemCacheBackend(directory)
+            second = FileSystemCacheBackend(directory)
+            first.set("a", {"body": "x"}, ttl=60)
+            self.assertEqual(second.get("a"), {"body": "x"})
+            self.assertEqual(first.incr("tag:user:1"), 1)
+            self.assertEqual(second.incr("tag:user:1"), 2)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_filesystem_prunes_in_background(self):
+        directory = tempfile.mkdtemp()
+        try:
+            backend = FileSystemCacheBackend(directory, max_entries=1, prune_interval=0.05)
+            backend.set("old", 1, ttl=60)
+            time.sleep(0.01)
+            backend.set("expired", 2, ttl=-1)
+            backend.set("new", 3, ttl=60)
+            backend.incr("tag:user:1")
+            # Writes don't prune themselves
+            self.assertEqual(backend.get("old"), 1)
+
+            deadline = time.time() + 5
+            while backend.get("old") is not None and time.time() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(backend.get_many(["old", "new", "tag:user:1"]), [None, 3, 1])
+        finally:
+            shutil.rmtree(directory)
+
+    def test_filesystem_prunes_lock_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            backend = FileSystemCacheBackend(directory, prune_interval=0)
+            backend.incr("tag:user:1")
+            backend.incr("counter")
+            backend.set("counter", 5, ttl=-1)
+            backend.prune()
+            self.assertEqual(len([name for name in os.listdir(directory) if name.endswith(".lock")]), 1)
+            self.assertEqual(backend.incr("counter"), 1)
+            self.assertEqual(backend.incr("tag:user:1"), 2)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from application import create_app
+from app import create_app
 
 class ErrorHandlingTestCase(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,129 @@
+import time
+import unittest
+import uuid
+
+from app import create_app
+from database import get_db
+from utils import generate_token
+from utils.idempotency import init_idempotency
+
+
+class IdempotencyTestCase(unittest.TestCase):
+    """Idempotency-Key on POST /api/requests/ (needs the database, like test_chat.py)"""
+
+    def setUp(self):
+        self.app = create_app("development")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.sender, self.token = self.signup("Sender")
+        self.receiver, _ = self.signup("Receiver")
+        self.skill_id = get_db().execute("SELECT id FROM skills ORDER BY id LIMIT 1").fetchone()["id"]
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def signup(self, name):
+        """A new verified user and a token for them"""
+        email = f"{name.lower()}_{uuid.uuid4().hex[:8]}@example.com"
+        db = get_db()
+        user_id = db.execute(
+            """
+            INSERT INTO users (email, password_hash, full_name, email_verified)
+            VALUES (%s, 'x', %s, TRUE) RETURNING id
+        """,
+            (email, name),
+        ).fetchone()["id"]
+        db.commit()
+        return user_id, generate_token(user_id, email)
+
+    def post(self, key, message="Hi"):
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if key is not None:
+            headers["Idempotency-Key"] = key
+        return self.client.post(
+            "/api/requests/",
+            headers=headers,
+            json={"receiver_id": self.receiver, "skill_id": self.skill_id, "message": message},
+        )
+
+    def request_count(self):
+        return get_db().execute(
+            "SELECT COUNT(*) AS count FROM swap_requests WHERE sender_id = %s", (self.sender,)
+        ).fetchone()["count"]
+
+    def forget_memory(self):
+        """Drop the per-process copy so replays come from the database"""
+        init_idempotency(self.app)
+
+    def test_retry_replays_the_first_response(self):
+        key = uuid.uuid4().hex
+        first = self.post(key)
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", first.headers)
+
+        for forget in (False, True):
+            if forget:
+                self.forget_memory()
+            retry = self.post(key)
+            self.assertEqual(retry.status_code, 201)
+            self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+            self.assertEqual(retry.get_json(), first.get_json())
+        self.assertEqual(self.request_count(), 1)
+
+    def test_memory_copy_expires_with_the_row(self):
+        key = uuid.uuid4().hex
+        self.post(key)
+        db = get_db()
+        db.execute(
+            "UPDATE idempotency_keys SET expires_at = NOW() + INTERVAL '1 second' WHERE key = %s", (key,)
+        )
+        db.commit()
+        self.forget_memory()
+        self.assertEqual(self.post(key).headers["Idempotent-Replayed"], "true")
+
+        time.sleep(1.1)
+        # Expired, so the key is claimed again and the duplicate reaches the view
+        retry = self.post(key)
+        self.assertNotIn("Idempotent-Replayed", retry.headers)
+        self.assertEqual(retry.status_code, 409)
+
+    def test_without_a_key_the_view_runs_again(self):
+        self.assertEqual(self.post(None).status_code, 201)
+        # The duplicate reaches the view and hits the pending-request index
+        self.assertEqual(self.post(None).status_code, 409)
+
+    def test_same_key_different_body_conflicts(self):
+        key = uuid.uuid4().hex
+        self.post(key)
+        self.assertEqual(self.post(key, message="Something else").status_code, 422)
+        self.forget_memory()
+        self.assertEqual(self.post(key, message="Something else").status_code, 422)
+        self.assertEqual(self.request_count(), 1)
+
+    def test_key_still_in_progress(self):
+        key = uuid.uuid4().hex
+        db = get_db()
+        db.execute(
+            """
+            INSERT INTO idempotency_keys (user_id, endpoint, key, fingerprint, expires_at)
+            VALUES (%s, 'requests.create_request', %s, 'other', NOW() + INTERVAL '1 hour')
+        """,
+            (self.sender, key),
+        )
+        db.commit()
+
+        res = self.post(key)
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.headers["Retry-After"], "1")
+        self.assertEqual(self.request_count(), 0)
+
+    def test_invalid_key(self):
+        for key in ("", "x" * 256, "tab\there"):
+            self.assertEqual(self.post(key).status_code, 400)
+        self.assertEqual(self.request_count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import uuid
+from unittest import mock
+
+from app import create_app
+from database import get_db
+from utils.jobs import JOB_TYPES
+
+
+class SendOtpTestCase(unittest.TestCase):
+    """Verification emails sent by the jobs queue (needs the database, like test_chat.py)"""
+
+    def setUp(self):
+        self.app = create_app("development")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.email = f"otp_{uuid.uuid4().hex[:8]}@example.com"
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def send_otp(self):
+        return self.client.post(
+            "/api/auth/send-otp",
+            json={"email": self.email, "full_name": "Otp Tester", "password": "Passw0rd!23"},
+        )
+
+    def status(self, job_id):
+        return self.client.get(f"/api/auth/otp-status?email={self.email}&job_id={job_id}")
+
+    def set_job(self, job_id, status, attempts, max_attempts=5):
+        """Record an attempt the way worker.py would"""
+        db = get_db()
+        db.execute(
+            """
+            UPDATE jobs SET status = %s, attempts = %s, max_attempts = %s,
+                run_at = NOW() + INTERVAL '15 seconds', last_error = 'RuntimeError: SMTP down'
+            WHERE id = %s
+        """,
+            (status, attempts, max_attempts, job_id),
+        )
+        db.commit()
+
+    @mock.patch("utils.email_utils.send_verification_email", return_value=False)
+    def test_send_failure_is_reported_by_otp_status(self, send):
+        # The email goes out later, so a mail server that is down no longer makes this a 500
+        res = self.send_otp()
+        self.assertEqual(res.status_code, 200)
+        job_id = res.get_json()["email_job_id"]
+        send.assert_not_called()
+        self.assertEqual(self.status(job_id).get_json()["status"], "queued")
+
+        user_id = get_db().execute(
+            "SELECT id FROM users WHERE email = %s", (self.email,)
+        ).fetchone()["id"]
+        with self.assertRaises(RuntimeError):
+            JOB_TYPES["email.verification"].handler({"user_id": user_id})
+        send.assert_called_once()
+
+        self.set_job(job_id, "queued", attempts=1)
+        data = self.status(job_id).get_json()
+        self.assertEqual(data["status"], "retrying")
+        self.assertEqual(data["attempts"], 1)
+        self.assertIn("next_attempt_at", data)
+
+        self.set_job(job_id, "failed", attempts=5)
+        self.assertEqual(self.status(job_id).get_json()["status"], "failed")
+
+    def test_otp_status_needs_the_matching_email(self):
+        job_id = self.send_otp().get_json()["email_job_id"]
+        other = self.client.get(f"/api/auth/otp-status?email=someone@example.com&job_id={job_id}")
+        self.assertEqual(other.status_code, 404)
+        self.assertEqual(self.client.get("/api/auth/otp-status").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+
+from flask import Flask, jsonify
+
+from utils.cache import MemoryCacheBackend, cached, init_cache
+from utils.presence import (
+    PresenceRegistry,
+    TimingWheel,
+    init_presence,
+    online_arg,
+    online_ranking,
+    rank_by_presence,
+)
+
+
+class TimingWheelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.wheel = TimingWheel(ttl=3)
+        self.wheel.advance(10)
+
+    def test_expires_after_ttl(self):
+        self.wheel.add("a", 10.5)
+        self.assertEqual(self.wheel.advance(12.9), [])
+        self.assertEqual(self.wheel.advance(13.0), ["a"])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_adding_again_postpones_expiry(self):
+        self.wheel.add("a", 10.5)
+        self.assertEqual(self.wheel.advance(12.5), [])
+        self.wheel.add("a", 12.5)
+        self.assertEqual(self.wheel.advance(13.0), [])
+        self.assertEqual(self.wheel.advance(15.0), ["a"])
+
+    def test_long_gap_expires_everything_once(self):
+        self.wheel.add("a", 10)
+        self.wheel.add("b", 11)
+        self.assertEqual(sorted(self.wheel.advance(1000)), ["a", "b"])
+        self.assertEqual(self.wheel.advance(2000), [])
+
+
+class PresenceRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        # Two workers sharing one backend
+        self.backend = MemoryCacheBackend()
+        self.local = PresenceRegistry(self.backend, ttl=120, write_interval=30)
+        self.other = PresenceRegistry(self.backend, ttl=120, write_interval=30)
+
+    def test_last_seen(self):
+        self.local.touch(1, now=1000)
+        self.assertEqual(self.local.last_seen([1, 2], now=1001), {1: 1000})
+        self.assertEqual(self.other.last_seen([1, 2], now=1001), {1: 1000})
+
+    def test_expiry(self):
+        self.local.touch(1, now=1000)
+        self.assertEqual(self.local.last_seen([1], now=1119), {1: 1000})
+        # Gone locally after the TTL, but the backend allows for the write interval
+        self.assertEqual(self.local.last_seen([1], now=1121), {1: 1000})
+        self.assertEqual(len(self.local), 0)
+        self.assertEqual(self.other.last_seen([1], now=1151), {})
+        self.assertEqual(self.local.last_seen([1], now=1151), {})
+
+    def test_backend_writes_are_throttled(self):
+        self.local.touch(1, now=1000)
+        self.local.touch(1, now=1010)
+        self.assertEqual(self.backend.get("presence:1"), 1000)
+        self.assertEqual(self.local.last_seen([1], now=1011), {1: 1010})
+        self.local.touch(1, now=1031)
+        self.assertEqual(self.backend.get("presence:1"), 1031)
+
+
+class OnlineRankingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["CACHE_BACKEND"] = "memory"
+        init_cache(self.app)
+        init_presence(self.app)
+        self.presence = self.app.extensions["presence"]
+
+        @self.app.route("/teachers")
+        @online_ranking("teachers")
+        @cached(tags=lambda: ["teachers"], ignore_args=("online",))
+        def teachers():
+            return jsonify({"teachers": [{"id": 1}, {"id": 2}, {"id": 3}]})
+
+        self.client = self.app.test_client()
+
+    def test_rank_by_presence(self):
+        self.presence.touch(2)
+        with self.app.app_context():
+            items = [{"id": 1}, {"id": 2}, {"id": 3}]
+            self.assertEqual([item["id"] for item in rank_by_presence(items, "first")], [2, 1, 3])
+            self.assertEqual(rank_by_presence(items, "only"), [{"id": 2, "online": True}])
+
+    def test_online_arg(self):
+        with self.app.test_request_context("/?online=only"):
+            self.assertEqual(online_arg(), "only")
+        with self.app.test_request_context("/"):
+            self.assertEqual(online_arg(default="first"), "first")
+        with self.app.test_request_context("/?online=sometimes"):
+            with self.assertRaises(ValueError):
+                online_arg()
+
+    def test_ranking_stays_current_over_cache(self):
+        self.assertEqual(
+            self.client.get("/teachers").get_json(), {"teachers": [{"id": 1}, {"id": 2}, {"id": 3}]}
+        )
+        self.presence.touch(3)
+        res = self.client.get("/teachers?online=first")
+        self.assertEqual(res.headers["X-Cache"], "HIT")
+        self.assertEqual([teacher["id"] for teacher in res.get_json()["teachers"]], [3, 1, 2])
+
+    def test_modes_share_one_cache_entry(self):
+        self.client.get("/teachers")
+        for mode in ("first", "only"):
+            res = self.client.get(f"/teachers?online={mode}")
+            self.assertEqual(res.headers["X-Cache"], "HIT")
+
+    def test_bad_requests(self):
+        self.assertEqual(self.client.get("/teachers?online=sometimes").status_code, 400)
+        res = self.client.get("/teachers?online=only", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(res.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
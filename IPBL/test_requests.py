@@ -0,0 +1,130 @@
+import unittest
+import uuid
+
+from app import create_app
+from database import get_db
+from utils import generate_token
+
+
+class RequestTransitionsTestCase(unittest.TestCase):
+    """Status changes on swap requests (needs the database, like test_chat.py)"""
+
+    def setUp(self):
+        self.app = create_app("development")
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.sender, self.sender_token = self.signup("Sender")
+        self.receiver, self.receiver_token = self.signup("Receiver")
+        self.skill_ids = [row["id"] for row in get_db().execute("SELECT id FROM skills ORDER BY id LIMIT 3")]
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def signup(self, name):
+        """A new verified user and a token for them"""
+        email = f"{name.lower()}_{uuid.uuid4().hex[:8]}@example.com"
+        db = get_db()
+        user_id = db.execute(
+            """
+            INSERT INTO users (email, password_hash, full_name, email_verified)
+            VALUES (%s, 'x', %s, TRUE) RETURNING id
+        """,
+            (email, name),
+        ).fetchone()["id"]
+        db.commit()
+        return user_id, generate_token(user_id, email)
+
+    def auth(self, token):
+        return {"Authorization": f"Bearer {token}"}
+
+    def create_request(self, skill_id):
+        res = self.client.post(
+            "/api/requests/",
+            headers=self.auth(self.sender_token),
+            json={"receiver_id": self.receiver, "skill_id": skill_id},
+        )
+        self.assertEqual(res.status_code, 201)
+        return res.get_json()["request_id"]
+
+    def set_status(self, token, request_id, status):
+        return self.client.put(
+            f"/api/requests/{request_id}/status", headers=self.auth(token), json={"status": status}
+        )
+
+    def request_updates(self, token):
+        res = self.client.get("/api/notifications/check", headers=self.auth(token))
+        return res.get_json()["request_updates"]
+
+    def test_transition_matrix(self):
+        request_id = self.create_request(self.skill_ids[0])
+
+        # Only the receiver may accept or reject
+        self.assertEqual(self.set_status(self.sender_token, request_id, "accepted").status_code, 403)
+        # pending -> completed skips a step
+        self.assertEqual(self.set_status(self.receiver_token, request_id, "completed").status_code, 409)
+        self.assertEqual(self.set_status(self.receiver_token, 2**31 - 1, "accepted").status_code, 404)
+
+        res = self.set_status(self.receiver_token, request_id, "accepted")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json()["request"]["status"], "accepted")
+        self.assertEqual(self.set_status(self.receiver_token, request_id, "accepted").status_code, 409)
+
+        # Either party may complete
+        self.assertEqual(self.set_status(self.sender_token, request_id, "completed").status_code, 200)
+        self.assertEqual(self.set_status(self.receiver_token, request_id, "rejected").status_code, 409)
+        self.assertEqual(self.set_status(self.receiver_token, request_id, "cancelled").status_code, 400)
+
+    def test_events_are_read_only_when_marked(self):
+        request_id = self.create_request(self.skill_ids[0])
+        self.set_status(self.receiver_token, request_id, "accepted")
+        self.assertEqual(self.request_updates(self.sender_token), 1)
+
+        # Listing requests, streamed or not, leaves them unread
+        self.client.get("/api/requests/", headers=self.auth(self.sender_token))
+        self.client.get(
+            "/api/requests/",
+            headers={**self.auth(self.sender_token), "Accept": "application/x-ndjson"},
+        ).get_data()
+        self.assertEqual(self.request_updates(self.sender_token), 1)
+
+        res = self.client.post("/api/requests/events/read", headers=self.auth(self.sender_token))
+        self.assertEqual(res.get_json(), {"marked": 1})
+        self.assertEqual(self.request_updates(self.sender_token), 0)
+
+    def test_bulk_status_skips_what_it_cannot_change(self):
+        first, second, done = (self.create_request(skill_id) for skill_id in self.skill_ids)
+        self.set_status(self.receiver_token, done, "rejected")
+        missing = 2**31 - 1
+
+        # The sender can't accept anything
+        res = self.client.put(
+            "/api/requests/bulk-status",
+            headers=self.auth(self.sender_token),
+            json={"status": "accepted", "ids": [first, second]},
+        )
+        self.assertEqual(res.get_json()["updated"], [])
+
+        res = self.client.put(
+            "/api/requests/bulk-status",
+            headers=self.auth(self.receiver_token),
+            json={"status": "accepted", "ids": [first, missing, second, done]},
+        )
+        self.assertEqual(res.status_code, 200)
+        data = res.get_json()
+        self.assertEqual(data["updated"], sorted([first, second]))
+        self.assertEqual(data["skipped"], [missing, done])
+
+    def test_bulk_status_validates_ids(self):
+        for ids in ([], [True], ["1"], list(range(1, 102))):
+            res = self.client.put(
+                "/api/requests/bulk-status",
+                headers=self.auth(self.receiver_token),
+                json={"status": "accepted", "ids": ids},
+            )
+            self.assertEqual(res.status_code, 400, ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+from utils.serialization import Shape, dumps, fields_arg, json_response
+
+COLUMNS = ("id", "full_name", "picture", "rating", "created_at")
+ROWS = [
+    (1, "Ada Lovelace", "ada.png", Decimal("4.5"), datetime(2026, 1, 2, 3, 4, 5)),
+    (2, "Alan Turing", None, None, datetime(2026, 2, 3, 4, 5, 6, tzinfo=timezone(timedelta(hours=2)))),
+]
+
+
+def picture_url(picture, name):
+    return f"/uploads/{picture}" if picture else f"/avatars/{name[0]}"
+
+
+class ShapeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def test_matches_dict_rows(self):
+        """Same output as the handlers built from dict_row rows"""
+        shape = Shape(COLUMNS, computed={"picture": (picture_url, "picture", "full_name")})
+        expected = []
+        for row in ROWS:
+            row_dict = dict(zip(COLUMNS, row))
+            row_dict["picture"] = picture_url(row_dict["picture"], row_dict["full_name"])
+            expected.append(row_dict)
+
+        self.assertEqual(shape.rows(ROWS), expected)
+        self.assertEqual(list(shape.row(ROWS[0])), list(COLUMNS))
+        self.assertEqual(list(shape.iter_rows(ROWS)), expected)
+
+        with self.app.app_context():
+            old = jsonify({"users": expected}).get_data().rstrip(b"\n")
+            new = json_response({"users": shape.rows(ROWS)}).get_data()
+        self.assertEqual(new, old)
+
+    def test_hidden_and_added_fields(self):
+        shape = Shape(
+            ("id", "first", "last"),
+            computed={
+                "name": (lambda first, last: f"{first} {last}", "first", "last"),
+                "kind": (lambda: "user",),
+            },
+            hidden=("first", "last"),
+        )
+        self.assertEqual(shape.fields, ("id", "name", "kind"))
+        self.assertEqual(shape.row((7, "Grace", "Hopper")), {"id": 7, "name": "Grace Hopper", "kind": "user"})
+
+    def test_single_column(self):
+        self.assertEqual(Shape(("id",)).rows([(1,), (2,)]), [{"id": 1}, {"id": 2}])
+
+    def test_unknown_columns(self):
+        with self.assertRaises(ValueError):
+            Shape(("id",), computed={"name": (str, "full_name")})
+        with self.assertRaises(ValueError):
+            Shape(("id",), hidden=("email",))
+
+    def test_dumps_matches_jsonify(self):
+        payload = {"b": [1, 2], "a": {"when": ROWS[1][4], "rating": Decimal("4.5"), "name": "Zoë"}}
+        with self.app.app_context():
+            text = dumps(payload)
+            self.assertEqual(self.app.json.loads(text), self.app.json.loads(jsonify(payload).get_data()))
+        # Keys stay sorted, as with jsonify
+        self.assertEqual(
+            text,
+            '{"a":{"name":"Zoë","rating":"4.5","when":"Tue, 03 Feb 2026 02:05:06 GMT"},"b":[1,2]}',
+        )
+
+
+class FieldsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.shape = Shape(
+            COLUMNS,
+            computed={"picture": (picture_url, "picture", "full_name")},
+            sql={"full_name": "u.full_name", "rating": "AVG(r.rating)"},
+        )
+
+    def fields(self, query, **kwargs):
+        with self.app.test_request_context(f"/?{query}"):
+            return fields_arg(self.shape.fields, **kwargs)
+
+    def test_fields_arg(self):
+        self.assertIsNone(self.fields(""))
+        # Allowed order, duplicates and blanks dropped, id always included
+        self.assertEqual(self.fields("fields=rating,,full_name,rating"), ("id", "full_name", "rating"))
+        self.assertEqual(self.fields("fields=rating", always=()), ("rating",))
+        self.assertEqual(self.fields("fields="), ("id",))
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError) as raised:
+            self.fields("fields=full_name,email,password")
+        self.assertIn("Unknown field(s): email, password", str(raised.exception))
+        self.assertIn("Available: id, full_name", str(raised.exception))
+
+    def test_project(self):
+        shape = self.shape.project(("id", "picture"))
+        # picture needs full_name, which is read but not output
+        self.assertEqual(shape.columns, ("id", "full_name", "picture"))
+        self.assertEqual(shape.select_list(), "id AS id, u.full_name AS full_name, picture AS picture")
+        self.assertEqual(shape.row((1, "Ada Lovelace", None)), {"id": 1, "picture": "/avatars/A"})
+        self.assertIs(self.shape.project(("picture", "id")), shape)
+        self.assertIs(self.shape.project(None), self.shape)
+
+    def test_project_keeps_columns(self):
+        shape = self.shape.project(("rating",), keep=("created_at", "id"))
+        self.assertEqual(shape.columns, ("id", "rating", "created_at"))
+        self.assertEqual(shape.row((1, Decimal("4.5"), ROWS[0][4])), {"rating": Decimal("4.5")})
+
+
+if __name__ == "__main__":
+    unittest.main()
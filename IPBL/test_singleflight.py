@@ -0,0 +1,156 @@
+import threading
+import time
+import unittest
+
+from flask import Flask, jsonify, request
+
+from utils.singleflight import SingleFlight, coalesce
+from utils.streaming import stream_json, streaming_mode
+
+
+def run_in_threads(count, fn):
+    """Start count threads calling fn(); returns a function that joins them and returns their results"""
+    results = [None] * count
+
+    def run(i):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+
+    def join():
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    return join
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def setUp(self):
+        self.group = SingleFlight()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def slow(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.calls
+
+    def test_concurrent_callers_share_one_call(self):
+        join = run_in_threads(4, lambda: self.group.do("key", self.slow))
+        time.sleep(0.2)  # let every thread reach the group
+        self.release.set()
+        results = join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(results), [(1, False), (1, True), (1, True), (1, True)])
+
+    def test_nothing_is_kept_afterwards(self):
+        self.release.set()
+        self.assertEqual(self.group.do("key", self.slow), (1, False))
+        self.assertEqual(self.group.do("key", self.slow), (2, False))
+
+    def test_different_keys_run_separately(self):
+        self.release.set()
+        self.group.do("a", self.slow)
+        self.group.do("b", self.slow)
+        self.assertEqual(self.calls, 2)
+
+    def test_error_is_shared(self):
+        def fail():
+            self.release.wait(5)
+            raise ValueError("boom")
+
+        def call():
+            try:
+                return self.group.do("key", fail)
+            except ValueError as e:
+                return str(e)
+
+        join = run_in_threads(3, call)
+        time.sleep(0.2)
+        self.release.set()
+        self.assertEqual(join(), ["boom"] * 3)
+
+    def test_follower_gives_up_on_a_stuck_leader(self):
+        join = run_in_threads(1, lambda: self.group.do("key", self.slow))
+        time.sleep(0.1)
+        result = self.group.do("key", lambda: "own", timeout=0.05)
+        self.release.set()
+        join()
+        self.assertEqual(result, ("own", False))
+
+
+class CoalesceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.calls = 0
+        self.release = threading.Event()
+
+        @self.app.route("/teachers")
+        @coalesce
+        def teachers():
+            self.calls += 1
+            self.release.wait(5)
+            rows = [{"id": 1}, {"skill": request.args.get("skill")}]
+            mode = streaming_mode()
+            if mode:
+                return stream_json({"teachers": rows}, mode)
+            response = jsonify({"teachers": rows})
+            response.headers["Cache-Control"] = "public, max-age=60"
+            response.headers["Server-Timing"] = "db;dur=1.5"
+            response.vary.add("Cookie")
+            response.set_etag("teachers-1")
+            response.set_cookie("session", "leader")
+            return response
+
+    def get(self, path, **kwargs):
+        return self.app.test_client().get(path, **kwargs)
+
+    def test_identical_requests_coalesce(self):
+        join = run_in_threads(3, lambda: self.get("/teachers?skill=1"))
+        time.sleep(0.2)
+        self.release.set()
+        responses = join()
+
+        self.assertEqual(self.calls, 1)
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json(), {"teachers": [{"id": 1}, {"skill": "1"}]})
+            self.assertIn("Accept", response.headers["Vary"])
+
+    def test_headers_are_kept(self):
+        join = run_in_threads(3, lambda: self.get("/teachers?skill=1"))
+        time.sleep(0.2)
+        self.release.set()
+        responses = join()
+
+        for response in responses:
+            self.assertEqual(response.headers["Cache-Control"], "public, max-age=60")
+            self.assertEqual(response.headers["Server-Timing"], "db;dur=1.5")
+            self.assertEqual(response.headers["ETag"], '"teachers-1"')
+            self.assertEqual(response.headers["Vary"], "Cookie, Accept")
+            self.assertEqual(response.mimetype, "application/json")
+        # Only the leader's client gets its cookie
+        cookies = [response.headers.get("Set-Cookie") for response in responses]
+        self.assertEqual(len([cookie for cookie in cookies if cookie]), 1)
+
+    def test_different_arguments_do_not_coalesce(self):
+        join = run_in_threads(2, lambda: self.get(f"/teachers?skill={threading.get_ident()}"))
+        time.sleep(0.2)
+        self.release.set()
+        join()
+        self.assertEqual(self.calls, 2)
+
+    def test_streamed_requests_are_not_shared(self):
+        self.release.set()
+        streamed = self.get("/teachers", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(streamed.mimetype, "application/x-ndjson")
+        self.assertEqual(self.get("/teachers").mimetype, "application/json")
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
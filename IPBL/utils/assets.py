@@ -0,0 +1,76 @@
+"""
+Content-hashed static assets.
+
+`python build_assets.py` copies files from static/ into static/dist/ under
+names containing a hash of their contents, writes .gz/.br siblings for text
+formats, and records the mapping in static/dist/manifest.json. Templates link
+to assets with asset_url(), which returns the hashed URL when the asset has
+been built and the plain /static URL otherwise. Because a hashed URL changes
+whenever the file does, it can be cached by browsers forever.
+"""
+import json
+import mimetypes
+import os
+
+from flask import current_app, send_from_directory, url_for
+
+from .compression import accepted_encodings
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def dist_folder(app):
+    return os.path.join(app.static_folder, "dist")
+
+
+def load_manifest(app):
+    """Return {"css/style.css": "css/style.<hash>.css", ...}, or {} if not built"""
+    try:
+        with open(os.path.join(dist_folder(app), "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(filename):
+    """URL for a file under static/, hashed if build_assets.py has been run"""
+    manifest = current_app.extensions["asset_manifest"]
+    if current_app.debug:
+        # Pick up rebuilds without restarting the dev server
+        manifest = load_manifest(current_app)
+    hashed = manifest.get(filename)
+    if hashed:
+        return url_for("hashed_asset", filename=hashed)
+    return url_for("static", filename=filename)
+
+
+def serve_asset(filename):
+    """Serve a hashed asset, precompressed when the client accepts it"""
+    directory = dist_folder(current_app)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    encoding = None
+    for candidate in accepted_encodings():
+        if os.path.exists(os.path.join(directory, filename + ENCODING_SUFFIXES[candidate])):
+            encoding = candidate
+            break
+
+    response = send_from_directory(
+        directory,
+        filename + ENCODING_SUFFIXES[encoding] if encoding else filename,
+        mimetype=mimetype,
+        max_age=IMMUTABLE_MAX_AGE,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_assets(app):
+    app.extensions["asset_manifest"] = load_manifest(app)
+    app.add_url_rule("/static/dist/<path:filename>", "hashed_asset", serve_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from config import Config
+from .presence import touch_presence
 
 def hash_password(password):
     """Hash a password using bcrypt"""
@@ -58,6 +59,8 @@ def token_required(f):
         if not payload:
             return jsonify({'error': 'Invalid or expired token'}), 401
         
+        touch_presence(payload['user_id'])
+
         # Pass user info to the route
         return f(current_user=payload, *args, **kwargs)
     
@@ -0,0 +1,358 @@
+"""
+Server-side response cache with tag-based invalidation.
+
+Every cached response records the version of each tag it depends on
+(e.g. "user:12", "skill:3"). Invalidating a tag bumps its version, so any
+entry stored under an older version is treated as a miss. Tag versions are
+read before the view runs, which means a write that lands while a response is
+being computed can never be cached as fresh.
+
+Backends:
+    memory       per-process LRU (default)
+    filesystem   files under CACHE_DIR, shared by all workers on one host
+    module:Class any class with the same get/get_many/set/incr interface
+"""
+import fcntl
+import hashlib
+import importlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from .metrics import Counter
+from .streaming import streaming_mode
+
+cache_requests_total = Counter(
+    "cache_requests_total", "Cache lookups by cache and result", ("cache", "result")
+)
+
+
+class MemoryCacheBackend:
+    """
+    Per-process LRU cache with expiry.
+
+    Counters from incr() (tag versions) are kept outside the LRU and never
+    evicted: a version that dropped back to 0 would make entries cached
+    under it valid again.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return self._counters.get(key)
+            expires, value = item
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters[key] = self._counters.get(key, 0) + 1
+            return value
+
+
+class FileSystemCacheBackend:
+    """
+    Cache stored as JSON files so every worker on the host shares it.
+
+    A local stand-in for a networked cache: same interface, no extra service.
+    Expired and excess entries are pruned in a background thread every
+    prune_interval seconds (never, for 0), by one worker per host at a time,
+    so writes never pay for a directory scan.
+    """
+
+    def __init__(self, directory, max_entries=10000, prune_interval=60):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._pruner_pid = None
+        self._pruner_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if item["expires"] is not None and item["expires"] < time.time():
+            return None
+        return item["value"]
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        expires = time.time() + ttl if ttl else None
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expires": expires, "value": value}, f)
+        os.replace(tmp_path, path)
+        if self.prune_interval and self._pruner_pid != os.getpid():
+            self._start_pruner()
+
+    def incr(self, key):
+        path = self._path(key)
+        lock_path = f"{path}.lock"
+        while True:
+            with open(lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                # prune() may have removed the lock file while we waited for it
+                try:
+                    if os.stat(lock_path).st_ino != os.fstat(lock.fileno()).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                value = (self.get(key) or 0) + 1
+                self.set(key, value)
+                return value
+
+    def _start_pruner(self):
+        # Started on first write rather than in __init__ so that each forked
+        # worker gets its own thread
+        with self._pruner_lock:
+            if self._pruner_pid == os.getpid():
+                return
+            self._pruner_pid = os.getpid()
+            threading.Thread(target=self._prune_periodically, daemon=True).start()
+
+    def _prune_periodically(self):
+        lock_path = os.path.join(self.directory, ".prune.lock")
+        while True:
+            time.sleep(self.prune_interval)
+            try:
+                with open(lock_path, "a") as lock:
+                    # Another worker is pruning, or pruned recently enough
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    if time.time() - os.fstat(lock.fileno()).st_mtime < self.prune_interval:
+                        continue
+                    os.utime(lock_path)
+                    self.prune()
+            except OSError:
+                continue
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones beyond max_entries, then their lock files"""
+        now = time.time()
+        entries = []
+        locks = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".lock") and not name.startswith("."):
+                locks.append(os.path.join(self.directory, name))
+                continue
+            if "." in name:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    expires = json.load(f)["expires"]
+                mtime = os.path.getmtime(path)
+            except (OSError, ValueError):
+                continue
+            if expires is not None and expires < now:
+                os.remove(path)
+            elif expires is not None:
+                # Tag versions never expire and are never evicted
+                entries.append((mtime, path))
+        entries.sort()
+        for _, path in entries[: max(0, len(entries) - self.max_entries)]:
+            os.remove(path)
+        for lock_path in locks:
+            self._remove_lock(lock_path)
+
+    def _remove_lock(self, lock_path):
+        """Remove an incr() lock file whose entry is gone, unless it is in use"""
+        try:
+            with open(lock_path) as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                if not os.path.exists(lock_path[: -len(".lock")]):
+                    os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def make_backend(config, prefix="CACHE"):
+    """Build the backend named by <prefix>_BACKEND (e.g. CACHE_BACKEND)"""
+    name = config.get(f"{prefix}_BACKEND", "memory")
+    max_entries = config.get(f"{prefix}_MAX_ENTRIES", 10000)
+    if name == "memory":
+        return MemoryCacheBackend(max_entries)
+    if name == "filesystem":
+        return FileSystemCacheBackend(
+            config[f"{prefix}_DIR"], max_entries, config.get(f"{prefix}_PRUNE_INTERVAL", 60)
+        )
+    module_name, _, class_name = name.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)(config)
+
+
+class ResponseCache:
+    def __init__(self, backend, default_ttl):
+        self.backend = backend
+        self.default_ttl = default_ttl
+
+    def tag_versions(self, tags):
+        versions = self.backend.get_many([f"tag:{tag}" for tag in tags])
+        return {tag: version or 0 for tag, version in zip(tags, versions)}
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        if self.tag_versions(list(entry["tags"])) != entry["tags"]:
+            return None
+        return entry
+
+    def set(self, key, entry, ttl=None):
+        self.backend.set(key, entry, ttl or self.default_ttl)
+
+    def invalidate(self, tags):
+        for tag in tags:
+            self.backend.incr(f"tag:{tag}")
+
+
+def init_cache(app):
+    app.extensions["response_cache"] = ResponseCache(
+        make_backend(app.config), app.config.get("CACHE_DEFAULT_TTL", 300)
+    )
+
+
+def invalidate_tags(*tags):
+    """Expire every cached response that depends on any of these tags"""
+    cache = current_app.extensions.get("response_cache")
+    if cache is not None and tags:
+        cache.invalidate(tags)
+
+
+def cached_items(namespace, ids, tag, load, ttl=None, label=None):
+    """
+    Per-id cache for batch lookups: each id is cached (and invalidated) on its
+    own, so a batch only loads the ids that aren't cached yet.
+
+    Args:
+        namespace: Key prefix, e.g. "profile"
+        ids: Ids to look up
+        tag: Function of an id returning the tag its entry depends on
+        load: Function taking the ids that missed and returning {id: value}
+            for those that exist; values must suit the backend (strings do)
+        ttl: Seconds to keep each entry (defaults to CACHE_DEFAULT_TTL)
+        label: Metrics label (defaults to namespace); keep it to a fixed set
+            of values when the namespace varies per request
+
+    Returns:
+        dict: id -> value for every id found, cached or loaded
+    """
+    cache = current_app.extensions.get("response_cache")
+    if cache is None:
+        return load(list(ids))
+
+    keys = [f"item:{namespace}:{item_id}" for item_id in ids]
+    # Read before loading, as in @cached, so a concurrent write can't be cached as fresh
+    versions = cache.tag_versions([tag(item_id) for item_id in ids])
+    found, missing = {}, []
+    for item_id, entry in zip(ids, cache.backend.get_many(keys)):
+        if entry is not None and entry["tags"] == {tag(item_id): versions[tag(item_id)]}:
+            found[item_id] = entry["value"]
+        else:
+            missing.append(item_id)
+    label = label or namespace
+    cache_requests_total.inc(len(found), cache=label, result="hit")
+    cache_requests_total.inc(len(missing), cache=label, result="miss")
+
+    if missing:
+        loaded = load(missing)
+        for item_id, value in loaded.items():
+            cache.set(
+                f"item:{namespace}:{item_id}",
+                {"value": value, "tags": {tag(item_id): versions[tag(item_id)]}},
+                ttl,
+            )
+        found.update(loaded)
+    return found
+
+
+def _cache_key(ignore_args=()):
+    args = "&".join(
+        f"{k}={v}" for k, v in sorted(request.args.items(multi=True)) if k not in ignore_args
+    )
+    return f"view:{request.endpoint}:{request.path}?{args}"
+
+
+def cached(tags, ttl=None, ignore_args=()):
+    """
+    Cache a GET view's 200 responses, keyed by route and arguments.
+
+    Args:
+        tags: Function taking the view's keyword arguments and returning the
+            tags the response depends on (it may also read request.args)
+        ttl: Seconds to keep the response (defaults to CACHE_DEFAULT_TTL)
+        ignore_args: Query arguments left out of the key, for ones the view
+            doesn't read (e.g. ones a decorator above handles)
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get("response_cache")
+            # Streamed responses (chosen by Accept too) are never cached
+            if cache is None or streaming_mode():
+                return view(*args, **kwargs)
+
+            key = _cache_key(ignore_args)
+            entry = cache.get(key)
+            if entry is not None:
+                cache_requests_total.inc(cache="response", result="hit")
+                response = Response(entry["body"], entry["status"], mimetype=entry["mimetype"])
+                response.headers["X-Cache"] = "HIT"
+                response.vary.add("Accept")
+                return response
+
+            cache_requests_total.inc(cache="response", result="miss")
+            versions = cache.tag_versions(list(tags(**kwargs)))
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.set(
+                    key,
+                    {
+                        "body": response.get_data(as_text=True),
+                        "status": response.status_code,
+                        "mimetype": response.mimetype,
+                        "tags": versions,
+                    },
+                    ttl,
+                )
+            response.headers["X-Cache"] = "MISS"
+            response.vary.add("Accept")
+            return response
+
+        return wrapper
+
+    return decorator
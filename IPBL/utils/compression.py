@@ -0,0 +1,83 @@
+"""
+Gzip/Brotli compression for dynamic responses.
+
+Only responses whose type is in COMPRESS_MIMETYPES and whose body is at least
+COMPRESS_MIN_SIZE bytes are compressed; small bodies and already-compressed
+formats aren't worth the CPU. Brotli is used when the `brotli` package is
+installed and the client accepts it, gzip otherwise. Static files are left
+alone: hashed assets are served precompressed by utils/assets.py.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+def accepted_encodings():
+    """Encodings this server can produce that the client accepts, best first"""
+    accept = request.accept_encodings
+    encodings = []
+    if brotli is not None and accept["br"]:
+        encodings.append("br")
+    if accept["gzip"]:
+        encodings.append("gzip")
+    return encodings
+
+
+def compress(data, encoding, level):
+    if encoding == "br":
+        # Brotli quality runs 0-11; map the shared 1-9 level onto it
+        return brotli.compress(data, quality=min(11, level + 2))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def init_compression(app):
+    mimetypes = set(app.config.get("COMPRESS_MIMETYPES") or DEFAULT_MIMETYPES)
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 500)
+    level = app.config.get("COMPRESS_LEVEL", 6)
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in mimetypes:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or not 200 <= response.status_code < 300
+            or response.status_code == 204
+        ):
+            return response
+
+        encodings = accepted_encodings()
+        if not encodings:
+            return response
+
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encodings[0], level))
+        response.headers["Content-Encoding"] = encodings[0]
+        if response.headers.get("ETag"):
+            # A different representation needs a different validator
+            etag, weak = response.get_etag()
+            response.set_etag(f"{etag}-{encodings[0]}", weak)
+        return response
@@ -1,7 +1,10 @@
 """Email utility functions for sending verification emails"""
 import random
+from datetime import datetime, timedelta
 from flask import current_app
 from flask_mail import Message
+from .jobs import job
+from .metrics import emails_sent_total
 
 
 def generate_otp():
@@ -76,13 +79,41 @@ The SkillSwap Team
         """
         
         mail.send(msg)
+        emails_sent_total.inc(result="sent")
         return True
         
     except Exception as e:
+        emails_sent_total.inc(result="failed")
         current_app.logger.error(f"Failed to send verification email: {str(e)}")
         return False
 
 
+@job("email.verification", concurrency=2, max_attempts=5, priority=10, backoff=15)
+def send_verification_email_job(payload):
+    """
+    Background job: email a user their current OTP.
+
+    Reads the OTP when the job runs, so a retry never sends a stale code, and
+    does nothing once the user is verified or the code has expired.
+    """
+    from app import mail
+    from database import get_db
+
+    user = get_db().execute(
+        "SELECT email, full_name, email_otp, otp_created_at, email_verified FROM users WHERE id = %s",
+        (payload["user_id"],),
+    ).fetchone()
+    if not user or user["email_verified"] or not user["email_otp"]:
+        return
+
+    expiry = timedelta(minutes=current_app.config.get('OTP_EXPIRY_MINUTES', 10))
+    if user["otp_created_at"] and datetime.now() - user["otp_created_at"] > expiry:
+        return
+
+    if not send_verification_email(mail, user["email"], user["email_otp"], user["full_name"]):
+        raise RuntimeError("Failed to send verification email")
+
+
 def send_password_reset_email(mail, recipient_email, reset_link, full_name=None):
     """
     Send password reset email (for future use)
@@ -154,8 +185,10 @@ The SkillSwap Team
         """
         
         mail.send(msg)
+        emails_sent_total.inc(result="sent")
         return True
         
     except Exception as e:
+        emails_sent_total.inc(result="failed")
         current_app.logger.error(f"Failed to send password reset email: {str(e)}")
         return False
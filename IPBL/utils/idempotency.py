@@ -0,0 +1,195 @@
+"""
+Idempotency-Key support for mutating POST endpoints.
+
+A client that may retry a POST sends the same Idempotency-Key header with
+every attempt. The first attempt claims the key in the idempotency_keys table
+(committed before the view runs, so every worker sees it), runs the view and
+stores the response. Later attempts get that response back, with an
+Idempotent-Replayed header, without the view running again:
+
+    same key, same request, first still running   409, try again shortly
+    same key, same request, finished               stored response
+    same key, different request body               422
+
+Keys are scoped to the user and endpoint and kept for IDEMPOTENCY_TTL.
+Finished responses are also kept in a per-process LRU, until the key's row
+expires, so most replays skip the database. Server errors are not stored: the
+claim is released and a retry runs the view again. Bodies over
+IDEMPOTENCY_MAX_BODY_BYTES are stored as the status code alone.
+"""
+import hashlib
+import random
+import time
+from functools import wraps
+
+from flask import Response, current_app, jsonify, request
+
+from .cache import MemoryCacheBackend
+from .metrics import Counter
+
+MAX_KEY_LENGTH = 255
+
+idempotency_requests_total = Counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key, by how they were handled",
+    ("endpoint", "result"),
+)
+
+# Takes over a key that has expired, or whose first request died mid-flight
+CLAIM_QUERY = """
+    INSERT INTO idempotency_keys (user_id, endpoint, key, fingerprint, expires_at)
+    VALUES (%s, %s, %s, %s, NOW() + %s * INTERVAL '1 second')
+    ON CONFLICT (user_id, endpoint, key) DO UPDATE
+        SET fingerprint = EXCLUDED.fingerprint, status_code = NULL, body = NULL,
+            mimetype = NULL, locked_at = NOW(), expires_at = EXCLUDED.expires_at
+        WHERE idempotency_keys.expires_at < NOW()
+           OR (idempotency_keys.status_code IS NULL
+               AND idempotency_keys.locked_at < NOW() - %s * INTERVAL '1 second')
+    RETURNING EXTRACT(EPOCH FROM expires_at - NOW()) AS remaining
+"""
+
+LOOKUP_QUERY = """
+    SELECT fingerprint, status_code, body, mimetype,
+           EXTRACT(EPOCH FROM expires_at - NOW()) AS remaining
+    FROM idempotency_keys
+    WHERE user_id = %s AND endpoint = %s AND key = %s
+"""
+
+STORE_QUERY = """
+    UPDATE idempotency_keys SET status_code = %s, body = %s, mimetype = %s
+    WHERE user_id = %s AND endpoint = %s AND key = %s
+"""
+
+RELEASE_QUERY = """
+    DELETE FROM idempotency_keys WHERE user_id = %s AND endpoint = %s AND key = %s
+"""
+
+PURGE_QUERY = """
+    DELETE FROM idempotency_keys WHERE ctid IN (
+        SELECT ctid FROM idempotency_keys WHERE expires_at < NOW() LIMIT 500
+    )
+"""
+
+
+def init_idempotency(app):
+    app.extensions["idempotency"] = MemoryCacheBackend(
+        app.config.get("IDEMPOTENCY_MEMORY_ENTRIES", 10000)
+    )
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _remember(memory, memory_key, entry):
+    """Keep entry in memory until its row expires, not for a fresh IDEMPOTENCY_TTL"""
+    ttl = entry["expires"] - time.time()
+    if ttl > 0:
+        memory.set(memory_key, entry, ttl)
+
+
+def _replay(entry):
+    response = Response(entry["body"] or "", entry["status"], mimetype=entry["mimetype"])
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Honor an Idempotency-Key header on a view protected by @token_required.
+
+    Goes below @token_required, so keys are scoped to current_user. Requests
+    without the header run as usual.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+            return jsonify({"error": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} printable characters"}), 400
+
+        from database import get_db
+
+        config = current_app.config
+        memory = current_app.extensions["idempotency"]
+        user_id = kwargs["current_user"]["user_id"]
+        endpoint = request.endpoint
+        scope = (user_id, endpoint, key)
+        memory_key = f"idempotency:{user_id}:{endpoint}:{key}"
+        fingerprint = _fingerprint()
+
+        entry = memory.get(memory_key)
+        if entry is None:
+            db = get_db()
+            claimed = db.execute(
+                CLAIM_QUERY,
+                (*scope, fingerprint, config["IDEMPOTENCY_TTL"], config["IDEMPOTENCY_LOCK_TIMEOUT"]),
+            ).fetchone()
+            if claimed is not None:
+                expires = time.time() + float(claimed["remaining"])
+            if random.random() < 0.01:
+                db.execute(PURGE_QUERY)
+            db.commit()
+
+            if claimed is None:
+                row = db.execute(LOOKUP_QUERY, scope).fetchone()
+                if row is None or row["status_code"] is None:
+                    idempotency_requests_total.inc(endpoint=endpoint, result="in_progress")
+                    response = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+                    response.headers["Retry-After"] = "1"
+                    return response, 409
+                entry = {
+                    "fingerprint": row["fingerprint"],
+                    "status": row["status_code"],
+                    "body": row["body"],
+                    "mimetype": row["mimetype"],
+                    "expires": time.time() + float(row["remaining"]),
+                }
+                _remember(memory, memory_key, entry)
+
+        if entry is not None:
+            if entry["fingerprint"] != fingerprint:
+                idempotency_requests_total.inc(endpoint=endpoint, result="mismatch")
+                return jsonify({"error": "Idempotency-Key was already used for a different request"}), 422
+            idempotency_requests_total.inc(endpoint=endpoint, result="replayed")
+            return _replay(entry)
+
+        idempotency_requests_total.inc(endpoint=endpoint, result="executed")
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            db.rollback()
+            db.execute(RELEASE_QUERY, scope)
+            db.commit()
+            raise
+
+        # Anything the view left uncommitted would be discarded at teardown anyway
+        db.rollback()
+        if response.status_code >= 500:
+            db.execute(RELEASE_QUERY, scope)
+            db.commit()
+            return response
+
+        body = response.get_data(as_text=True)
+        if len(body.encode()) > config["IDEMPOTENCY_MAX_BODY_BYTES"]:
+            body = None
+        db.execute(STORE_QUERY, (response.status_code, body, response.mimetype, *scope))
+        db.commit()
+        _remember(
+            memory,
+            memory_key,
+            {
+                "fingerprint": fingerprint,
+                "status": response.status_code,
+                "body": body,
+                "mimetype": response.mimetype,
+                "expires": expires,
+            },
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,186 @@
+"""
+Profile picture processing.
+
+Uploads are validated, then resized off the request thread into square
+avatars at AVATAR_SIZES in WebP and JPEG, with EXIF and other metadata
+dropped. Files are named by a hash of the uploaded bytes, so re-uploading the
+same picture does no work and every URL can be cached forever. The stored
+profile_picture is "/avatars/<hash>"; see routes/avatars.py for serving.
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+AVATAR_SIZES = (64, 128, 256)
+DEFAULT_AVATAR_SIZE = 128
+AVATAR_PREFIX = "/avatars/"
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+DIGEST_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def is_processed_avatar(profile_picture):
+    """True for "/avatars/<hash>" values (not generated initials avatars)"""
+    return (
+        bool(profile_picture)
+        and profile_picture.startswith(AVATAR_PREFIX)
+        and DIGEST_PATTERN.fullmatch(profile_picture[len(AVATAR_PREFIX):]) is not None
+    )
+
+
+def avatar_url(profile_picture, size=DEFAULT_AVATAR_SIZE):
+    """URL of a processed avatar at the given size; other values pass through"""
+    if is_processed_avatar(profile_picture):
+        return f"{profile_picture}/{size}"
+    return profile_picture
+
+
+def validate_image(data, max_pixels):
+    """Raise ValueError unless data is a supported image of a sane size"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValueError("Unsupported image format")
+            width, height = image.size
+            if width * height > max_pixels:
+                raise ValueError("Image dimensions are too large")
+            image.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValueError("Invalid image file")
+
+
+def _flatten(image):
+    """RGB copy of the image, with any transparency composited onto white"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _save(image, path, **options):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    image.save(tmp_path, **options)
+    os.replace(tmp_path, path)
+
+
+def generate_avatars(data, digest, folder):
+    """Write <digest>_<size>.webp/.jpg for every size; the largest JPEG goes last"""
+    with Image.open(io.BytesIO(data)) as image:
+        # Apply the camera's rotation before the EXIF data is dropped
+        image = _flatten(ImageOps.exif_transpose(image))
+
+    for size in sorted(AVATAR_SIZES):
+        fitted = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+        _save(fitted, os.path.join(folder, f"{digest}_{size}.webp"), format="WEBP", quality=80, method=6)
+        _save(
+            fitted,
+            os.path.join(folder, f"{digest}_{size}.jpg"),
+            format="JPEG",
+            quality=85,
+            optimize=True,
+            progressive=True,
+        )
+
+
+class AvatarPipeline:
+    """Stores uploads and resizes them on a small thread pool"""
+
+    def __init__(self, folder, originals_folder, max_pixels, workers=2, logger=None):
+        self.folder = folder
+        self.originals_folder = originals_folder
+        self.max_pixels = max_pixels
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="avatars")
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        os.makedirs(originals_folder, exist_ok=True)
+
+    def path(self, digest, size, ext):
+        return os.path.join(self.folder, f"{digest}_{size}.{ext}")
+
+    def original_path(self, digest):
+        return os.path.join(self.originals_folder, digest)
+
+    def is_ready(self, digest):
+        return os.path.exists(self.path(digest, max(AVATAR_SIZES), "jpg"))
+
+    def store(self, data):
+        """Validate an upload and queue it for processing; returns its profile_picture value"""
+        validate_image(data, self.max_pixels)
+        digest = content_hash(data)
+        if not self.is_ready(digest):
+            original = self.original_path(digest)
+            if not os.path.exists(original):
+                tmp_path = f"{original}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, original)
+            self.submit(digest)
+        return f"{AVATAR_PREFIX}{digest}"
+
+    def submit(self, digest):
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is None:
+                future = self._executor.submit(self.process, digest)
+                self._pending[digest] = future
+                future.add_done_callback(lambda _: self._forget(digest))
+            return future
+
+    def _forget(self, digest):
+        with self._lock:
+            self._pending.pop(digest, None)
+
+    def process(self, digest):
+        """Resize a stored original, then delete it"""
+        original = self.original_path(digest)
+        try:
+            # Another worker process may have finished it first
+            if self.is_ready(digest):
+                return
+            with open(original, "rb") as f:
+                data = f.read()
+            generate_avatars(data, digest, self.folder)
+            os.remove(original)
+        except FileNotFoundError:
+            if not self.is_ready(digest):
+                raise
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Avatar processing failed for {digest}: {e}")
+            raise
+
+    def status(self, digest):
+        """
+        "ready", "processing" or "missing", without waiting. A stored
+        original that isn't being processed here (e.g. the process that took
+        the upload restarted) is queued again.
+        """
+        if self.is_ready(digest):
+            return "ready"
+        if not os.path.exists(self.original_path(digest)):
+            # It may have finished, and its original been removed, just now
+            return "ready" if self.is_ready(digest) else "missing"
+        self.submit(digest)
+        return "processing"
+
+
+def init_avatars(app):
+    app.extensions["avatars"] = AvatarPipeline(
+        os.path.join(app.root_path, app.config.get("AVATAR_FOLDER", "static/uploads/avatars")),
+        os.path.join(app.root_path, app.config.get("AVATAR_ORIGINALS_FOLDER", "uploads/originals")),
+        app.config.get("AVATAR_MAX_PIXELS", 40_000_000),
+        app.config.get("AVATAR_WORKERS", 2),
+        app.logger,
+    )
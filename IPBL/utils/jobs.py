@@ -0,0 +1,325 @@
+"""
+Background jobs stored in Postgres.
+
+A job is a row in the jobs table. Code that needs work done later calls
+enqueue() on its own connection before committing, so the job exists exactly
+when the change that asked for it does. worker.py claims due jobs with
+FOR UPDATE SKIP LOCKED (highest priority first, then the longest due), so any
+number of workers can share the table without waiting on each other, and
+runs them on a thread pool inside an app context.
+
+A failed job is retried with exponential backoff until it has used
+max_attempts. Running jobs get a heartbeat; jobs whose worker died are
+requeued after JOB_LOCK_TIMEOUT. Delivery is at least once, so handlers must
+be safe to run twice.
+
+Handlers are registered with @job, next to the code they belong to:
+
+    @job("email.verification", concurrency=2, priority=10)
+    def send_verification_email_job(payload):
+        ...
+"""
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from .metrics import (
+    job_duration_seconds,
+    job_lag_seconds,
+    jobs_processed_total,
+    maybe_flush,
+    register_gauge_callback,
+)
+
+MAX_BACKOFF = 3600
+
+JOB_TYPES = {}
+
+ENQUEUE_QUERY = """
+    INSERT INTO jobs (job_type, payload, priority, run_at, max_attempts)
+    VALUES (%s, %s, %s, NOW() + %s * INTERVAL '1 second', %s)
+    RETURNING id
+"""
+
+CLAIM_QUERY = """
+    WITH next AS (
+        SELECT id FROM jobs
+        WHERE status = 'queued' AND run_at <= NOW() AND job_type = ANY(%s)
+        ORDER BY priority DESC, run_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE jobs j SET status = 'running', attempts = j.attempts + 1,
+        locked_by = %s, locked_at = NOW()
+    FROM next
+    WHERE j.id = next.id
+    RETURNING j.id, j.job_type, j.payload, j.attempts, j.max_attempts,
+        EXTRACT(EPOCH FROM NOW() - j.run_at)::float AS lag
+"""
+
+# The locked_by check keeps a worker from touching a job that was requeued
+# (and possibly claimed elsewhere) after its heartbeat lapsed
+COMPLETE_QUERY = """
+    UPDATE jobs SET status = 'done', finished_at = NOW(), locked_by = NULL, last_error = NULL
+    WHERE id = %s AND locked_by = %s
+"""
+
+RETRY_QUERY = """
+    UPDATE jobs SET status = 'queued', run_at = NOW() + %s * INTERVAL '1 second',
+        locked_by = NULL, locked_at = NULL, last_error = %s
+    WHERE id = %s AND locked_by = %s
+"""
+
+FAIL_QUERY = """
+    UPDATE jobs SET status = 'failed', finished_at = NOW(), locked_by = NULL, last_error = %s
+    WHERE id = %s AND locked_by = %s
+"""
+
+HEARTBEAT_QUERY = """
+    UPDATE jobs SET locked_at = NOW() WHERE id = ANY(%s) AND locked_by = %s
+"""
+
+REQUEUE_LOST_QUERY = """
+    UPDATE jobs SET
+        status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+        finished_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+        locked_by = NULL, locked_at = NULL, last_error = 'Worker stopped responding'
+    WHERE status = 'running' AND locked_at < NOW() - %s * INTERVAL '1 second'
+"""
+
+PURGE_QUERY = """
+    DELETE FROM jobs WHERE id IN (
+        SELECT id FROM jobs
+        WHERE status = 'done' AND finished_at < NOW() - %s * INTERVAL '1 day'
+        LIMIT 1000
+    )
+"""
+
+QUEUE_DEPTH_QUERY = """
+    SELECT job_type, status, COUNT(*) AS count FROM jobs
+    WHERE status IN ('queued', 'running', 'failed')
+    GROUP BY job_type, status
+"""
+
+QUEUE_LAG_QUERY = """
+    SELECT job_type, EXTRACT(EPOCH FROM NOW() - MIN(run_at))::float AS lag FROM jobs
+    WHERE status = 'queued' AND run_at <= NOW()
+    GROUP BY job_type
+"""
+
+
+class JobType:
+    def __init__(self, name, handler, concurrency, max_attempts, priority, backoff):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.priority = priority
+        self.backoff = backoff
+
+
+def job(name, concurrency=1, max_attempts=5, priority=0, backoff=30):
+    """
+    Register a function as the handler for a job type.
+
+    Args:
+        name: Job type stored in jobs.job_type
+        concurrency: Most jobs of this type one worker process runs at once
+        max_attempts: Attempts before the job is marked failed
+        priority: Default priority; higher runs first
+        backoff: Seconds before the first retry, doubling for each one after
+    """
+
+    def decorator(func):
+        JOB_TYPES[name] = JobType(name, func, concurrency, max_attempts, priority, backoff)
+        return func
+
+    return decorator
+
+
+def enqueue(conn, job_type, payload=None, priority=None, delay=0, max_attempts=None):
+    """
+    Add a job. Workers see it once conn's transaction commits.
+
+    Returns:
+        int: The new job's id
+    """
+    spec = JOB_TYPES.get(job_type)
+    if spec is None:
+        raise ValueError(f"Unknown job type: {job_type}")
+    row = conn.execute(
+        ENQUEUE_QUERY,
+        (
+            job_type,
+            Jsonb(payload or {}),
+            spec.priority if priority is None else priority,
+            delay,
+            max_attempts or spec.max_attempts,
+        ),
+    ).fetchone()
+    return row["id"] if isinstance(row, dict) else row[0]
+
+
+def backoff_delay(base, attempts):
+    """Seconds to wait before retrying after the given attempt, with jitter"""
+    delay = min(MAX_BACKOFF, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Worker:
+    """Claims due jobs and runs them on a thread pool; see worker.py"""
+
+    def __init__(
+        self,
+        app,
+        database_url,
+        job_types=None,
+        concurrency=4,
+        poll_interval=1.0,
+        lock_timeout=300,
+        retention_days=7,
+    ):
+        unknown = set(job_types or ()) - set(JOB_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown job type(s): {', '.join(sorted(unknown))}")
+        self.app = app
+        self.database_url = database_url
+        self.types = {name: JOB_TYPES[name] for name in (job_types or JOB_TYPES)}
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.retention_days = retention_days
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = app.logger
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="jobs")
+        self._results = queue.Queue()
+        self._running = {}  # job id -> job type
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Stop claiming jobs; run() returns once the running ones finish"""
+        self._stopping.set()
+
+    def run(self, burst=False):
+        """Process jobs until stop() is called (or, with burst, until none are due)"""
+        self.logger.info(f"Worker {self.name} handling {', '.join(sorted(self.types))}")
+        last_maintenance = 0.0
+        with psycopg.connect(self.database_url, autocommit=True) as conn:
+            while True:
+                self._drain(conn)
+                if time.monotonic() - last_maintenance >= min(60, self.lock_timeout / 3):
+                    self._maintain(conn)
+                    last_maintenance = time.monotonic()
+
+                claimed = 0 if self._stopping.is_set() else self._claim(conn)
+                if not self._running and (self._stopping.is_set() or (burst and not claimed)):
+                    break
+                if claimed:
+                    continue
+                # Idle or at capacity: wait for a job to finish or the next poll
+                try:
+                    self._finish(conn, *self._results.get(timeout=self.poll_interval))
+                except queue.Empty:
+                    pass
+        self._executor.shutdown()
+        maybe_flush()
+
+    def _claim(self, conn):
+        claimed = 0
+        while len(self._running) < self.concurrency:
+            running = Counter(self._running.values())
+            available = [name for name, spec in self.types.items() if running[name] < spec.concurrency]
+            if not available:
+                break
+            row = conn.execute(CLAIM_QUERY, (available, self.name)).fetchone()
+            if row is None:
+                break
+            job_id, job_type, payload, attempts, max_attempts, lag = row
+            self._running[job_id] = job_type
+            job_lag_seconds.observe(max(lag, 0.0), job_type=job_type)
+            self._executor.submit(self._execute, job_id, job_type, payload, attempts, max_attempts)
+            claimed += 1
+        return claimed
+
+    def _execute(self, job_id, job_type, payload, attempts, max_attempts):
+        start = time.perf_counter()
+        error = None
+        try:
+            with self.app.app_context():
+                self.types[job_type].handler(payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            self.logger.error(f"Job {job_id} ({job_type}) attempt {attempts} failed: {error}")
+        self._results.put(
+            (job_id, job_type, attempts, max_attempts, error, time.perf_counter() - start)
+        )
+
+    def _drain(self, conn):
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            self._finish(conn, *result)
+
+    def _finish(self, conn, job_id, job_type, attempts, max_attempts, error, duration):
+        self._running.pop(job_id, None)
+        job_duration_seconds.observe(duration, job_type=job_type)
+        if error is None:
+            conn.execute(COMPLETE_QUERY, (job_id, self.name))
+            result = "done"
+        elif attempts < max_attempts:
+            delay = backoff_delay(self.types[job_type].backoff, attempts)
+            conn.execute(RETRY_QUERY, (delay, error, job_id, self.name))
+            result = "retried"
+        else:
+            conn.execute(FAIL_QUERY, (error, job_id, self.name))
+            result = "failed"
+        jobs_processed_total.inc(job_type=job_type, result=result)
+
+    def _maintain(self, conn):
+        """Heartbeat our running jobs, requeue lost ones and purge old finished ones"""
+        if self._running:
+            conn.execute(HEARTBEAT_QUERY, (list(self._running), self.name))
+        lost = conn.execute(REQUEUE_LOST_QUERY, (self.lock_timeout,)).rowcount
+        if lost:
+            self.logger.warning(f"Requeued {lost} job(s) from unresponsive workers")
+        conn.execute(PURGE_QUERY, (self.retention_days,))
+        maybe_flush()
+
+
+def _queue_depth():
+    from database import get_db
+
+    rows = get_db().execute(QUEUE_DEPTH_QUERY).fetchall()
+    return {(row["job_type"], row["status"]): row["count"] for row in rows}
+
+
+def _queue_lag():
+    from database import get_db
+
+    rows = get_db().execute(QUEUE_LAG_QUERY).fetchall()
+    return {(row["job_type"],): row["lag"] for row in rows}
+
+
+# Read from the table at scrape time, so they cover every worker
+register_gauge_callback(
+    "jobs_queued",
+    "Jobs waiting, running or failed, by type",
+    _queue_depth,
+    ("job_type", "status"),
+)
+register_gauge_callback(
+    "jobs_oldest_due_seconds",
+    "How long the oldest due job of each type has been waiting",
+    _queue_lag,
+    ("job_type",),
+)
@@ -0,0 +1,330 @@
+"""
+Prometheus-compatible metrics with file-backed aggregation across workers.
+
+Each process keeps its metrics in memory and periodically writes them to
+METRICS_DIR/metrics_<pid>_<start time>.json (the start time keeps a reused
+pid from overwriting a dead worker's file). Whichever worker serves /metrics
+merges every file, so counters from all gunicorn workers (including ones that
+have since been recycled) add up. Gauges only count processes that are still
+alive. Without METRICS_DIR the app reports just its own process.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+from flask import g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_metrics = {}
+_callbacks = []
+_settings = {"dir": None, "flush_interval": 5.0, "last_flush": 0.0}
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        with _lock:
+            _metrics[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Gauge summed across live processes"""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            # [count per bucket..., +Inf count, sum]
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+
+def register_gauge_callback(name, documentation, callback, labelnames=()):
+    """
+    Register a gauge computed at scrape time, e.g. a queue depth read from the DB.
+
+    The callback returns a number, or a dict mapping label value tuples to
+    numbers when `labelnames` is given. It only runs in the scraping process,
+    so it should report global state rather than per-worker state.
+    """
+    _callbacks.append((name, documentation, callback, tuple(labelnames)))
+
+
+# --- Multi-process storage -------------------------------------------------
+
+
+def _new_file_name():
+    return f"metrics_{os.getpid()}_{time.time_ns()}.json"
+
+
+# Forked workers (e.g. with gunicorn --preload) each need their own file
+_settings["file_name"] = _new_file_name()
+os.register_at_fork(after_in_child=lambda: _settings.update(file_name=_new_file_name()))
+
+
+def _snapshot():
+    with _lock:
+        return {
+            name: [[list(key), value] for key, value in metric.values.items()]
+            for name, metric in _metrics.items()
+        }
+
+
+def flush():
+    """Write this process's metrics to METRICS_DIR (atomically)"""
+    directory = _settings["dir"]
+    if not directory:
+        return
+    path = os.path.join(directory, _settings["file_name"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "metrics": _snapshot()}, f)
+    os.replace(tmp_path, path)
+    _settings["last_flush"] = time.monotonic()
+
+
+def maybe_flush():
+    if time.monotonic() - _settings["last_flush"] >= _settings["flush_interval"]:
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _load_snapshots():
+    directory = _settings["dir"]
+    if not directory:
+        return [(True, _snapshot())]
+
+    flush()
+    snapshots = []
+    for filename in os.listdir(directory):
+        if not (filename.startswith("metrics_") and filename.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        snapshots.append((_pid_alive(data["pid"]), data["metrics"]))
+    return snapshots
+
+
+def _merge():
+    merged = {name: {} for name in _metrics}
+    for alive, snapshot in _load_snapshots():
+        for name, series in snapshot.items():
+            metric = _metrics.get(name)
+            if metric is None or (metric.kind == "gauge" and not alive):
+                continue
+            values = merged[name]
+            for key, value in series:
+                key = tuple(key)
+                if metric.kind == "histogram":
+                    current = values.get(key)
+                    values[key] = (
+                        list(value)
+                        if current is None
+                        else [a + b for a, b in zip(current, value)]
+                    )
+                else:
+                    values[key] = values.get(key, 0) + value
+    return merged
+
+
+# --- Exposition ------------------------------------------------------------
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def generate_latest():
+    """Render all metrics in the Prometheus text exposition format"""
+    lines = []
+    for name, values in sorted(_merge().items()):
+        metric = _metrics[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(values.items()):
+            if metric.kind == "histogram":
+                for bound, count in zip(metric.buckets, value):
+                    labels = _labels(metric.labelnames, key, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{labels} {count}")
+                labels = _labels(metric.labelnames, key, 'le="+Inf"')
+                lines.append(f"{name}_bucket{labels} {value[-2]}")
+                lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {value[-1]}")
+                lines.append(f"{name}_count{_labels(metric.labelnames, key)} {value[-2]}")
+            else:
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {_format_number(value)}")
+
+    for name, documentation, callback, labelnames in _callbacks:
+        try:
+            value = callback()
+        except Exception:
+            continue
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        if isinstance(value, dict):
+            for key, v in sorted(value.items()):
+                lines.append(f"{name}{_labels(labelnames, key)} {_format_number(v)}")
+        else:
+            lines.append(f"{name} {_format_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# --- Application metrics ---------------------------------------------------
+
+http_requests_total = Counter(
+    "http_requests_total",
+    "HTTP requests by endpoint and status class",
+    ("blueprint", "rule", "method", "status"),
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by endpoint",
+    ("blueprint", "rule", "method"),
+)
+http_request_db_seconds = Histogram(
+    "http_request_db_seconds",
+    "Time spent in the database per request",
+    ("blueprint", "rule", "method"),
+)
+db_queries_total = Counter(
+    "db_queries_total", "SQL statements executed", ("blueprint", "rule")
+)
+db_connections_opened_total = Counter(
+    "db_connections_opened_total", "Database connections opened"
+)
+db_connections_open = Gauge("db_connections_open", "Database connections currently open")
+emails_sent_total = Counter("emails_sent_total", "Emails sent by result", ("result",))
+realtime_clients = Gauge(
+    "realtime_clients", "Clients waiting on an async long-poll or event stream", ("endpoint",)
+)
+jobs_processed_total = Counter(
+    "jobs_processed_total", "Background jobs run by type and outcome", ("job_type", "result")
+)
+job_duration_seconds = Histogram(
+    "job_duration_seconds", "Background job run time", ("job_type",)
+)
+job_lag_seconds = Histogram(
+    "job_lag_seconds",
+    "Delay between a job becoming due and a worker starting it",
+    ("job_type",),
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+
+def init_metrics(app):
+    """Record request metrics for every request handled by the app"""
+    _settings["dir"] = app.config.get("METRICS_DIR")
+    _settings["flush_interval"] = app.config.get("METRICS_FLUSH_INTERVAL", 5.0)
+    if _settings["dir"]:
+        os.makedirs(_settings["dir"], exist_ok=True)
+        atexit.register(flush)
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+
+        blueprint = request.blueprint or "app"
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        method = request.method
+
+        http_requests_total.inc(
+            blueprint=blueprint,
+            rule=rule,
+            method=method,
+            status=f"{response.status_code // 100}xx",
+        )
+        http_request_duration_seconds.observe(
+            time.perf_counter() - start, blueprint=blueprint, rule=rule, method=method
+        )
+
+        stats = g.get("query_stats")
+        if stats is not None and stats.count:
+            db_queries_total.inc(stats.count, blueprint=blueprint, rule=rule)
+            http_request_db_seconds.observe(
+                stats.total_time, blueprint=blueprint, rule=rule, method=method
+            )
+
+        maybe_flush()
+        return response
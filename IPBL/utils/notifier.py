@@ -0,0 +1,105 @@
+"""
+Fan-out of Postgres NOTIFY events to waiting asyncio clients (asgi.py).
+
+Triggers call pg_notify('user_events', <user id>) whenever something a user
+is shown may have changed. Each process holds one LISTEN connection and wakes
+the clients subscribed to that user, so an idle long-poll costs an
+asyncio.Event rather than a database connection or a thread.
+
+Subscribe before reading the current state, then wait, so a change that
+lands between the read and the wait is not missed:
+
+    with notifier.subscribe(user_id) as event:
+        state = await read_state()
+        await notifier.wait(event, timeout)
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+
+import psycopg
+
+CHANNEL = "user_events"
+
+logger = logging.getLogger(__name__)
+
+
+class Notifier:
+    def __init__(self, conninfo):
+        self.conninfo = conninfo
+        self._waiters = defaultdict(set)  # user id -> set of asyncio.Event
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _listen(self):
+        delay = 1
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    self.conninfo, autocommit=True
+                ) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    delay = 1
+                    # Events sent while we were disconnected are lost
+                    self._wake_all()
+                    async for notify in conn.notifies():
+                        self._wake(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"LISTEN {CHANNEL} failed, retrying in {delay}s: {e}")
+                self._wake_all()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    def _wake(self, payload):
+        try:
+            user_id = int(payload)
+        except ValueError:
+            return
+        for event in self._waiters.get(user_id, ()):
+            event.set()
+
+    def _wake_all(self):
+        for events in self._waiters.values():
+            for event in events:
+                event.set()
+
+    @property
+    def subscribers(self):
+        return sum(len(events) for events in self._waiters.values())
+
+    @contextmanager
+    def subscribe(self, user_id):
+        """Yield an asyncio.Event that is set whenever user_id gets an event"""
+        event = asyncio.Event()
+        self._waiters[user_id].add(event)
+        try:
+            yield event
+        finally:
+            events = self._waiters.get(user_id)
+            if events is not None:
+                events.discard(event)
+                if not events:
+                    del self._waiters[user_id]
+
+    @staticmethod
+    async def wait(event, timeout):
+        """Wait up to timeout seconds for the event; returns whether it fired (and resets it)"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        event.clear()
+        return True
@@ -0,0 +1,199 @@
+"""
+Who is online now, from authenticated activity.
+
+Every request through @token_required (and every open long-poll or event
+stream in asgi.py) touches the user's last-seen time in a per-process
+registry. Entries expire PRESENCE_TTL seconds after the last touch through a
+timing wheel, so expiry costs O(1) per user instead of a scan.
+
+Other workers learn about a user through a shared backend (the same backends
+as utils/cache.py, chosen by PRESENCE_BACKEND): each user is written at most
+once per PRESENCE_WRITE_INTERVAL, and lookups only go to the backend for
+users this process hasn't seen. With the default memory backend, the local
+stand-in, each worker only knows the users it served itself.
+"""
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request
+
+from .cache import make_backend
+from .streaming import streaming_mode
+
+ONLINE_MODES = ("only", "first")
+
+
+class TimingWheel:
+    """Keys expire between ttl - tick and ttl seconds after their last add"""
+
+    def __init__(self, ttl, tick=1.0):
+        self.tick = tick
+        self.slots = [set() for _ in range(math.ceil(ttl / tick) + 1)]
+        self._slot_of = {}
+        self._current = None
+
+    def _tick(self, now):
+        return int(now // self.tick)
+
+    def add(self, key, now):
+        """
+        (Re)schedule key to expire one full turn of the wheel from now. Call
+        advance(now) first, or the key can land in a slot still to be expired.
+        """
+        slot = (self._tick(now) + len(self.slots) - 1) % len(self.slots)
+        old = self._slot_of.get(key)
+        if old == slot:
+            return
+        if old is not None:
+            self.slots[old].discard(key)
+        self.slots[slot].add(key)
+        self._slot_of[key] = slot
+
+    def advance(self, now):
+        """Return the keys whose time ran out since the last advance"""
+        tick = self._tick(now)
+        if self._current is None:
+            self._current = tick
+        expired = []
+        # Past one full turn every slot is due, so stop there
+        for t in range(self._current + 1, min(tick, self._current + len(self.slots)) + 1):
+            slot = self.slots[t % len(self.slots)]
+            for key in slot:
+                del self._slot_of[key]
+            expired.extend(slot)
+            slot.clear()
+        self._current = tick
+        return expired
+
+    def __len__(self):
+        return len(self._slot_of)
+
+
+class PresenceRegistry:
+    def __init__(self, backend, ttl=120, write_interval=30, tick=1.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.write_interval = write_interval
+        self._last_seen = {}
+        self._written = {}
+        self._wheel = TimingWheel(ttl, tick)
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        for user_id in self._wheel.advance(now):
+            self._last_seen.pop(user_id, None)
+            self._written.pop(user_id, None)
+
+    def touch(self, user_id, now=None):
+        """Record activity from user_id"""
+        now = now or time.time()
+        with self._lock:
+            self._expire(now)
+            self._last_seen[user_id] = now
+            self._wheel.add(user_id, now)
+            write = now - self._written.get(user_id, 0) >= self.write_interval
+            if write:
+                self._written[user_id] = now
+        if write:
+            # Throttled writes can lag the real last-seen by write_interval
+            self.backend.set(f"presence:{user_id}", now, self.ttl + self.write_interval)
+
+    def last_seen(self, user_ids, now=None):
+        """Map each online user in user_ids to their last-seen unix time"""
+        now = now or time.time()
+        with self._lock:
+            self._expire(now)
+            seen = {uid: self._last_seen[uid] for uid in user_ids if uid in self._last_seen}
+        missing = list(dict.fromkeys(uid for uid in user_ids if uid not in seen))
+        if missing:
+            values = self.backend.get_many([f"presence:{uid}" for uid in missing])
+            cutoff = now - self.ttl - self.write_interval
+            seen.update(
+                (uid, value) for uid, value in zip(missing, values) if value is not None and value > cutoff
+            )
+        return seen
+
+    def is_online(self, user_id):
+        return user_id in self.last_seen([user_id])
+
+    def __len__(self):
+        """Users this process has seen within the TTL"""
+        with self._lock:
+            self._expire(time.time())
+            return len(self._last_seen)
+
+
+def init_presence(app):
+    app.extensions["presence"] = PresenceRegistry(
+        make_backend(app.config, "PRESENCE"),
+        app.config.get("PRESENCE_TTL", 120),
+        app.config.get("PRESENCE_WRITE_INTERVAL", 30),
+    )
+
+
+def touch_presence(user_id):
+    presence = current_app.extensions.get("presence")
+    if presence is not None:
+        presence.touch(user_id)
+
+
+def rank_by_presence(items, mode, key="id"):
+    """
+    Mark each item "online", then keep only online ones ("only") or move them
+    to the front, otherwise in their original order ("first").
+    """
+    presence = current_app.extensions["presence"]
+    online = presence.last_seen([item[key] for item in items])
+    for item in items:
+        item["online"] = item[key] in online
+    if mode == "only":
+        return [item for item in items if item["online"]]
+    return sorted(items, key=lambda item: not item["online"])
+
+
+def online_arg(default=None):
+    """The ?online= mode; raises ValueError for an unknown one"""
+    mode = request.args.get("online", default)
+    if mode is not None and mode not in ONLINE_MODES:
+        raise ValueError(f"online must be one of: {', '.join(ONLINE_MODES)}")
+    return mode
+
+
+def online_ranking(list_key):
+    """
+    Apply ?online=only|first to the list under list_key of a JSON response.
+
+    Goes above @cached (with ignore_args=("online",), so every mode shares
+    one cached list), so presence is always current even when the list
+    itself comes from the cache. Without ?online the response is untouched.
+    Streamed responses can't be reordered, so asking for both is a 400.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                mode = online_arg()
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if mode is None:
+                return view(*args, **kwargs)
+            if streaming_mode():
+                return jsonify({"error": "online can't be combined with a streamed response"}), 400
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            data = response.get_json()
+            data[list_key] = rank_by_presence(data[list_key], mode)
+            ranked = jsonify(data)
+            if "X-Cache" in response.headers:
+                ranked.headers["X-Cache"] = response.headers["X-Cache"]
+            ranked.vary.add("Accept")
+            return ranked
+
+        return wrapper
+
+    return decorator
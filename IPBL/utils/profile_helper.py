@@ -1,21 +1,30 @@
 import os
 
-def get_profile_picture_url(profile_picture, full_name):
+from .images import AVATAR_PREFIX, DEFAULT_AVATAR_SIZE, avatar_url, is_processed_avatar
+from .initials_avatar import initials_avatar_url
+
+def get_profile_picture_url(profile_picture, full_name, size=DEFAULT_AVATAR_SIZE):
     """
-    Generate profile picture URL with fallback to UI Avatars.
+    Generate profile picture URL with fallback to an initials avatar.
 
     Args:
         profile_picture: The profile_picture value from database
         full_name: User's full name for generating initials
+        size: Avatar size in pixels for processed uploads (64, 128 or 256)
 
     Returns:
-        str: URL to profile picture (either uploaded image or UI Avatars)
+        str: URL to profile picture (either uploaded image or /avatars/<initials>.svg)
     """
-    # If user has uploaded a custom picture and it's not the old default
+    # Processed uploads are served by /avatars, so no disk check is needed
+    if is_processed_avatar(profile_picture):
+        return avatar_url(profile_picture, size)
+
+    # If user has uploaded a custom picture and it's not a generated default
     if (
         profile_picture
         and profile_picture != "default-avatar.png"
         and not profile_picture.startswith("https://ui-avatars.com")
+        and not profile_picture.startswith(AVATAR_PREFIX)
     ):
         # Validate that the file actually exists
         # Remove leading slash if present to create relative path
@@ -25,16 +34,8 @@ def get_profile_picture_url(profile_picture, full_name):
         if os.path.exists(file_path):
             return profile_picture
         else:
-            # File doesn't exist, fall back to UI Avatars
-            print(f"Warning: Profile picture not found: {file_path}, falling back to UI Avatars")
-
-    # Generate initials for UI Avatars
-    names = full_name.strip().split()
-    if len(names) >= 2:
-        initials = f"{names[0][0]}{names[-1][0]}"
-    elif names:
-        initials = names[0][:2]
-    else:
-        initials = "SS"  # Default fallback
+            # File doesn't exist, fall back to an initials avatar
+            print(f"Warning: Profile picture not found: {file_path}, falling back to initials avatar")
 
-    return f"https://ui-avatars.com/api/?name={initials}&background=random"
+    # Rendered from the current name, so it follows renames
+    return initials_avatar_url(full_name)
@@ -0,0 +1,156 @@
+"""
+Opt-in request profiling for production.
+
+A request is profiled when it carries a valid X-Profile-Request header (see
+make_profile_token; only when PROFILE_TOKEN_SECRET is set) or when it is
+picked by 1-in-PROFILE_SAMPLE_RATE sampling.
+Artifacts are written to PROFILE_DIR:
+
+    <timestamp>_<endpoint>_<pid>.json        route and timing metadata
+    <timestamp>_<endpoint>_<pid>.collapsed   folded stacks (PROFILER = "sampling")
+    <timestamp>_<endpoint>_<pid>.prof        pstats dump (PROFILER = "cprofile")
+
+Use profile_report.py to aggregate them.
+"""
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+PROFILE_HEADER = "X-Profile-Request"
+
+
+def make_profile_token(secret_key, ttl=300):
+    """Create a header value that enables profiling until it expires"""
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret_key.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(secret_key, token):
+    """Check a profile header value's signature and expiry"""
+    expires, _, signature = (token or "").partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret_key.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's call stack at a fixed interval into folded stacks"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def _should_profile(app):
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        secret = app.config.get("PROFILE_TOKEN_SECRET")
+        return bool(secret) and verify_profile_token(secret, token)
+    rate = app.config.get("PROFILE_SAMPLE_RATE", 0)
+    return rate > 0 and random.randrange(rate) == 0
+
+
+def init_profiler(app):
+    """Profile selected requests when PROFILE_DIR is configured"""
+    profile_dir = app.config.get("PROFILE_DIR")
+    if not profile_dir:
+        return
+    os.makedirs(profile_dir, exist_ok=True)
+
+    @app.before_request
+    def start_profiling():
+        if not _should_profile(app):
+            return
+
+        g.profile_start = time.perf_counter()
+        if app.config.get("PROFILER") == "cprofile":
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+        else:
+            interval = app.config.get("PROFILE_INTERVAL_MS", 5) / 1000
+            g.profiler = StackSampler(threading.get_ident(), interval)
+            g.profiler.start()
+
+    @app.after_request
+    def stop_profiling(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+        else:
+            profiler.stop()
+        duration_ms = (time.perf_counter() - g.pop("profile_start")) * 1000
+
+        endpoint = request.endpoint or "unmatched"
+        base = os.path.join(
+            profile_dir,
+            f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}_{endpoint.replace('.', '-')}_{os.getpid()}",
+        )
+        metadata = {
+            "endpoint": endpoint,
+            "rule": request.url_rule.rule if request.url_rule else None,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 3),
+            "pid": os.getpid(),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.dump_stats(f"{base}.prof")
+                metadata["artifact"] = f"{os.path.basename(base)}.prof"
+            else:
+                with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+                    f.write(profiler.collapsed())
+                metadata["artifact"] = f"{os.path.basename(base)}.collapsed"
+                metadata["samples"] = sum(profiler.stacks.values())
+            with open(f"{base}.json", "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+        except OSError as e:
+            app.logger.error(f"Failed to write profile: {e}")
+
+        return response
@@ -0,0 +1,71 @@
+"""
+Expire swap requests that have been pending for too long.
+
+Each batch locks at most batch_size stale rows with FOR UPDATE SKIP LOCKED,
+so it never waits on (or blocks) a user accepting a request at the same
+moment, and several sweepers can run side by side. The sender gets a
+request_events row for every expired request, which shows up in their
+notification poll.
+"""
+import time
+
+EXPIRE_BATCH_QUERY = """
+    WITH stale AS (
+        SELECT id FROM swap_requests
+        WHERE status = 'pending' AND created_at < NOW() - %s * INTERVAL '1 day'
+        ORDER BY created_at
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    ), expired AS (
+        UPDATE swap_requests r SET status = 'expired'
+        FROM stale
+        WHERE r.id = stale.id
+        RETURNING r.id, r.sender_id
+    ), events AS (
+        INSERT INTO request_events (request_id, actor_id, recipient_id, status)
+        SELECT id, NULL, sender_id, 'expired' FROM expired
+    )
+    SELECT COUNT(*) AS count FROM expired
+"""
+
+COUNT_STALE_QUERY = """
+    SELECT COUNT(*) AS count FROM swap_requests
+    WHERE status = 'pending' AND created_at < NOW() - %s * INTERVAL '1 day'
+"""
+
+
+def _count(row):
+    return row["count"] if isinstance(row, dict) else row[0]
+
+
+def count_stale_requests(conn, max_age_days):
+    return _count(conn.execute(COUNT_STALE_QUERY, (max_age_days,)).fetchone())
+
+
+def expire_stale_requests(conn, max_age_days, batch_size=500, max_batches=None, pause=0.0):
+    """
+    Expire pending requests older than max_age_days, one committed batch at a time.
+
+    Args:
+        conn: psycopg connection (tuple or dict rows)
+        max_age_days: Age after which a pending request expires
+        batch_size: Rows per batch (and per transaction)
+        max_batches: Stop after this many batches (None for no limit)
+        pause: Seconds to sleep between batches, to go easy on the database
+
+    Returns:
+        int: Number of requests expired
+    """
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        row = conn.execute(EXPIRE_BATCH_QUERY, (max_age_days, batch_size)).fetchone()
+        conn.commit()
+        count = _count(row)
+        total += count
+        batches += 1
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return total
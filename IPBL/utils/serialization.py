@@ -0,0 +1,252 @@
+"""
+Lean JSON serialization for list endpoints.
+
+Handlers declare the output shape of a row once, fetch plain tuples instead
+of dict_row dicts, and build exactly one dict per row on the way to a single
+json.dumps call:
+
+    TEACHER = Shape(
+        ("id", "full_name", "profile_picture", ...),        # SELECT order
+        computed={"profile_picture": (get_profile_picture_url, "profile_picture", "full_name")},
+    )
+
+    rows = fetch_rows(query, params)
+    return json_response({"teachers": TEACHER.rows(rows)})
+
+Given SQL expressions for its columns, a shape can also be cut down to the
+fields a client asked for with ?fields= (see fields_arg), selecting only the
+columns those fields need:
+
+    shape = TEACHER.project(fields_arg(TEACHER.fields))
+    rows = fetch_rows(f"SELECT {shape.select_list()} FROM ...", params)
+
+Compared with dict_row + dict(row) + jsonify this skips the per-row dict
+from the cursor and its copy. Keys are still sorted, as jsonify sorts them,
+so clients see the same key order as before. Datetimes are formatted
+directly, in the same HTTP date format jsonify uses; anything else json can't
+encode (Decimals, dates, ...) goes through the app's JSON provider default.
+
+`python -m bench.serialization_bench` compares the two paths.
+"""
+import json
+from datetime import datetime, timezone
+from operator import itemgetter
+
+from flask import Response, current_app, request
+from psycopg.rows import tuple_row
+
+
+class Shape:
+    """
+    The JSON object built from each row of a query.
+
+    Args:
+        columns: Column names in SELECT order
+        computed: Dict of output field -> (function, *source columns). A
+            field that is also a column is replaced in place; others are
+            added after the columns. Functions with no source columns are
+            called with no arguments.
+        hidden: Columns that feed computed fields but are not output
+        sql: Dict of column -> SQL expression selecting it, for
+            select_list(). Columns not listed are selected by name.
+    """
+
+    def __init__(self, columns, computed=None, hidden=(), sql=None):
+        self.columns = tuple(columns)
+        self.computed = dict(computed or {})
+        self.hidden = set(hidden)
+        self.sql = dict(sql or {})
+        self._projections = {}
+        index = {name: i for i, name in enumerate(self.columns)}
+        unknown = [
+            source
+            for _, *sources in self.computed.values()
+            for source in sources
+            if source not in index
+        ] + [name for name in self.hidden if name not in index]
+        if unknown:
+            raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+
+        # Output columns are copied with one itemgetter call; computed fields
+        # then replace their column's value in place or are added at the end
+        columns = [name for name in self.columns if name not in self.hidden]
+        self.fields = tuple(columns + [name for name in self.computed if name not in index])
+        self.row = _row_builder(
+            columns,
+            # Rows are zipped as they are when nothing is hidden
+            None if self.hidden.isdisjoint(index) else _getter([index[name] for name in columns]),
+            [
+                (name, fn, _getter([index[source] for source in sources]))
+                for name, (fn, *sources) in self.computed.items()
+                if name in self.fields
+            ],
+        )
+
+    def project(self, fields=None, keep=()):
+        """
+        This shape cut down to the given output fields, in their usual order
+        (all of them for None), reading only the columns they need.
+
+        Args:
+            fields: Output fields to keep, e.g. from fields_arg()
+            keep: Columns to select anyway (for the handler's own use)
+                without outputting them
+        """
+        if fields is None and not keep:
+            return self
+        key = (None if fields is None else frozenset(fields), tuple(keep))
+        shape = self._projections.get(key)
+        if shape is None:
+            fields = set(self.fields if fields is None else fields)
+            needed = set(keep)
+            for name in fields:
+                if name in self.computed:
+                    needed.update(self.computed[name][1:])
+                else:
+                    needed.add(name)
+            columns = [name for name in self.columns if name in needed]
+            shape = Shape(
+                columns,
+                computed={name: fn for name, fn in self.computed.items() if name in fields},
+                hidden=[name for name in columns if name not in fields or name in self.hidden],
+                sql=self.sql,
+            )
+            self._projections[key] = shape
+        return shape
+
+    def select_list(self):
+        """The SELECT list for this shape's columns, in order"""
+        return ", ".join(f"{self.sql.get(name, name)} AS {name}" for name in self.columns)
+
+    def rows(self, rows):
+        """List of output dicts for an iterable of row tuples"""
+        return list(map(self.row, rows))
+
+    def iter_rows(self, rows):
+        """Like rows(), but lazily, for streaming responses"""
+        return map(self.row, rows)
+
+
+def _getter(indices):
+    """Function of a row returning the values at indices, as a tuple"""
+    if len(indices) == 1:
+        i = indices[0]
+        return lambda r: (r[i],)
+    if not indices:
+        return lambda r: ()
+    return itemgetter(*indices)
+
+
+def _row_builder(columns, values, computed):
+    """
+    Function of a row returning its output dict. values picks the output
+    columns out of a row (None for all of them); computed is a list of
+    (field, function, argument getter).
+    """
+    if values is None:
+        values = tuple
+    if not computed:
+        return lambda r: dict(zip(columns, values(r)))
+
+    if len(computed) == 1:
+        # The common case (a profile picture), without the loop
+        [(name, fn, args)] = computed
+
+        def row(r):
+            out = dict(zip(columns, values(r)))
+            out[name] = fn(*args(r))
+            return out
+
+        return row
+
+    def row(r):
+        out = dict(zip(columns, values(r)))
+        for name, fn, args in computed:
+            out[name] = fn(*args(r))
+        return out
+
+    return row
+
+
+def fields_arg(allowed, always=("id",)):
+    """
+    The ?fields= list (comma separated), in the order of allowed; None when
+    absent. Fields in always are included whether asked for or not. Raises
+    ValueError for a field not in allowed.
+    """
+    value = request.args.get("fields")
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(allowed)}"
+        )
+    requested.update(name for name in always if name in allowed)
+    return tuple(name for name in allowed if name in requested)
+
+
+def ids_arg(name, limit):
+    """
+    The ?<name>= list of integer ids (comma separated), without duplicates.
+    Raises ValueError when it is missing, malformed or longer than limit.
+    """
+    try:
+        ids = list(dict.fromkeys(int(value) for value in request.args.get(name, "").split(",") if value))
+    except ValueError:
+        raise ValueError(f"{name} must be a comma separated list of ids")
+    if not ids:
+        raise ValueError(f"{name} parameter is required")
+    if len(ids) > limit:
+        raise ValueError(f"At most {limit} {name} per request")
+    return ids
+
+
+def fetch_rows(query, params=()):
+    """Run a query on the request's connection and return its rows as tuples"""
+    # Imported here so the rest of this module works without a database configured
+    from database import get_db
+
+    with get_db().cursor(row_factory=tuple_row) as cur:
+        return cur.execute(query, params).fetchall()
+
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def http_date(dt):
+    """werkzeug.http.http_date for a datetime (naive means UTC), without the detours"""
+    if dt.tzinfo is not None and dt.tzinfo != timezone.utc:
+        dt = dt.astimezone(timezone.utc)
+    return "%s, %02d %s %04d %02d:%02d:%02d GMT" % (
+        DAYS[dt.weekday()], dt.day, MONTHS[dt.month - 1], dt.year, dt.hour, dt.minute, dt.second,
+    )
+
+
+def dumps(obj):
+    """Compact JSON text, with the app's handling of dates, Decimals and the like"""
+    fallback = current_app.json.default
+
+    def default(value):
+        if type(value) is datetime:
+            return http_date(value)
+        return fallback(value)
+
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def json_response(payload, status=200):
+    """A JSON response encoded in one pass, without pretty-printing"""
+    return Response(dumps(payload).encode(), status, mimetype="application/json")
+
+
+def json_items_response(key, items):
+    """
+    A {key: {id: item}} response from items that are already JSON text (e.g.
+    from cached_items), pasted in as they are rather than decoded and
+    encoded again.
+    """
+    body = ",".join(f'"{item_id}":{text}' for item_id, text in items)
+    return Response(f'{{"{key}":{{{body}}}}}'.encode(), mimetype="application/json")
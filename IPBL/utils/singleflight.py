@@ -0,0 +1,108 @@
+"""
+Request coalescing for identical concurrent reads (threaded workers).
+
+While one thread computes a response for a key, other threads asking for the
+same key wait for that result instead of running the same queries again.
+Nothing is stored afterwards: once the leader finishes, the next request
+starts a fresh computation. Caching is utils/cache.py's job.
+"""
+import threading
+from functools import wraps
+
+from flask import Response, current_app, request
+from werkzeug.http import is_hop_by_hop_header
+
+from .metrics import Counter
+from .streaming import streaming_mode
+
+singleflight_requests_total = Counter(
+    "singleflight_requests_total",
+    "Coalesced reads; follower requests reused a leader's result instead of hitting the DB",
+    ("endpoint", "role"),
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=30):
+        """
+        Run fn() once per key at a time and share its result with concurrent callers.
+
+        Returns:
+            tuple: (result, shared) where shared is True if another
+            thread's result was reused
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result, True
+            # The leader is stuck; don't make everyone else wait on it
+            return fn(), False
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+_group = SingleFlight()
+
+
+def coalesce(view):
+    """Share one execution of a public GET view between identical concurrent requests"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Streams can't be shared, and Accept can pick one, so don't key on URL alone
+        if streaming_mode():
+            return view(*args, **kwargs)
+
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        key = f"{request.endpoint}:{request.path}?{query}"
+
+        def compute():
+            response = current_app.make_response(view(*args, **kwargs))
+            # Content-Length is set again from the body
+            headers = [
+                (name, value)
+                for name, value in response.headers.items()
+                if name.lower() != "content-length" and not is_hop_by_hop_header(name)
+            ]
+            return response.get_data(), response.status_code, headers
+
+        result, shared = _group.do(key, compute)
+        singleflight_requests_total.inc(
+            endpoint=request.endpoint, role="follower" if shared else "leader"
+        )
+        body, status, headers = result
+        if shared:
+            # Cookies were meant for the leader's client only
+            headers = [(name, value) for name, value in headers if name.lower() != "set-cookie"]
+        response = Response(body, status, headers=headers)
+        response.vary.add("Accept")
+        return response
+
+    return wrapper
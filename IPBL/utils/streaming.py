@@ -0,0 +1,98 @@
+"""
+Streaming JSON responses for large result sets.
+
+Rows are read from a server-side cursor in chunks and written out as they
+arrive, so memory stays flat however many rows match and the first bytes go
+out before the query finishes. Clients opt in with ?stream=1 (a regular JSON
+document, written incrementally) or ?format=ndjson / Accept:
+application/x-ndjson (one JSON object per line).
+"""
+import uuid
+
+from flask import Response, request, stream_with_context
+
+from .serialization import dumps
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def streaming_mode():
+    """
+    Return "ndjson", "json" or None depending on what the client asked for.
+
+    Responses that depend on this must carry Vary: Accept, and must not be
+    cached or coalesced with non-streamed ones (see @cached and @coalesce).
+    """
+    if (
+        request.args.get("format") == "ndjson"
+        or request.accept_mimetypes.best == "application/x-ndjson"
+    ):
+        return "ndjson"
+    if request.args.get("stream") in ("1", "true"):
+        return "json"
+    return None
+
+
+def server_cursor_rows(query, params=(), chunk_size=DEFAULT_CHUNK_SIZE, row_factory=None):
+    """Yield rows from a named (server-side) cursor, fetching chunk_size at a time"""
+    # Imported here so streaming_mode() works without a database configured
+    from database import get_db
+
+    db = get_db()
+    with db.cursor(name=f"stream_{uuid.uuid4().hex}", row_factory=row_factory) as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        yield from cur
+
+
+def _generate(sections, mode, chunk_size):
+    buffer = []
+
+    if mode == "ndjson":
+        tag_sections = len(sections) > 1
+        for name, rows in sections.items():
+            for row in rows:
+                if tag_sections:
+                    row = {"section": name, **row}
+                buffer.append(dumps(row) + "\n")
+                if len(buffer) >= chunk_size:
+                    yield "".join(buffer)
+                    buffer.clear()
+        if buffer:
+            yield "".join(buffer)
+        return
+
+    yield "{"
+    for index, (name, rows) in enumerate(sections.items()):
+        yield f'{"," if index else ""}{dumps(name)}:['
+        first = True
+        for row in rows:
+            buffer.append(dumps(row) if first else "," + dumps(row))
+            first = False
+            if len(buffer) >= chunk_size:
+                yield "".join(buffer)
+                buffer.clear()
+        if buffer:
+            yield "".join(buffer)
+            buffer.clear()
+        yield "]"
+    yield "}"
+
+
+def stream_json(sections, mode, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Build a streamed response.
+
+    Args:
+        sections: Dict of top-level key -> iterable of row dicts, e.g.
+            {"teachers": rows}. In NDJSON mode a "section" field is added to
+            each row when there is more than one section.
+        mode: "json" or "ndjson", as returned by streaming_mode()
+        chunk_size: Rows to buffer per write
+    """
+    mimetype = "application/x-ndjson" if mode == "ndjson" else "application/json"
+    response = Response(
+        stream_with_context(_generate(sections, mode, chunk_size)), mimetype=mimetype
+    )
+    response.vary.add("Accept")
+    return response
@@ -0,0 +1,58 @@
+"""
+Run background jobs from the jobs table (see utils/jobs.py).
+
+    python worker.py [--concurrency 4] [--types email.verification,...]
+    python worker.py --burst      # run every due job, then exit
+
+Start one or more of these next to gunicorn; they share the table safely.
+SIGTERM or Ctrl+C stops claiming new jobs and waits for the running ones.
+Defaults come from JOB_WORKER_CONCURRENCY, JOB_POLL_INTERVAL,
+JOB_LOCK_TIMEOUT and JOB_RETENTION_DAYS.
+"""
+import argparse
+import logging
+import os
+import signal
+
+from app import create_app
+from utils.jobs import JOB_TYPES, Worker
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, help="jobs run at once (all types)")
+    parser.add_argument("--types", help="comma-separated job types to handle (default: all)")
+    parser.add_argument("--poll-interval", type=float, help="seconds between polls when idle")
+    parser.add_argument("--burst", action="store_true", help="exit once no jobs are due")
+    parser.add_argument("--list", action="store_true", help="list job types and exit")
+    args = parser.parse_args()
+
+    app = create_app(os.getenv("FLASK_ENV", "production"))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    app.logger.setLevel(logging.INFO)
+
+    if args.list:
+        for name, spec in sorted(JOB_TYPES.items()):
+            print(
+                f"{name}: concurrency {spec.concurrency}, priority {spec.priority}, "
+                f"max attempts {spec.max_attempts}"
+            )
+        raise SystemExit(0)
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        raise SystemExit("DATABASE_URL is not set")
+
+    config = app.config
+    worker = Worker(
+        app,
+        database_url,
+        job_types=args.types.split(",") if args.types else None,
+        concurrency=args.concurrency or config["JOB_WORKER_CONCURRENCY"],
+        poll_interval=args.poll_interval or config["JOB_POLL_INTERVAL"],
+        lock_timeout=config["JOB_LOCK_TIMEOUT"],
+        retention_days=config["JOB_RETENTION_DAYS"],
+    )
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run(burst=args.burst)
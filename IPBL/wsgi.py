@@ -1,5 +1,5 @@
 import os
-from application import create_app
+from app import create_app
 
 app = create_app(os.getenv('FLASK_ENV', 'production'))
 